@@ -6,7 +6,36 @@ from configparser import ConfigParser, NoOptionError
 from mundone import Task, Workflow
 
 from pyinterprod import interpro, interproscan, pronto, uniprot
-from pyinterprod.interpro.clan import update_cdd_clans, update_hmm_clans
+from pyinterprod.interpro.clan import (update_cdd_clans, update_hmm_clans,
+                                       validate_consensus)
+
+
+def get_scheduler(scheduler: str, queue: str | None, **kwargs) -> dict:
+    return dict(type=scheduler, queue=queue, **kwargs)
+
+
+def get_task(scheduler: dict,
+             resources: interproscan.jobs.LocalResources | None = None,
+             **kwargs) -> Task:
+    """
+    Create a task. Local tasks wait for CPU/memory slots in `resources`.
+    :param scheduler: job scheduler options, see `get_scheduler()`
+    :param resources: CPU/memory slots shared by local tasks
+    :param kwargs: task arguments (function, name, dependencies, etc.)
+    """
+    if scheduler["type"].lower() == interproscan.jobs.LOCAL:
+        if resources is not None:
+            kwargs["args"] = (resources,
+                              scheduler.get("cpu", 1),
+                              scheduler.get("mem", 0),
+                              kwargs.pop("fn"),
+                              *kwargs.get("args", ()))
+            kwargs["fn"] = interproscan.jobs.run_with_resources
+
+        # Task run in a child process of the workflow, on the current machine
+        scheduler = None
+
+    return Task(scheduler=scheduler, **kwargs)
 
 
 def get_pronto_tasks(ora_ipr_uri: str,
@@ -17,7 +46,9 @@ def get_pronto_tasks(ora_ipr_uri: str,
                      data_dir: str,
                      temp_dir: str,
                      scheduler: str,
-                     queue: str) -> list[Task]:
+                     queue: str,
+                     resources: interproscan.jobs.LocalResources | None = None
+                     ) -> list[Task]:
     """
     Create the list of tasks to update the Pronto database
     :param ora_ipr_uri: connection string of InterPro Oracle database
@@ -27,42 +58,47 @@ def get_pronto_tasks(ora_ipr_uri: str,
     :param pg_ipr_uri: connection string of Pronto PostgreSQL database
     :param data_dir: path to directory to store/load data files
     :param temp_dir: path to temporary directory for transient files
-    :param scheduler: job scheduler
+    :param scheduler: job scheduler, or "local" to run tasks on this machine
     :param queue: job queue/partition
+    :param resources: CPU/memory slots shared by local tasks
     """
     names_db = os.path.join(data_dir, "names.sqlite")
     matches_file = os.path.join(data_dir, "matches")
     tasks = [
-        Task(
+        get_task(
             fn=pronto.match.create_match_table,
             args=(pg_ipr_uri,),
             name="init-matches",
-            scheduler=dict(type=scheduler, queue=queue, mem=100, hours=1)
+            scheduler=get_scheduler(scheduler, queue, mem=100, hours=1),
+            resources=resources
         ),
 
         # Data from PDBE
-        Task(
+        get_task(
             fn=pronto.match.import_pdb_matches,
             args=(ora_pdbe_uri, ora_ipr_uri, pg_ipr_uri),
             name="structures",
-            scheduler=dict(type=scheduler, queue=queue, mem=1000, hours=6)
+            scheduler=get_scheduler(scheduler, queue, mem=1000, hours=6),
+            resources=resources
         ),
     ]
 
     if ora_goa_uri:
         # Import data from GOA database
         goa_tasks = [
-            Task(
+            get_task(
                 fn=pronto.goa.import_annotations,
                 args=(ora_goa_uri, pg_ipr_uri),
                 name="go-terms",
-                scheduler=dict(type=scheduler, queue=queue, mem=500, hours=1)
+                scheduler=get_scheduler(scheduler, queue, mem=500, hours=1),
+                resources=resources
             ),
-            Task(
+            get_task(
                 fn=pronto.goa.import_go_constraints,
                 args=(ora_goa_uri, pg_ipr_uri),
                 name="go-constraints",
-                scheduler=dict(type=scheduler, queue=queue, mem=500, hours=1)
+                scheduler=get_scheduler(scheduler, queue, mem=500, hours=1),
+                resources=resources
             ),
         ]
     else:
@@ -71,30 +107,34 @@ def get_pronto_tasks(ora_ipr_uri: str,
     if ora_swp_uri:
         # Import data from Swiss-Prot database
         swp_tasks = [
-            Task(
+            get_task(
                 fn=pronto.protein.import_similarity_comments,
                 args=(ora_swp_uri, pg_ipr_uri),
                 name="proteins-similarities",
-                scheduler=dict(type=scheduler, queue=queue, mem=100, hours=3)
+                scheduler=get_scheduler(scheduler, queue, mem=100, hours=3),
+                resources=resources
             ),
-            Task(
+            get_task(
                 fn=pronto.protein.import_protein_names,
                 args=(ora_swp_uri, pg_ipr_uri, names_db),
                 kwargs=dict(tmpdir=temp_dir),
                 name="proteins-names",
-                scheduler=dict(type=scheduler, queue=queue, mem=2000, hours=24)
+                scheduler=get_scheduler(scheduler, queue, mem=2000, hours=24),
+                resources=resources
             ),
-            Task(
+            get_task(
                 fn=pronto.protein.import_protein_pubmed,
                 args=(ora_swp_uri, pg_ipr_uri),
                 name="proteins-pubmed",
-                scheduler=dict(type=scheduler, queue=queue, mem=1000, hours=3)
+                scheduler=get_scheduler(scheduler, queue, mem=1000, hours=3),
+                resources=resources
             ),
-            Task(
+            get_task(
                 fn=pronto.proteome.import_proteomes,
                 args=(ora_swp_uri, pg_ipr_uri),
                 name="proteomes",
-                scheduler=dict(type=scheduler, queue=queue, mem=100, hours=6)
+                scheduler=get_scheduler(scheduler, queue, mem=100, hours=6),
+                resources=resources
             ),
         ]
     else:
@@ -102,81 +142,91 @@ def get_pronto_tasks(ora_ipr_uri: str,
 
     return tasks + swp_tasks + goa_tasks + [
         # Data from IPPRO
-        Task(
+        get_task(
             fn=pronto.database.import_databases,
             args=(ora_ipr_uri, pg_ipr_uri),
             name="databases",
-            scheduler=dict(type=scheduler, queue=queue, mem=100, hours=1)
+            scheduler=get_scheduler(scheduler, queue, mem=100, hours=1),
+            resources=resources
         ),
-        Task(
+        get_task(
             fn=pronto.protein.import_proteins,
             args=(ora_ipr_uri, pg_ipr_uri),
             name="proteins",
-            scheduler=dict(type=scheduler, queue=queue, mem=1000, hours=6)
+            scheduler=get_scheduler(scheduler, queue, mem=1000, hours=6),
+            resources=resources
         ),
-        Task(
+        get_task(
             fn=pronto.match.export,
             args=(ora_ipr_uri, matches_file),
             kwargs=dict(tmpdir=temp_dir),
             name="export-matches",
-            scheduler=dict(type=scheduler, queue=queue, mem=4000, hours=24)
+            scheduler=get_scheduler(scheduler, queue, mem=4000, hours=24),
+            resources=resources
         ),
-        Task(
+        get_task(
             fn=pronto.match.insert_fmatches,
             args=(ora_ipr_uri, pg_ipr_uri),
             name="insert-fmatches",
-            scheduler=dict(type=scheduler, queue=queue, mem=1000, hours=3),
+            scheduler=get_scheduler(scheduler, queue, mem=1000, hours=3),
+            resources=resources,
             requires=["databases", "init-matches"]
         ),
-        Task(
+        get_task(
             fn=pronto.match.insert_matches,
             args=(pg_ipr_uri, matches_file),
             kwargs=dict(processes=8),
             name="insert-matches",
-            scheduler=dict(type=scheduler, queue=queue, cpu=8, mem=8000,
-                           hours=6),
+            scheduler=get_scheduler(scheduler, queue, cpu=8, mem=8000,
+                                    hours=6),
+            resources=resources,
             requires=["databases", "export-matches", "init-matches"]
         ),
-        Task(
+        get_task(
             fn=pronto.match.finalize_match_table,
             args=(pg_ipr_uri,),
             name="index-matches",
-            scheduler=dict(type=scheduler, queue=queue, mem=100, hours=18),
+            scheduler=get_scheduler(scheduler, queue, mem=100, hours=18),
+            resources=resources,
             requires=["insert-fmatches", "insert-matches"]
         ),
-        Task(
+        get_task(
             fn=pronto.match.insert_signature2protein,
             args=(pg_ipr_uri, names_db, matches_file),
             kwargs=dict(processes=8, tmpdir=temp_dir),
             name="insert-signature2proteins",
-            scheduler=dict(type=scheduler, queue=queue, cpu=8, mem=4000,
-                           hours=12),
+            scheduler=get_scheduler(scheduler, queue, cpu=8, mem=4000,
+                                    hours=12),
+            resources=resources,
             # We only need proteins-names if importing data from Swiss-Prot
             # However, we always need the latest matches file
             requires=(["export-matches"] +
                       (["proteins-names"] if ora_swp_uri else []))
         ),
-        Task(
+        get_task(
             fn=pronto.match.finalize_signature2protein,
             args=(pg_ipr_uri,),
             name="index-signature2proteins",
-            scheduler=dict(type=scheduler, queue=queue, mem=100, hours=12),
+            scheduler=get_scheduler(scheduler, queue, mem=100, hours=12),
+            resources=resources,
             requires=["insert-signature2proteins"]
         ),
-        Task(
+        get_task(
             fn=pronto.signature.insert_signatures,
             args=(ora_ipr_uri, pg_ipr_uri, matches_file),
             kwargs=dict(processes=8),
             name="signatures",
-            scheduler=dict(type=scheduler, queue=queue, cpu=8, mem=16000,
-                           hours=6),
+            scheduler=get_scheduler(scheduler, queue, cpu=8, mem=16000,
+                                    hours=6),
+            resources=resources,
             requires=["databases", "export-matches"]
         ),
-        Task(
+        get_task(
             fn=pronto.taxon.import_taxonomy,
             args=(ora_ipr_uri, pg_ipr_uri),
             name="taxonomy",
-            scheduler=dict(type=scheduler, queue=queue, mem=2000, hours=12),
+            scheduler=get_scheduler(scheduler, queue, mem=2000, hours=12),
+            resources=resources
         ),
         Task(
             fn=pronto.database.set_ready,
@@ -231,6 +281,20 @@ def run_clan_update():
                         help="number of alignment workers")
     parser.add_argument("-T", "--tempdir",
                         help="directory to use for temporary files")
+    parser.add_argument("--batch", action="store_true", default=False,
+                        help="search all consensus sequences in a few "
+                             "hmmscan runs instead of one run per model "
+                             "(HMM-based databases only)")
+    parser.add_argument("--fast-consensus", action="store_true",
+                        default=False,
+                        help="compute consensus sequences in-process "
+                             "instead of running hmmemit "
+                             "(HMM-based databases only)")
+    parser.add_argument("--validate-consensus", action="store_true",
+                        default=False,
+                        help="compare in-process consensus sequences "
+                             "with hmmemit's, and exit without updating "
+                             "clans (HMM-based databases only)")
     args = parser.parse_args()
 
     if not os.path.isfile(args.config):
@@ -253,12 +317,21 @@ def run_clan_update():
 
     kwargs = {
         "threads": args.threads,
-        "tmpdir": args.tempdir
+        "tmpdir": args.tempdir,
+        "batch": args.batch,
+        "fast_consensus": args.fast_consensus
     }
 
     for dbname, database in databases.items():
         params = options[dbname]
-        if dbname == "cdd":
+        if args.validate_consensus:
+            if dbname != "cdd":
+                mismatches = validate_consensus(params["hmm"])
+                print(f"{dbname}: {len(mismatches)} "
+                      f"mismatched consensus sequences")
+                for name in mismatches:
+                    print(f"\t{name}")
+        elif dbname == "cdd":
             update_cdd_clans(ora_interpro_uri, database,
                              cddmasters=params["fasta"],
                              cddid=params["summary"],
@@ -419,6 +492,7 @@ def run_member_db_update():
                 args=(ora_iprscan_uri, "matches"),
                 kwargs=dict(databases=member_dbs + feature_dbs + site_dbs,
                             force=True,
+                            incremental=True,
                             threads=8),
                 name="update-ipm-matches",
                 scheduler=dict(type=scheduler, queue=queue, mem=100, hours=48)
@@ -475,13 +549,16 @@ def run_member_db_update():
             Task(
                 fn=interpro.match.insert_toad_matches,
                 args=(ora_interpro_uri, member_dbs, toad_sources),
+                kwargs=dict(processes=8),
                 name="update-tmatches",
-                scheduler=dict(type=scheduler, queue=queue, mem=24000, hours=24),
+                scheduler=dict(type=scheduler, queue=queue, cpu=8, mem=24000,
+                               hours=24),
                 requires=["update-signatures"]
             ),
             Task(
                 fn=interpro.match.update_variant_matches,
                 args=(ora_interpro_uri,),
+                kwargs=dict(databases=member_dbs),
                 name="update-varsplic",
                 scheduler=dict(type=scheduler, queue=queue, mem=100, hours=2),
                 requires=ipm_dependencies + ["update-signatures"]
@@ -548,7 +625,8 @@ def run_member_db_update():
             Task(
                 fn=interpro.iprscan.import_matches_or_sites,
                 args=(ora_iprscan_uri, "sites"),
-                kwargs=dict(databases=site_dbs, force=True, threads=2),
+                kwargs=dict(databases=site_dbs, force=True,
+                            incremental=True, threads=2),
                 name="update-ipm-sites",
                 scheduler=dict(type=scheduler, queue=queue, mem=100, hours=72),
             ),
@@ -628,6 +706,12 @@ def run_pronto_update():
     parser.add_argument("--detach",
                         action="store_true",
                         help="enqueue tasks to run and exit")
+    parser.add_argument("--local-cpu", type=int,
+                        help="CPUs available to local tasks "
+                             "(default: all)")
+    parser.add_argument("--local-mem", type=int, metavar="MB",
+                        help="memory available to local tasks "
+                             "(default: all)")
     args = parser.parse_args()
 
     if not os.path.isfile(args.config):
@@ -647,11 +731,21 @@ def run_pronto_update():
     temp_dir = config["misc"]["temporary_dir"]
     wflow_dir = config["misc"]["workflows_dir"]
 
+    database = os.path.join(wflow_dir, f"{uniprot_version}_pronto.sqlite")
+    if scheduler.lower() == interproscan.jobs.LOCAL:
+        # Slots shared by task processes, through a file
+        resources = interproscan.jobs.LocalResources(
+            args.local_cpu,
+            args.local_mem,
+            path=os.path.join(wflow_dir, f"{uniprot_version}_pronto.slots")
+        )
+    else:
+        resources = None
+
     tasks = get_pronto_tasks(ora_interpro_uri, ora_swpread_uri, ora_goa_uri,
                              ora_pdbe_uri, pg_uri, data_dir, temp_dir,
-                             scheduler, queue)
+                             scheduler, queue, resources)
 
-    database = os.path.join(wflow_dir, f"{uniprot_version}_pronto.sqlite")
     with Workflow(tasks, dir=wflow_dir, database=database) as wf:
         if wf.run(args.tasks, dry_run=args.dry_run, monitor=not args.detach):
             sys.exit(0)
@@ -709,15 +803,18 @@ def run_uniprot_update():
         Task(
             fn=uniprot.uniparc.update_proteins,
             args=(ora_uniparc_uri, ora_uaread_uri),
-            kwargs=dict(top_up=True),
+            kwargs=dict(top_up=True, threads=8),
             name="update-uniparc-proteins",
-            scheduler=dict(type=scheduler, queue=queue, mem=100, hours=6),
+            scheduler=dict(type=scheduler, queue=queue, cpu=8, mem=2000,
+                           hours=6),
         ),
         Task(
             fn=uniprot.uniparc.update_xrefs,
             args=(ora_uniparc_uri, ora_uaread_uri),
+            kwargs=dict(threads=8),
             name="update-uniparc-xrefs",
-            scheduler=dict(type=scheduler, queue=queue, mem=1000, hours=36),
+            scheduler=dict(type=scheduler, queue=queue, cpu=8, mem=4000,
+                           hours=36),
         ),
 
         # Data from UniProt
@@ -745,7 +842,7 @@ def run_uniprot_update():
         Task(
             fn=interpro.iprscan.import_matches_or_sites,
             args=(ora_iprscan_uri, "matches"),
-            kwargs=dict(force=True, threads=8),
+            kwargs=dict(force=True, incremental=True, threads=8),
             name="update-ipm-matches",
             scheduler=dict(type=scheduler, queue=queue, mem=100, hours=72),
             requires=["update-uniparc-proteins"]
@@ -753,7 +850,7 @@ def run_uniprot_update():
         Task(
             fn=interpro.iprscan.import_matches_or_sites,
             args=(ora_iprscan_uri, "sites"),
-            kwargs=dict(force=True, threads=2),
+            kwargs=dict(force=True, incremental=True, threads=2),
             name="update-ipm-sites",
             scheduler=dict(type=scheduler, queue=queue, mem=100, hours=72),
             requires=["update-uniparc-proteins"]
@@ -991,6 +1088,9 @@ def run_interproscan_manager():
     parser_import.add_argument("--top-up", action="store_true", default=False,
                                help="import new sequences instead of importing"
                                     " all sequences (default: off)")
+    parser_import.add_argument("--workers", type=int, default=8,
+                               help="number of UPI ranges imported "
+                                    "concurrently (default: 8)")
 
     parser_clean = subparsers.add_parser("clean", help="delete obsolete data")
     parser_clean.add_argument("-a", "--analyses", nargs="*", default=[],
@@ -1017,10 +1117,27 @@ def run_interproscan_manager():
     parser_search.add_argument("--max-retries", type=int, default=-0,
                                help="maximum number of attempts to re-run "
                                     "a job after it fails (default: 0)")
+    parser_search.add_argument("--target-runtime", type=float, default=None,
+                               metavar="HOURS",
+                               help="size jobs to run for about HOURS, "
+                                    "using past jobs to estimate their cost "
+                                    "(default: off)")
+    parser_search.add_argument("--combine", action="store_true",
+                               default=False,
+                               help="run lightweight analyses (e.g. COILS, "
+                                    "Phobius, TMHMM) searching the same "
+                                    "sequences in the same job "
+                                    "(default: off)")
     parser_search.add_argument("--keep", choices=["none", "failed", "all"],
                                default="none",
                                help="keep jobs' input/output files "
                                     "(default: none)")
+    parser_search.add_argument("--local-cpu", type=int,
+                               help="CPUs available to jobs, if run on "
+                                    "the current machine (default: all)")
+    parser_search.add_argument("--local-mem", type=int, metavar="MB",
+                               help="memory available to jobs, if run on "
+                                    "the current machine (default: all)")
     args = parser.parse_args()
 
     if not os.path.isfile(args.config):
@@ -1041,7 +1158,8 @@ def run_interproscan_manager():
         interproscan.uniparc.import_sequences(ispro_uri=iscn_uniparc_uri,
                                               uniparc_uri=unpr_uniparc_uri,
                                               top_up=args.top_up,
-                                              max_upi=args.max_upi)
+                                              max_upi=args.max_upi,
+                                              workers=args.workers)
     elif args.mode == "clean":
         interproscan.utils.clean_tables(iscn_iprscan_uri, args.analyses)
 
@@ -1095,8 +1213,15 @@ def run_interproscan_manager():
                                  max_retries=args.max_retries,
                                  # Concurrent jobs
                                  max_running_jobs=args.concurrent_jobs,
+                                 # CPU/memory available to local jobs
+                                 local_cpu=args.local_cpu,
+                                 local_mem=args.local_mem,
                                  # Max jobs submitted per analysis
                                  max_jobs_per_analysis=args.max_jobs,
+                                 # Job sizing based on past jobs
+                                 target_runtime=args.target_runtime,
+                                 # Lightweight analyses in the same jobs
+                                 combine=args.combine,
                                  # Analyses to perform
                                  analyses=args.analyses,
                                  # Analyses to exclude
@@ -1,10 +1,12 @@
 import argparse
 import json
+import math
 import os
 import re
 import shutil
 import subprocess as sp
 import sys
+import time
 from concurrent import futures
 from tempfile import mkdtemp, mkstemp
 from typing import Optional
@@ -12,7 +14,8 @@ from typing import Optional
 import oracledb
 
 from pyinterprod import logger
-from pyinterprod.utils import oracle
+from pyinterprod.utils import Table, oracle
+from pyinterprod.utils.io import iter_hmm_records
 from .database import Database
 from . import contrib
 
@@ -20,6 +23,8 @@ HMM_SUFFIX = ".hmm"
 SEQ_SUFFIX = ".fa"
 DOM_SUFFIX = ".tab"
 OUT_SUFFIX = ".out"
+# Longest CLAN_MATCH.DOMAINS value bound as VARCHAR2 rather than CLOB
+_MAX_VARCHAR_SIZE = 4000
 
 
 def calc_dir_size(dirpath: str) -> int:
@@ -113,26 +118,173 @@ def load_sequence(seqfile: str) -> str:
 
 
 def iter_models(hmmdb: str):
-    with open(hmmdb, "rt") as fh:
-        reg_acc = re.compile(r"ACC\s+(\w+)", flags=re.M)
-        reg_name = re.compile(r"^NAME\s+(PTHR\d+)\.(SF\d+)?", flags=re.M)
-        hmm = ""
-        for line in fh:
-            hmm += line
+    reg_acc = re.compile(r"\w+")
+    reg_name = re.compile(r"(PTHR\d+)\.(SF\d+)?")
+    for record in iter_hmm_records(hmmdb):
+        try:
+            accession = reg_acc.match(record.header["ACC"]).group()
+        except KeyError:
+            # PANTHER: accessions in the NAME field
+            m = reg_name.match(record.header["NAME"])
+            accession, prefix = m.groups()
+            if prefix is not None:
+                accession += ':' + prefix
 
-            if line[:2] == "//":
-                m = reg_acc.search(hmm)
-                if m:
-                    accession = m.group(1)
-                else:
-                    # PANTHER: accessions in the NAME field
-                    m = reg_name.search(hmm)
-                    accession, prefix = m.groups()
-                    if prefix is not None:
-                        accession += ':' + prefix
+        yield accession, record.data
+
+
+def get_consensus(hmm: bytes | memoryview) -> str:
+    """
+    Compute the majority-rule consensus sequence of a model,
+    i.e. the most probable residue of each match state (as `hmmemit -c`)
+
+    :param hmm: HMMER3 model
+    :return: consensus sequence
+    """
+    lines = iter(bytes(hmm).decode("utf-8").splitlines())
+    masked = False
+    unknown = "x"
+    for line in lines:
+        if line.startswith("ALPH"):
+            if line.split()[1].lower() != "amino":
+                unknown = "n"
+        elif line.startswith("MM "):
+            # Masked positions (HMMER3/f)
+            masked = line.split()[1] == "yes"
+        elif line.startswith("HMM "):
+            alphabet = line.split()[1:]
+            break
+    else:
+        raise ValueError("invalid model: 'HMM' line not found")
+
+    size = len(alphabet)
+    residues = []
+    for line in lines:
+        fields = line.split()
+        if not fields or not fields[0].isdigit():
+            # COMPO, insert emission, or transition line
+            continue
+
+        # Match state: emissions are -log(probability), '*' for zero
+        if masked and fields[size + 4] == "m":
+            residues.append(unknown)
+            continue
+
+        best = None
+        best_score = math.inf
+        for i, value in enumerate(fields[1:size + 1]):
+            score = math.inf if value == "*" else float(value)
+            if score < best_score:
+                # First most probable residue on ties
+                best = i
+                best_score = score
+
+        residues.append(alphabet[best].upper())
+
+    return "".join(residues)
+
+
+def format_fasta(name: str, sequence: str, width: int = 60) -> str:
+    lines = [f">{name}"]
+    for i in range(0, len(sequence), width):
+        lines.append(sequence[i:i + width])
+
+    return "\n".join(lines) + "\n"
+
+
+def validate_consensus(hmmdb: str) -> list[str]:
+    """
+    Compare the consensus sequences of get_consensus() with `hmmemit -c`
+
+    :param hmmdb: path to an HMM file
+    :return: names of models whose consensus sequences differ
+    """
+    process = sp.run(["hmmemit", "-c", hmmdb], capture_output=True,
+                     text=True, check=True)
+    expected = process.stdout.split(">")[1:]
+
+    mismatches = []
+    for i, record in enumerate(iter_hmm_records(hmmdb)):
+        name = record.header["NAME"]
+        fasta = format_fasta(f"{name}-consensus", get_consensus(record.data))
+        if i >= len(expected) or f">{expected[i]}" != fasta:
+            mismatches.append(name)
+
+    return mismatches
+
+
+def emit_consensus(hmmdb: str, models: set[str], workdir: str,
+                   threads: int | None = None,
+                   fast: bool = False) -> dict[str, str]:
+    """
+    Emit the consensus sequences of models with `hmmemit -c`
+
+    :param hmmdb: path to an HMM file
+    :param models: accessions of the models to emit
+    :param workdir: directory for temporary files
+    :param threads: number of hmmemit processes
+    :param fast: if True, compute consensus sequences in-process
+                 with get_consensus() (see validate_consensus())
+    :return: dictionary of model accession -> consensus sequence
+    """
+    sequences = {}
+    prefixes = {}
+    num_duplicates = 0
+    for model_acc, hmm in iter_models(hmmdb):
+        if model_acc not in models:
+            # Ignore models not belonging to a clan
+            continue
+        elif model_acc in sequences or model_acc in prefixes:
+            num_duplicates += 1
+            continue
+
+        if fast:
+            sequences[model_acc] = get_consensus(hmm)
+        else:
+            prefix = os.path.join(workdir, model_acc)
+            with open(prefix + HMM_SUFFIX, "wb") as fh:
+                fh.write(hmm)
+
+            prefixes[model_acc] = prefix
+
+    if num_duplicates:
+        raise RuntimeError(f"HMM database {hmmdb} contains "
+                           f"{num_duplicates} duplicated models.")
+
+    with futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        fs = {}
+        for model_acc, prefix in prefixes.items():
+            f = executor.submit(run_hmmemit, prefix + HMM_SUFFIX,
+                                prefix + SEQ_SUFFIX)
+            fs[f] = model_acc
+
+        errors = 0
+        for f in futures.as_completed(fs):
+            try:
+                f.result()
+            except sp.CalledProcessError:
+                logger.error(f"{fs[f]}")
+                errors += 1
+
+    for model_acc, prefix in prefixes.items():
+        if not errors:
+            sequences[model_acc] = load_sequence(prefix + SEQ_SUFFIX)
+
+        for suffix in (HMM_SUFFIX, SEQ_SUFFIX):
+            try:
+                os.remove(prefix + suffix)
+            except FileNotFoundError:
+                pass
+
+    if errors:
+        raise RuntimeError(f"{errors} error(s)")
 
-                yield accession, hmm
-                hmm = ""
+    return sequences
+
+
+def run_hmmemit(hmmdb: str, seqfile: str):
+    sp.run(args=["hmmemit", "-c", "-o", seqfile, hmmdb],
+           stderr=sp.DEVNULL, stdout=sp.DEVNULL, check=True)
 
 
 def iter_sequences(seqfile: str):
@@ -427,15 +579,21 @@ def run_compass(seqfile: str, database: str, outfile: str):
     return False
 
 
-def run_hmmemit(hmmdb: str, seqfile: str):
-    sp.run(args=["hmmemit", "-c", "-o", seqfile, hmmdb],
-           stderr=sp.DEVNULL, stdout=sp.DEVNULL, check=True)
-
+def run_hmmscan(hmmdb: str, seqfile: str, domfile: str, outfile: str,
+                query: str | None = None) -> bool:
+    """
+    Search sequences against an HMM database
 
-def run_hmmscan(hmmdb: str, seqfile: str, domfile: str, outfile: str) -> bool:
+    :param hmmdb: path to the (pressed) HMM database
+    :param seqfile: path to the sequence file, or "-" to read `query`
+    :param domfile: path to the domain table output file
+    :param outfile: path to the output file
+    :param query: FASTA-formatted sequences, passed to hmmscan's stdin
+    """
     args = ["hmmscan", "-o", outfile, "--domtblout", domfile, "--cpu", "1",
             hmmdb, seqfile]
-    process = sp.run(args=args, stderr=sp.DEVNULL, stdout=sp.DEVNULL)
+    process = sp.run(args=args, input=query, text=True,
+                     stderr=sp.DEVNULL, stdout=sp.DEVNULL)
 
     if process.returncode == 0:
         return True
@@ -449,6 +607,130 @@ def run_hmmscan(hmmdb: str, seqfile: str, domfile: str, outfile: str) -> bool:
     return False
 
 
+class _ClanLoader:
+    """
+    Accumulate CLAN, CLAN_MEMBER, and CLAN_MATCH rows across models
+    and insert them with large array binds.
+    Clans are flushed before their members, and members before their matches
+    (foreign keys).
+    """
+
+    def __init__(self, uri: str, dbcode: str, clans: dict, mem2clan: dict):
+        self.con = oracledb.connect(uri)
+        self.dbcode = dbcode
+        self.clans = clans
+        self.mem2clan = mem2clan
+        self.t_clans = Table(
+            self.con,
+            "INSERT INTO INTERPRO.CLAN VALUES (:1, :2, :3, :4)",
+            buffer_size=1000
+        )
+        self.t_members = Table(
+            self.con,
+            "INSERT INTO INTERPRO.CLAN_MEMBER VALUES (:1, :2, :3, :4)",
+            buffer_size=10000,
+            depends_on=self.t_clans
+        )
+
+        # Short JSON strings avoid LOB locators
+        mtch_sql = "INSERT INTO INTERPRO.CLAN_MATCH VALUES (:1, :2, :3, :4)"
+        self.t_matches = Table(
+            self.con, mtch_sql,
+            buffer_size=10000,
+            depends_on=self.t_members,
+            input_sizes=[25, 25, oracledb.DB_TYPE_BINARY_DOUBLE,
+                         _MAX_VARCHAR_SIZE]
+        )
+        self.t_lobs = Table(
+            self.con, mtch_sql,
+            buffer_size=100,
+            depends_on=self.t_members,
+            input_sizes=[25, 25, oracledb.DB_TYPE_BINARY_DOUBLE,
+                         oracledb.DB_TYPE_CLOB]
+        )
+
+    def add(self, model_acc: str, length: int, targets: list[tuple]):
+        """
+        :param model_acc: accession of the query model
+        :param length: length of the query sequence
+        :param targets: list of (target accession, e-value, domains)
+        """
+        clan_acc, score = self.mem2clan[model_acc]
+
+        try:
+            clan = self.clans.pop(clan_acc)
+        except KeyError:
+            # Clan already inserted
+            pass
+        else:
+            self.t_clans.insert((clan.accession, self.dbcode, clan.name,
+                                 clan.description))
+
+        self.t_members.insert((clan_acc, model_acc, length, score))
+
+        for target_acc, evalue, domains in targets:
+            if target_acc == model_acc:
+                continue
+
+            domains = json.dumps(domains)
+            record = (model_acc, target_acc, evalue, domains)
+            if len(domains) <= _MAX_VARCHAR_SIZE:
+                self.t_matches.insert(record)
+            else:
+                self.t_lobs.insert(record)
+
+    def close(self):
+        for t in (self.t_clans, self.t_members, self.t_matches, self.t_lobs):
+            t.close()
+
+        self.con.commit()
+        self.con.close()
+
+
+def search_compass(seqfile: str, database: str, outfile: str,
+                   id2acc: dict[str, str]) -> tuple[int, list] | None:
+    """
+    Search a sequence against a COMPASS database and parse the results
+
+    :return: (sequence length, list of (target accession, e-value, domains)),
+             or None if the search failed
+    """
+    if not run_compass(seqfile, database, outfile):
+        return None
+
+    targets = []
+    for target in load_compass_results(outfile):
+        targets.append((id2acc[target["id"]], target["evalue"],
+                        [(target["start"], target["end"])]))
+
+    return len(load_sequence(seqfile)), targets
+
+
+def search_hmmscan(hmmdb: str, domfile: str, outfile: str,
+                   query: str) -> list[tuple] | None:
+    """
+    Search a sequence against an HMM database and parse the results
+
+    :return: list of (target accession, e-value, domains),
+             or None if the search failed
+    """
+    if not run_hmmscan(hmmdb, "-", domfile, outfile, query):
+        return None
+
+    targets = []
+    for target in load_hmmscan_results(outfile, domfile):
+        domains = []
+        for dom in target["domains"]:
+            domains.append((
+                dom["coordinates"]["ali"]["start"],
+                dom["coordinates"]["ali"]["end"]
+            ))
+
+        targets.append((target["accession"], target["evalue"], domains))
+
+    return targets
+
+
 def update_cdd_clans(url: str, database: Database, cddmasters: str,
                      cddid: str, fam2supfam: str, **kwargs):
     """
@@ -525,67 +807,33 @@ def update_cdd_clans(url: str, database: Database, cddmasters: str,
         for model_acc, prefix in seqfiles.items():
             seqfile = prefix + SEQ_SUFFIX
             outfile = prefix + OUT_SUFFIX
-            f = executor.submit(run_compass, seqfile, profile_db, outfile)
-            fs[f] = (model_acc, prefix)
-
-        con = oracledb.connect(url)
-        cur = con.cursor()
-        cur2 = con.cursor()
-        cur2.setinputsizes(25, 25, oracledb.DB_TYPE_BINARY_DOUBLE,
-                           oracledb.DB_TYPE_CLOB)
+            f = executor.submit(search_compass, seqfile, profile_db,
+                                outfile, id2acc)
+            fs[f] = model_acc
 
-        clan_sql = "INSERT INTO INTERPRO.CLAN VALUES (:1, :2, :3, :4)"
-        memb_sql = "INSERT INTO INTERPRO.CLAN_MEMBER VALUES (:1, :2, :3, :4)"
-        mtch_sql = "INSERT INTO INTERPRO.CLAN_MATCH VALUES (:1, :2, :3, :4)"
+        # Results are loaded while remaining searches are running
+        loader = _ClanLoader(url, database.identifier, clans_to_insert,
+                             mem2clan)
         completed = errors = progress = 0
         for f in futures.as_completed(fs):
-            model_acc, prefix = fs[f]
+            model_acc = fs[f]
             completed += 1
 
-            if not f.result():
+            result = f.result()
+            if result is None:
                 logger.error(f"{model_acc}")
                 errors += 1
                 continue
 
-            clan_acc, score = mem2clan[model_acc]
-            sequence = load_sequence(prefix + SEQ_SUFFIX)
-
-            try:
-                clan = clans_to_insert.pop(clan_acc)
-            except KeyError:
-                # Clan already inserted
-                pass
-            else:
-                cur.execute(clan_sql, (clan.accession, database.identifier,
-                                       clan.name, clan.description))
-
-            cur.execute(memb_sql, (clan_acc, model_acc, len(sequence), score))
-
-            matches = []
-            for target in load_compass_results(prefix + OUT_SUFFIX):
-                target_acc = id2acc[target["id"]]
-                if target_acc == model_acc:
-                    continue
-
-                matches.append((
-                    model_acc,
-                    target_acc,
-                    target["evalue"],
-                    json.dumps([(target["start"], target["end"])])
-                ))
-
-            if matches:
-                cur2.executemany(mtch_sql, matches)
+            length, targets = result
+            loader.add(model_acc, length, targets)
 
             pc = completed * 100 // len(fs)
             if pc > progress:
                 progress = pc
                 logger.debug(f"{progress:>10}%")
 
-        con.commit()
-        cur.close()
-        cur2.close()
-        con.close()
+        loader.close()
 
         size = calc_dir_size(workdir)
         logger.info(f"disk usage: {size / 1024 ** 2:,.0f} MB")
@@ -603,6 +851,7 @@ def update_hmm_clans(uri: str, database: Database, hmmdb: str, **kwargs):
     """
     threads = kwargs.get("threads")
     tmpdir = kwargs.get("tmpdir")
+    fast = kwargs.get("fast_consensus", False)
 
     if tmpdir:
         os.makedirs(tmpdir, exist_ok=True)
@@ -637,19 +886,28 @@ def update_hmm_clans(uri: str, database: Database, hmmdb: str, **kwargs):
             mem2clan[m["accession"]] = (c.accession, m["score"])
 
     workdir = mkdtemp(dir=tmpdir)
-    num_duplicates = 0
+    if kwargs.get("batch"):
+        _update_hmm_clans_batch(uri, database, hmmdb, clans_to_insert,
+                                mem2clan, workdir, threads, fast)
+        return
+
     with futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        ts = time.time()
         logger.info("emitting consensus sequences")
-        fs = {}
-        models = set()
-        for model_acc, hmm in iter_models(hmmdb):
-            if model_acc not in mem2clan:
-                # Ignore models not belonging to a clan
-                continue
-            elif model_acc in models:
-                num_duplicates += 1
-                continue
+        try:
+            sequences = emit_consensus(hmmdb, set(mem2clan), workdir,
+                                       threads, fast=fast)
+        except Exception:
+            shutil.rmtree(workdir)
+            raise
+
+        logger.info(f"consensus sequences emitted in "
+                    f"{time.time() - ts:.0f}s")
 
+        ts = time.time()
+        logger.info("searching consensus sequences")
+        fs = {}
+        for model_acc, sequence in sequences.items():
             subdir = os.path.join(workdir, getsubdir(model_acc))
             try:
                 os.mkdir(subdir)
@@ -657,102 +915,37 @@ def update_hmm_clans(uri: str, database: Database, hmmdb: str, **kwargs):
                 pass
 
             prefix = os.path.join(subdir, model_acc)
-            hmmfile = prefix + HMM_SUFFIX
-            with open(hmmfile, "wt") as fh:
-                fh.write(hmm)
-
-            seqfile = prefix + SEQ_SUFFIX
-            f = executor.submit(run_hmmemit, hmmfile, seqfile)
-            fs[f] = model_acc
-            models.add(model_acc)
-
-        done, not_done = futures.wait(fs)
-        if not_done:
-            shutil.rmtree(workdir)
-            raise RuntimeError(f"{len(not_done)} error(s)")
-        elif num_duplicates:
-            shutil.rmtree(workdir)
-            raise RuntimeError(f"HMM database {hmmdb} contains "
-                               f"{num_duplicates} duplicated models.")
-
-        logger.info("searching consensus sequences")
-        fs = {}
-        for model_acc in models:
-            prefix = os.path.join(workdir, getsubdir(model_acc), model_acc)
-            seqfile = prefix + SEQ_SUFFIX
             outfile = prefix + OUT_SUFFIX
             domfile = prefix + DOM_SUFFIX
-            f = executor.submit(run_hmmscan, hmmdb, seqfile, domfile, outfile)
+            query = format_fasta(model_acc, sequence)
+            f = executor.submit(search_hmmscan, hmmdb, domfile, outfile,
+                                query)
             fs[f] = model_acc
 
-        con = oracledb.connect(uri)
-        cur = con.cursor()
-        cur2 = con.cursor()
-        cur2.setinputsizes(25, 25, oracledb.DB_TYPE_BINARY_DOUBLE,
-                           oracledb.DB_TYPE_CLOB)
-
-        clan_sql = "INSERT INTO INTERPRO.CLAN VALUES (:1, :2, :3, :4)"
-        memb_sql = "INSERT INTO INTERPRO.CLAN_MEMBER VALUES (:1, :2, :3, :4)"
-        mtch_sql = "INSERT INTO INTERPRO.CLAN_MATCH VALUES (:1, :2, :3, :4)"
+        # Results are loaded while remaining searches are running
+        loader = _ClanLoader(uri, database.identifier, clans_to_insert,
+                             mem2clan)
         completed = errors = progress = 0
         for f in futures.as_completed(fs):
             model_acc = fs[f]
             completed += 1
 
-            if not f.result():
+            targets = f.result()
+            if targets is None:
                 logger.error(f"{model_acc}")
                 errors += 1
                 continue
 
-            prefix = os.path.join(workdir, getsubdir(model_acc), model_acc)
-            outfile = prefix + OUT_SUFFIX
-            domfile = prefix + DOM_SUFFIX
-
-            clan_acc, score = mem2clan[model_acc]
-            sequence = load_sequence(prefix + SEQ_SUFFIX)
-
-            try:
-                clan = clans_to_insert.pop(clan_acc)
-            except KeyError:
-                # Clan already inserted
-                pass
-            else:
-                cur.execute(clan_sql, (clan.accession, database.identifier,
-                                       clan.name, clan.description))
-
-            cur.execute(memb_sql, (clan_acc, model_acc, len(sequence), score))
-
-            matches = []
-            for target in load_hmmscan_results(outfile, domfile):
-                if target["accession"] == model_acc:
-                    continue
-
-                domains = []
-                for dom in target["domains"]:
-                    domains.append((
-                        dom["coordinates"]["ali"]["start"],
-                        dom["coordinates"]["ali"]["end"]
-                    ))
-
-                matches.append((
-                    model_acc,
-                    target["accession"],
-                    target["evalue"],
-                    json.dumps(domains)
-                ))
-
-            if matches:
-                cur2.executemany(mtch_sql, matches)
+            loader.add(model_acc, len(sequences[model_acc]), targets)
 
             pc = completed * 100 // len(fs)
             if pc > progress:
                 progress = pc
                 logger.debug(f"{progress:>10}%")
 
-        con.commit()
-        cur.close()
-        cur2.close()
-        con.close()
+        logger.info(f"consensus sequences searched in "
+                    f"{time.time() - ts:.0f}s")
+        loader.close()
 
         size = calc_dir_size(workdir)
         logger.info(f"disk usage: {size / 1024 ** 2:,.0f} MB")
@@ -761,6 +954,144 @@ def update_hmm_clans(uri: str, database: Database, hmmdb: str, **kwargs):
             raise RuntimeError(f"{errors} error(s)")
 
 
+def _update_hmm_clans_batch(uri: str, database: Database, hmmdb: str,
+                            clans_to_insert: dict, mem2clan: dict,
+                            workdir: str, threads: int | None, fast: bool):
+    loader = _ClanLoader(uri, database.identifier, clans_to_insert, mem2clan)
+    try:
+        for model_acc, length, targets in iter_consensus_batch(
+                hmmdb, set(mem2clan), workdir, threads, fast=fast):
+            loader.add(model_acc, length, targets)
+    except Exception:
+        loader.con.close()  # rollback
+        shutil.rmtree(workdir)
+        raise
+
+    loader.close()
+
+    size = calc_dir_size(workdir)
+    logger.info(f"disk usage: {size / 1024 ** 2:,.0f} MB")
+    shutil.rmtree(workdir)
+
+
+def iter_consensus_batch(hmmdb: str, models: set[str], workdir: str,
+                         threads: int | None, fast: bool = False):
+    """
+    Compute the consensus sequences of all models,
+    and search them against the HMM database in a few hmmscan runs
+    (one per shard of sequences), so the database is read once per shard
+    instead of once per model.
+    Results are yielded as soon as a shard is searched and parsed.
+
+    :param hmmdb: path to the (pressed) HMM database
+    :param models: accessions of the models to search
+    :param workdir: directory for temporary files
+    :param threads: number of shards searched in parallel
+    :param fast: if True, compute consensus sequences in-process
+    :return: a generator of (model accession, consensus length, targets),
+             where targets is a list of (target accession, e-value, domains)
+    """
+    ts = time.time()
+    sequences = emit_consensus(hmmdb, models, workdir, threads, fast=fast)
+    logger.info(f"consensus sequences emitted in {time.time() - ts:.0f}s")
+
+    num_shards = min(threads or os.cpu_count(), len(sequences)) or 1
+    shards = []
+    for i in range(num_shards):
+        prefix = os.path.join(workdir, f"shard{i}")
+        shards.append((prefix + SEQ_SUFFIX, prefix + DOM_SUFFIX,
+                       prefix + OUT_SUFFIX, []))
+
+    files = [open(shard[0], "wt") for shard in shards]
+    try:
+        for i, (model_acc, sequence) in enumerate(sequences.items()):
+            files[i % num_shards].write(format_fasta(model_acc, sequence))
+            shards[i % num_shards][3].append(model_acc)
+    finally:
+        for fh in files:
+            fh.close()
+
+    ts = time.time()
+    with futures.ThreadPoolExecutor(max_workers=num_shards) as executor:
+        fs = {}
+        for seqfile, domfile, outfile, accessions in shards:
+            f = executor.submit(_search_shard, hmmdb, seqfile, domfile,
+                                outfile)
+            fs[f] = accessions
+
+        for f in futures.as_completed(fs):
+            results = f.result()
+            if results is None:
+                for g in fs:
+                    g.cancel()
+
+                raise RuntimeError("hmmscan error")
+
+            for model_acc in fs[f]:
+                # Models without hits are not in the domain table
+                yield (model_acc, len(sequences[model_acc]),
+                       results.get(model_acc, []))
+
+    logger.info(f"consensus sequences searched in {time.time() - ts:.0f}s "
+                f"({num_shards} shards)")
+
+
+def _search_shard(hmmdb: str, seqfile: str, domfile: str,
+                  outfile: str) -> dict[str, list[tuple]] | None:
+    if not run_hmmscan(hmmdb, seqfile, domfile, outfile):
+        return None
+
+    results = {}
+    for model_acc, targets in iter_domtbl_targets(domfile):
+        results[model_acc] = [(t["accession"], t["evalue"], t["domains"])
+                              for t in targets]
+
+    return results
+
+
+def iter_domtbl_targets(tabfile: str):
+    """
+    Iterate the targets of each query in a --domtblout file
+
+    :param tabfile: hmmscan domain table output
+    :return: a generator of (query name, list of targets)
+    """
+    query = None
+    targets = {}
+    with open(tabfile, "rt") as fh:
+        for line in fh:
+            if line[0] == "#":
+                continue
+
+            cols = re.split(r"\s+", line.rstrip(), maxsplit=22)
+            if cols[3] != query:
+                if targets:
+                    yield query, list(targets.values())
+
+                query = cols[3]
+                targets = {}
+
+            # Pfam entries end with a mark followed by a number
+            acc = cols[1].split(".")[0]
+            if acc == "-":
+                # Panther accessions are under the `target_name` column
+                acc = cols[0]
+
+            try:
+                t = targets[acc]
+            except KeyError:
+                t = targets[acc] = {
+                    "accession": acc,
+                    "evalue": float(cols[6]),
+                    "domains": []
+                }
+
+            t["domains"].append((int(cols[17]), int(cols[18])))
+
+    if targets:
+        yield query, list(targets.values())
+
+
 def remove_hmm_duplicates():
     prog = "python -m pyinterprod.interpro.clan"
     description = ("Simple command line interface to stream an HMM file "
@@ -775,7 +1106,7 @@ def remove_hmm_duplicates():
             continue
 
         accessions.add(acc)
-        print(hmm, end='')
+        sys.stdout.buffer.write(hmm)
 
 
 if __name__ == '__main__':
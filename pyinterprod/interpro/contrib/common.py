@@ -1,8 +1,9 @@
-import re
 import xml.etree.ElementTree as ET
 from dataclasses import dataclass, field
 from datetime import datetime
 
+from pyinterprod.utils.io import iter_hmm_records
+
 
 @dataclass
 class Method:
@@ -24,48 +25,25 @@ class Clan:
 
 
 def parse_hmm(filepath: str):
-    reg_name = re.compile(r"^NAME\s+(.+)$", flags=re.M)
-    reg_acc = re.compile(r"^ACC\s+(.+)$", flags=re.M)
-    reg_desc = re.compile(r"^DESC\s+(.+)$", flags=re.M)
-    reg_date = re.compile(r"^DATE\s+(.+)$", flags=re.M)
-
-    with open(filepath, "rt") as fh:
-        buffer = ""
-        for line in fh:
-            buffer += line
-
-            if line[:2] == "//":
-                # Mandatory field
-                name = reg_name.search(buffer).group(1)
-                acc = descr = dt = None
-
-                try:
-                    # Optional field
-                    acc = reg_acc.search(buffer).group(1)
-                except AttributeError:
-                    pass
-
-                try:
-                    # Optional
-                    descr = reg_desc.search(buffer).group(1)
-                except AttributeError:
-                    pass
-
-                try:
-                    date_string = reg_date.search(buffer).group(1)
-                except AttributeError:
-                    pass
-                else:
-                    # Example: Wed Sep  1 14:33:46 2021
-                    parts = date_string.split()
-                    if len(parts[2]) == 1:
-                        parts[2] = f"0{parts[2]}"
-
-                    date_string = " ".join(parts)
-                    dt = datetime.strptime(date_string, "%a %b %d %H:%M:%S %Y")
-
-                yield acc, name, descr, dt
-                buffer = ""
+    for record in iter_hmm_records(filepath):
+        # Mandatory field
+        name = record.header["NAME"]
+        # Optional fields
+        acc = record.header.get("ACC")
+        descr = record.header.get("DESC")
+        dt = None
+
+        date_string = record.header.get("DATE")
+        if date_string:
+            # Example: Wed Sep  1 14:33:46 2021
+            parts = date_string.split()
+            if len(parts[2]) == 1:
+                parts[2] = f"0{parts[2]}"
+
+            date_string = " ".join(parts)
+            dt = datetime.strptime(date_string, "%a %b %d %H:%M:%S %Y")
+
+        yield acc, name, descr, dt
 
 
 def parse_xml(filepath: str, sig_type: str) -> list[Method]:
@@ -8,7 +8,7 @@ import oracledb
 
 from .common import Clan, Method
 from pyinterprod import logger
-from pyinterprod.utils import Table
+from pyinterprod.utils import CompressedTable, Table
 from pyinterprod.utils.oracle import drop_table
 
 
@@ -68,7 +68,7 @@ def get_pfam_n_entries(cur: oracledb.Cursor, file: str) -> list[Method]:
 
 def get_signatures(pfam_seed_file: str) -> list[Method]:
     methods = []
-    for entry, _ in parse_sto(pfam_seed_file):
+    for entry in index_sto(pfam_seed_file):
         accession, version = entry.features["AC"].split(".")
         comment = entry.features.get("CC")
         rn2pmid = {}
@@ -141,10 +141,13 @@ def _repl_xreferences(text: str) -> str:
 
 
 class StockholdMSA:
-    def __init__(self):
+    def __init__(self, offset: int = 0):
         self.features = {}
-        self.sequences = []
+        self.num_sequences = 0
         self.complete = False
+        # Position and size (in bytes) of the entry in the file
+        self.offset = offset
+        self.size = 0
 
     def process_line(self, line: str):
         if line == "//":
@@ -164,7 +167,18 @@ class StockholdMSA:
             pass
         elif line[0] != "#":
             # Sequence line
-            self.sequences.append(line)
+            self.num_sequences += 1
+
+    def process_bytes(self, line: bytes):
+        """
+        Process a line without decoding it,
+        unless it is a per-file annotation or the end of the entry
+        """
+        if line.startswith(b"#=GF") or line.startswith(b"//"):
+            self.process_line(_decode(line))
+        elif line[:1] != b"#" and line.strip():
+            # Sequence line
+            self.num_sequences += 1
 
     def add_feature(self, name: str, value: str):
         if name == "RN":
@@ -203,40 +217,73 @@ class StockholdMSA:
                 raise ValueError(f"more than one value " f"for field {key}: {values}")
             elif key == "SQ":
                 num_sequences = int(values.pop())
-                if num_sequences == len(self.sequences):
+                if num_sequences == self.num_sequences:
                     self.features[key] = num_sequences
                 else:
                     raise ValueError(
                         f"inconsistent number of sequences: "
-                        f"{num_sequences} != {len(self.sequences)}"
+                        f"{num_sequences} != {self.num_sequences}"
                         f" ({self.features})"
                     )
             else:
                 self.features[key] = values.pop()
 
 
-def parse_sto(file: str):
-    """Parse a Gzip-compressed Pfam file in the Stockhold format
+def _open_sto(file: str):
+    if file.endswith(".gz"):
+        return gzip.open(file, "rb")
+    else:
+        return open(file, "rb")
+
+
+def index_sto(file: str):
+    """Scan a Stockholm file once, parsing per-file annotations only.
+    Alignment lines are counted but not decoded.
 
     :param file: string representing the path to the file.
+    :return: a generator of entries, with their offset and size in the file
     """
-    if file.endswith(".gz"):
-        _open = gzip.open
-    else:
-        _open = open
-
-    with _open(file, "rb") as fh:
-        entry = StockholdMSA()
-        raw = ""
-        for line in map(_decode, fh):
-            raw += line + "\n"
-            entry.process_line(line)
+    with _open_sto(file) as fh:
+        offset = 0
+        entry = StockholdMSA(offset)
+        for line in fh:
+            offset += len(line)
+            entry.process_bytes(line)
             if entry.complete:
-                yield entry, raw
-                entry = StockholdMSA()
-                raw = ""
+                entry.size = offset - entry.offset
+                yield entry
+                entry = StockholdMSA(offset)
+
+    assert offset == entry.offset
+
+
+def read_sto_entry(fh, entry: StockholdMSA) -> bytes:
+    """Read the content of an entry found by index_sto(),
+    as UTF-8 lines without trailing whitespace
+
+    :param fh: file object of the Stockholm file, opened with _open_sto()
+    :param entry: Stockholm entry
+    :return: the content of the entry
+    """
+    fh.seek(entry.offset)
+    data = fh.read(entry.size)
+    lines = data.split(b"\n")
+    if data.endswith(b"\n"):
+        lines.pop()
+
+    return "".join(f"{_decode(line)}\n" for line in lines).encode("utf-8")
+
 
-    assert len(raw) == 0
+def parse_sto(file: str):
+    """Parse a Gzip-compressed Pfam file in the Stockhold format
+
+    :param file: string representing the path to the file.
+    :return: a generator of (entry, raw content as bytes)
+    """
+    # Entries are read in order: seeking never rewinds the file
+    with _open_sto(file) as fh:
+        for entry in index_sto(file):
+            yield entry, read_sto_entry(fh, entry)
 
 
 def _decode(b: bytes) -> str:
@@ -255,17 +302,19 @@ def _decode(b: bytes) -> str:
     return b.decode("latin-1").rstrip()
 
 
-def persist_pfam_a(uri: str, pfama_seed: str, pfama_full: str):
+def persist_pfam_a(uri: str, pfama_seed: str, pfama_full: str,
+                   threads: int = 4):
     """Extract information about Pfam families and persist it in Oracle.
 
     :param uri: Oracle connection string
     :param pfama_seed: string representation of the path to Pfam-A.seed[.gz]
     :param pfama_full: string representation of the path to Pfam-A.full[.gz]
+    :param threads: number of threads compressing alignments
     """
-    logger.info(f"parsing {os.path.basename(pfama_seed)}")
+    logger.info(f"indexing {os.path.basename(pfama_seed)}")
     seeds = {}
-    for entry, raw in parse_sto(pfama_seed):
-        seeds[entry.features["AC"]] = (entry, raw)
+    for entry in index_sto(pfama_seed):
+        seeds[entry.features["AC"]] = entry
 
     con = oracledb.connect(uri)
     cur = con.cursor()
@@ -293,8 +342,23 @@ def persist_pfam_a(uri: str, pfama_seed: str, pfama_full: str):
 
     logger.info(f"parsing {os.path.basename(pfama_full)}")
     progress = 0
+    table = CompressedTable(
+        con,
+        query="""
+            INSERT /*+ APPEND */  INTO INTERPRO.PFAM_A
+            VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9, :10, :11, :12, :13)
+        """,
+        blob_columns=[8, 10],
+        codec="gzip",
+        level=6,
+        threads=threads,
+        # Full alignments can be large: keep few of them in memory
+        buffer_size=20
+    )
+    seed_fh = _open_sto(pfama_seed)
     for full_entry, full_raw in parse_sto(pfama_full):
-        seed_entry, seed_raw = seeds.pop(full_entry.features["AC"])
+        seed_entry = seeds.pop(full_entry.features["AC"])
+        seed_raw = read_sto_entry(seed_fh, seed_entry)
 
         accession, version = full_entry.features["AC"].split(".")
         seq_ontology = None
@@ -312,31 +376,27 @@ def persist_pfam_a(uri: str, pfama_seed: str, pfama_full: str):
             name, orcid = author.split(";")
             authors.append({"author": author, "orcid": orcid or None})
 
-        cur.execute(
-            """
-            INSERT /*+ APPEND */  INTO INTERPRO.PFAM_A
-            VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9, :10, :11, :12, :13)
-            """,
-            [
-                accession,
-                version,
-                seq_ontology,
-                full_entry.features["BM"],
-                full_entry.features["SM"],
-                seq_ga,
-                dom_ga,
-                seed_entry.features["SQ"],
-                gzip.compress(seed_raw.encode("utf-8"), compresslevel=6),
-                full_entry.features["SQ"],
-                gzip.compress(full_raw.encode("utf-8"), compresslevel=6),
-                json.dumps(authors),
-                json.dumps(full_entry.features.get("WK", [])),
-            ],
-        )
+        table.insert((
+            accession,
+            version,
+            seq_ontology,
+            full_entry.features["BM"],
+            full_entry.features["SM"],
+            seq_ga,
+            dom_ga,
+            seed_entry.features["SQ"],
+            seed_raw,
+            full_entry.features["SQ"],
+            full_raw,
+            json.dumps(authors),
+            json.dumps(full_entry.features.get("WK", [])),
+        ))
         progress += 1
         if progress % 100 == 0:
             logger.info(f"{progress:>15,}")
 
+    seed_fh.close()
+    table.close()
     logger.info(f"{progress:>15,}")
     con.commit()
     cur.close()
@@ -352,15 +412,15 @@ def get_clans(pfam_c: str, pfama_full: str) -> list[Clan]:
     :param pfama_full: string representation of the path to Pfam-A.full[.gz]
     :return: list of Clan objects
     """
-    logger.info(f"parsing {os.path.basename(pfama_full)}")
+    logger.info(f"indexing {os.path.basename(pfama_full)}")
     num_full = {}
-    for entry, _ in parse_sto(pfama_full):
+    for entry in index_sto(pfama_full):
         accession, version = entry.features["AC"].split(".")
         num_full[accession] = entry.features["SQ"]
 
     logger.info(f"parsing {os.path.basename(pfam_c)}")
     clans = []
-    for entry, _ in parse_sto(pfam_c):
+    for entry in index_sto(pfam_c):
         accession, version = entry.features["AC"].split(".")
         name = entry.features["ID"]
         description = entry.features["DE"]
@@ -411,7 +471,7 @@ def persist_pfam_c(uri: str, pfam_c: str):
     )
 
     logger.info(f"parsing {os.path.basename(pfam_c)}")
-    for entry, _ in parse_sto(pfam_c):
+    for entry in index_sto(pfam_c):
         accession, version = entry.features["AC"].split(".")
         name = entry.features["ID"]
         description = entry.features["DE"]
@@ -1,10 +1,14 @@
+import bisect
 import heapq
 import os
 import shutil
+import subprocess as sp
 import tarfile
+from collections import deque
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from logging import DEBUG
 from tempfile import mkdtemp
+from typing import BinaryIO
 
 import oracledb
 
@@ -15,7 +19,11 @@ from pyinterprod.utils.oracle import drop_table, get_partitions
 
 
 def load_matches(
-    uri: str, databases: dict[str, str], tmpdir: str | None = None, processes: int = 1
+    uri: str,
+    databases: dict[str, str],
+    tmpdir: str | None = None,
+    processes: int | None = None,
+    filter_processes: int = 1,
 ):
     """
     :param uri: Oracle database connection string
@@ -24,6 +32,9 @@ def load_matches(
                       value -> path to tar archive
     :param tmpdir: directory for temporary files
     :param processes: number of parallel processes
+                      (default: one per database)
+    :param filter_processes: number of processes filtering matches,
+                             per database
     """
     con = oracledb.connect(uri)
     cur = con.cursor()
@@ -45,6 +56,9 @@ def load_matches(
         else:
             tasks.append((dbcode, partition, filepath))
 
+    if processes is None:
+        processes = len(tasks)
+
     if processes > 1:
         with ProcessPoolExecutor(max_workers=processes) as executor:
             fs = {}
@@ -57,6 +71,7 @@ def load_matches(
                     tmpdir=tmpdir,
                     suffix=f"_{dbcode}",
                     purge=True,
+                    filter_processes=filter_processes,
                 )
                 fs[f] = partition
 
@@ -80,7 +95,9 @@ def load_matches(
         for i, (dbcode, partition, filepath) in enumerate(tasks):
             logger.info(f"updating partition: {partition}")
             last = i + 1 == len(databases)
-            load_database_matches(uri, partition, filepath, tmpdir=tmpdir, purge=last)
+            load_database_matches(uri, partition, filepath, tmpdir=tmpdir,
+                                  purge=last,
+                                  filter_processes=filter_processes)
 
 
 def load_database_matches(
@@ -90,6 +107,7 @@ def load_database_matches(
     tmpdir: str | None = None,
     suffix: str = "",
     purge: bool = False,
+    filter_processes: int = 1,
 ):
     if tmpdir:
         os.makedirs(tmpdir, exist_ok=True)
@@ -99,80 +117,34 @@ def load_database_matches(
     logger.debug(f"\textracting matches from {filepath}")
     files = extract_matches(filepath, outdir)
 
-    logger.debug(f"\tinsert matches")
     con = oracledb.connect(uri)
     cur = con.cursor()
-    drop_table(cur, f"INTERPRO.TOAD_MATCH_NEW{suffix}", purge=purge)
+    drop_table(cur, f"INTERPRO.TOAD_MATCH_TMP{suffix}", purge=purge)
     cur.execute(
         f"""
-        CREATE TABLE INTERPRO.TOAD_MATCH_NEW{suffix} NOLOGGING
+        CREATE TABLE INTERPRO.TOAD_MATCH_TMP{suffix} NOLOGGING
         AS SELECT * FROM INTERPRO.TOAD_MATCH WHERE 1 = 0
         """
     )
 
+    """
+    Matches are filtered (deleted proteins/signatures or out-of-bounds)
+    before being inserted. APPEND_VALUES performs a direct-path insert
+    for each array bind, which must be committed before the next one.
+    """
+    logger.debug("\tinserting matches")
     query = f"""
-        INSERT /*+ APPEND */ 
-        INTO INTERPRO.TOAD_MATCH_NEW{suffix}
+        INSERT /*+ APPEND_VALUES */
+        INTO INTERPRO.TOAD_MATCH_TMP{suffix}
         VALUES (:1, :2, :3, :4, :5, :6, :7)
     """
-    with Table(
-        con=cur.connection, query=query, autocommit=True, buffer_size=1000
-    ) as table:
-        for uniprot_acc, method_acc, pos_from, pos_to, group_id, score in iter_matches(
-            files
-        ):
-            table.insert(
-                (
-                    uniprot_acc,
-                    method_acc,
-                    "-",  # DBCODE (cannot be null but value isn't important)
-                    pos_from,
-                    pos_to,
-                    group_id,
-                    score,
-                )
-            )
-    logger.debug(f"\t{table.count:,} matches inserted")
+    with Table(con, query, autocommit=True, buffer_size=100000) as table:
+        for match in iter_filtered_matches(con, files, filter_processes):
+            table.insert(match)
 
+    logger.debug(f"\t{table.count:,} matches inserted")
     shutil.rmtree(outdir)
 
-    # Filter matches (deleted proteins/signatures or out-of-bounds)
-    logger.debug("\tfiltering matches")
-    drop_table(cur, f"INTERPRO.TOAD_MATCH_TMP{suffix}", purge=purge)
-    cur.execute(
-        f"""
-        CREATE TABLE INTERPRO.TOAD_MATCH_TMP{suffix} NOLOGGING
-        AS SELECT * FROM INTERPRO.TOAD_MATCH WHERE 1 = 0
-        """
-    )
-    cur.execute(
-        f"""
-        INSERT /*+ APPEND */ INTO INTERPRO.TOAD_MATCH_TMP{suffix}
-        SELECT *
-        FROM (
-            SELECT T.PROTEIN_AC,
-                   T.METHOD_AC,
-                   M.DBCODE,
-                   T.POS_FROM,
-                   CASE WHEN T.POS_TO <= P.LEN
-                        THEN T.POS_TO 
-                        ELSE P.LEN 
-                        END POS_TO,
-                   T.GROUP_ID,
-                   T.SCORE 
-            FROM INTERPRO.TOAD_MATCH_NEW{suffix} T
-            INNER JOIN INTERPRO.PROTEIN P ON T.PROTEIN_AC = P.PROTEIN_AC
-            INNER JOIN INTERPRO.METHOD M ON T.METHOD_AC = M.METHOD_AC
-        )
-        WHERE POS_FROM <= POS_TO
-        """,
-    )
-    cnt = cur.rowcount
-    cur.connection.commit()
-
-    drop_table(cur, f"INTERPRO.TOAD_MATCH_NEW{suffix}", purge=purge)
-    logger.debug(f"\t{cnt:,} matches kept")
-
     logger.debug("\tcreating indexes and constraints")
     cur.execute(
         f"""
@@ -230,6 +202,63 @@ def load_database_matches(
     logger.debug("\tdone")
 
 
+def iter_filtered_matches(con: oracledb.Connection, files: list[str],
+                          processes: int = 1):
+    """
+    Iterate TOAD matches for existing proteins and signatures,
+    with positions truncated to the length of the protein
+    :param con: Oracle connection
+    :param files: list of file paths to extracted TOAD matches
+    :param processes: number of processes filtering matches
+    """
+    cur = con.cursor()
+    cur.execute("SELECT METHOD_AC, DBCODE FROM INTERPRO.METHOD")
+    signatures = dict(cur.fetchall())
+
+    """
+    Proteins are too many to be kept in memory: merge-join them
+    with matches, which are sorted by accession (binary order).
+    """
+    cur.execute("ALTER SESSION SET NLS_SORT = BINARY")
+    cur.arraysize = 100000
+    cur.execute(
+        """
+        SELECT PROTEIN_AC, LEN
+        FROM INTERPRO.PROTEIN
+        ORDER BY PROTEIN_AC
+        """
+    )
+    proteins = iter(cur)
+    protein_acc, length = next(proteins, (None, None))
+
+    for match in iter_matches(files, processes):
+        uniprot_acc, signature_acc, pos_from, pos_to, group_id, score = match
+        while protein_acc is not None and protein_acc < uniprot_acc:
+            protein_acc, length = next(proteins, (None, None))
+
+        if protein_acc != uniprot_acc:
+            continue
+
+        try:
+            dbcode = signatures[signature_acc]
+        except KeyError:
+            continue
+
+        pos_to = min(pos_to, length)
+        if pos_from <= pos_to:
+            yield (
+                uniprot_acc,
+                signature_acc,
+                dbcode,
+                pos_from,
+                pos_to,
+                group_id,
+                score,
+            )
+
+    cur.close()
+
+
 def extract_matches(
     filepath: str, outdir: str | None, buffersize: int = 1000000
 ) -> list[str]:
@@ -258,81 +287,172 @@ def extract_matches(
     return files
 
 
+# Magic number of Zstandard frames
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
 def iter_tarfile(filepath: str):
     """
-    Extract TOAD matches from TAR archive
+    Extract TOAD matches from TAR archive.
+    The archive is read as a stream (members are never fully loaded
+    in memory), and may be compressed with gzip, bzip2, xz, or zstd.
     :param filepath: Path to TAR archive
     """
-    with tarfile.open(filepath, mode="r") as tar:
-        for member in tar:
-            if member.name.endswith(".tsv"):
-                br = tar.extractfile(member)
-                lines = br.read().decode("utf-8").splitlines(keepends=False)
-
-                # First line is a header
-                for line in lines[1:]:
-                    values = line.split("\t")
-                    if len(values) == 5:
-                        # No discontinuous domains
-                        uniprot_acc, signature_acc, start, end, score = values
-                        yield (
-                            uniprot_acc,
-                            signature_acc,
-                            [(int(start), int(end))],
-                            float(score),
-                        )
-                    elif len(values) == 23:
-                        # Discontinuous domains (up to ten fragments)
-                        uniprot_acc, signature_acc = values[:2]
-                        fragments = []
-                        for i in range(10):
-                            start = values[2 + i * 2]
-                            end = values[3 + i * 2]
-                            if start == "NULL":
-                                break
-                            else:
-                                fragments.append((int(start), int(end)))
-
-                        score = float(values[-1])
-                        fragments.sort()
-                        yield uniprot_acc, signature_acc, fragments, score
-                    else:
-                        err = f"Unexpected number of columns: {values}"
-                        raise ValueError(err)
-
-
-def iter_matches(files: list[str]):
+    with open(filepath, "rb") as fh:
+        is_zstd = fh.read(4) == _ZSTD_MAGIC
+
+    if is_zstd:
+        # zstd support in tarfile requires Python 3.14
+        process = sp.Popen(["zstd", "-dcq", filepath], stdout=sp.PIPE)
+        try:
+            with tarfile.open(fileobj=process.stdout, mode="r|") as tar:
+                yield from _iter_tar_members(tar)
+
+            # Read any trailing padding, and wait for zstd to exit
+            process.communicate()
+        except BaseException:
+            # Stopped early (error, or generator closed)
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            process.stdout.close()
+
+        if process.returncode != 0:
+            err = f"{filepath}: zstd exited with code {process.returncode}"
+            raise RuntimeError(err)
+    else:
+        with tarfile.open(filepath, mode="r|*") as tar:
+            yield from _iter_tar_members(tar)
+
+
+def _iter_tar_members(tar: tarfile.TarFile):
+    # In stream mode, members must be read in order
+    for member in tar:
+        if member.isfile() and member.name.endswith(".tsv"):
+            yield from iter_tsv(tar.extractfile(member))
+
+
+def iter_tsv(fh: BinaryIO):
+    """
+    Parse TOAD matches from a binary stream, one line at a time
+    :param fh: buffered binary file object
+    """
+    # First line is a header
+    next(fh, None)
+
+    for line in fh:
+        values = line.rstrip(b"\r\n").split(b"\t")
+        if len(values) == 5:
+            # No discontinuous domains
+            uniprot_acc, signature_acc, start, end, score = values
+            yield (
+                uniprot_acc.decode(),
+                signature_acc.decode(),
+                [(int(start), int(end))],
+                float(score),
+            )
+        elif len(values) == 23:
+            # Discontinuous domains (up to ten fragments)
+            fragments = []
+            for i in range(2, 22, 2):
+                start = values[i]
+                if start == b"NULL":
+                    break
+                else:
+                    fragments.append((int(start), int(values[i + 1])))
+
+            fragments.sort()
+            yield (
+                values[0].decode(),
+                values[1].decode(),
+                fragments,
+                float(values[22]),
+            )
+        else:
+            err = f"Unexpected number of columns: {line.decode()!r}"
+            raise ValueError(err)
+
+
+def iter_matches(files: list[str], processes: int = 1):
     """
     Process and iterate over TOAD matches
     :param files: list of file paths to extracted TOAD matches
+    :param processes: number of processes filtering matches
     """
-    for protein_acc, matches in process_matches(files):
+    for protein_acc, matches in process_matches(files, processes=processes):
         for signature_acc, locations in matches.items():
             for i, (_, _, fragments, score) in enumerate(locations):
                 for pos_from, pos_to in fragments:
                     yield (protein_acc, signature_acc, pos_from, pos_to, i + 1, score)
 
 
-def process_matches(files: list[str]):
+def process_matches(files: list[str], batch_size: int = 10000,
+                    processes: int = 1):
     """
     Process extracted TOAD matches to group them by UniProt accession
     :param files: list of file paths to extracted TOAD matches
+    :param batch_size: number of proteins filtered at once
+    :param processes: number of processes filtering batches
+    """
+    batches = iter_batches(files, batch_size)
+    if processes > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            # Keep a few batches per process in flight, in order
+            pending = deque()
+            for batch in batches:
+                pending.append(executor.submit(filter_matches_batch, batch))
+                if len(pending) == processes * 2:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
+    else:
+        for batch in batches:
+            yield from filter_matches_batch(batch)
+
+
+def iter_batches(files: list[str], batch_size: int):
+    """
+    Group extracted TOAD matches by UniProt accession, in batches
+    :param files: list of file paths to extracted TOAD matches
+    :param batch_size: number of proteins per batch
+    :return: a generator of lists of (UniProt accession, list of matches)
     """
     iterable = [iter_until_eof(f) for f in files]
     protein_acc = None
     matches = []
+    batch = []
     for key, value in heapq.merge(*iterable, key=lambda x: x[0]):
         if key != protein_acc:
             if matches:
-                yield protein_acc, filter_matches(matches)
+                batch.append((protein_acc, matches))
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
 
             protein_acc = key
-            matches.clear()
+            matches = []
 
         matches += value
 
     if matches:
-        yield protein_acc, filter_matches(matches)
+        batch.append((protein_acc, matches))
+
+    if batch:
+        yield batch
+
+
+def filter_matches_batch(
+    batch: list[tuple[str, list[tuple]]]
+) -> list[tuple[str, dict[str, list[tuple]]]]:
+    """
+    Filter the TOAD matches of many proteins
+    :param batch: list of (UniProt accession, list of predicted matches)
+    :return: list of (UniProt accession, matches grouped by accession)
+    """
+    return [(protein_acc, filter_matches(matches))
+            for protein_acc, matches in batch]
 
 
 def filter_matches(matches: list[tuple]) -> dict[str, list[tuple]]:
@@ -355,7 +475,7 @@ def filter_matches(matches: list[tuple]) -> dict[str, list[tuple]]:
         locations = []
         for fragments, score in hits:
             # fragments are sorted when extracting matches from tar archive,
-            # see `iter_tarfile()`
+            # see `iter_tsv()`
             pos_from = fragments[0][0]
             pos_to = max(end for start, end in fragments)
             locations.append((pos_from, pos_to, fragments, score))
@@ -363,16 +483,31 @@ def filter_matches(matches: list[tuple]) -> dict[str, list[tuple]]:
         # Sort by score (descending)
         locations.sort(key=lambda x: -x[3])
 
-        # When two locations overlap, keep the one with the highest score
+        """
+        When two locations overlap, keep the one with the highest score.
+        Kept locations do not overlap each other, so when sorted by start
+        they are also sorted by end: a location overlaps a kept one
+        if and only if the last kept location starting before its end
+        finishes after its start.
+        """
         filtered_locations = []
-        for loc in sorted(locations, key=lambda x: -x[3]):
-            for other in filtered_locations:
-                overlap = min(loc[1], other[1]) - max(loc[0], other[0])
-                if overlap >= 0:
-                    # Do not keep (overlaps with one having a better score)
-                    break
-            else:
+        starts = []
+        ends = []
+        for loc in locations:
+            pos_from, pos_to = loc[:2]
+            if pos_from > pos_to:
+                # Empty location: cannot overlap
                 filtered_locations.append(loc)
+                continue
+
+            i = bisect.bisect_right(starts, pos_to)
+            if i > 0 and ends[i - 1] >= pos_from:
+                # Do not keep (overlaps with one having a better score)
+                continue
+
+            starts.insert(i, pos_from)
+            ends.insert(i, pos_to)
+            filtered_locations.append(loc)
 
         profiles[acc] = filtered_locations
 
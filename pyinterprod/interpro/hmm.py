@@ -1,9 +1,10 @@
-import gzip
 import re
 
 import oracledb
 
 from pyinterprod import logger
+from pyinterprod.utils import CompressedTable
+from pyinterprod.utils.io import iter_hmm_records
 from .database import Database
 
 
@@ -86,7 +87,8 @@ class _Mapper:
         return "SSF" + acc, name
 
 
-def update(url: str, database: Database, hmmfile: str, mapfile: str | None):
+def update(url: str, database: Database, hmmfile: str, mapfile: str | None,
+           threads: int = 4):
     con = oracledb.connect(url)
     cur = con.cursor()
 
@@ -104,41 +106,29 @@ def update(url: str, database: Database, hmmfile: str, mapfile: str | None):
     )
 
     logger.info(f"{database.name}: inserting HMMs")
-    with open(hmmfile, "rt") as fh:
-        mapper = _Mapper(database.name, mapfile)
-        prog_acc = re.compile(r"^ACC\s+(.+)$", re.M)
-        prog_name = re.compile(r"^NAME\s+(.+)$", re.M)
-
-        buffer = ""
-        cnt = 0
-        for line in fh:
-            buffer += line
-            if line[:2] == "//":
-                cnt += 1
-
-                try:
-                    # Optional
-                    model_acc = prog_acc.search(buffer).group(1)
-                except AttributeError:
-                    model_acc = None
-
-                # Mandatory
-                model_name = prog_name.search(buffer).group(1)
-
-                signature_acc, model_acc = mapper(model_acc, model_name)
-                if signature_acc is None:
-                    continue
-
-                blob = gzip.compress(buffer.encode("utf-8"))
-                cur.execute(
-                    """
-                    INSERT INTO INTERPRO.METHOD_HMM
-                    VALUES (:1, :2, :3)
-                    """, (signature_acc, model_acc, blob)
-                )
-
-                buffer = ""
+    table = CompressedTable(
+        con,
+        query="""
+            INSERT INTO INTERPRO.METHOD_HMM
+            VALUES (:1, :2, :3)
+        """,
+        blob_columns=[2],
+        codec="gzip",
+        level=9,
+        threads=threads,
+        max_pending=threads * 100
+    )
+    mapper = _Mapper(database.name, mapfile)
+    for record in iter_hmm_records(hmmfile):
+        # ACC is optional, NAME is mandatory
+        model_acc = record.header.get("ACC")
+        model_name = record.header["NAME"]
+
+        signature_acc, model_acc = mapper(model_acc, model_name)
+        if signature_acc is not None:
+            table.insert((signature_acc, model_acc, record.data))
 
+    table.close()
     con.commit()
     cur.close()
     con.close()
@@ -1,11 +1,14 @@
 import time
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import (FIRST_COMPLETED, ThreadPoolExecutor,
+                                as_completed, wait)
 from dataclasses import dataclass
+from threading import Lock
 
 import oracledb
 from oracledb import Cursor
 
 from pyinterprod import logger
+from pyinterprod.utils import db as dbutils
 from pyinterprod.utils import oracle
 
 
@@ -257,34 +260,59 @@ class Analysis:
     is_active: bool
     table: str
 
-    def is_ready(self, cur: Cursor, max_upi: str) -> bool:
-        # Check for incomplete jobs that are required (<= max UPI)
-        cur.execute(
-            """
-            SELECT COUNT(*) AS CNT
-            FROM IPRSCAN.ANALYSIS_JOBS@ISPRO
-            WHERE ANALYSIS_ID = :1
-              AND UPI_FROM <= :2
-              AND END_TIME IS NULL
-              AND SUCCESS = 'N'
-            """,
-            [self.id, max_upi]
-        )
-        if cur.fetchone()[0]:
-            return False
 
-        # Check that the highest completed job is >= max UPI
-        cur.execute(
-            """
-            SELECT MAX(UPI_TO)
-            FROM IPRSCAN.ANALYSIS_JOBS@ISPRO
-            WHERE ANALYSIS_ID = :1
-              AND END_TIME IS NOT NULL
-            """,
-            [self.id]
-        )
-        row = cur.fetchone()
-        return row[0] is not None and row[0] >= max_upi
+def get_ready_analyses(cur: Cursor, analyses: list[Analysis],
+                       max_upi: str) -> set[int]:
+    """
+    Return the IDs of analyses whose jobs cover all sequences up to `max_upi`,
+    checking the status of every analysis with a single query.
+    """
+    if not analyses:
+        return set()
+
+    params = {"max_upi": max_upi}
+    binds = []
+    for i, analysis in enumerate(analyses):
+        params[f"id{i}"] = analysis.id
+        binds.append(f":id{i}")
+
+    cur.execute(
+        f"""
+        SELECT ANALYSIS_ID,
+               SUM(CASE 
+                     WHEN UPI_FROM <= :max_upi 
+                      AND END_TIME IS NULL 
+                      AND SUCCESS = 'N' 
+                     THEN 1 ELSE 0 
+                   END),
+               MAX(CASE WHEN END_TIME IS NOT NULL THEN UPI_TO END)
+        FROM IPRSCAN.ANALYSIS_JOBS@ISPRO
+        WHERE ANALYSIS_ID IN ({', '.join(binds)})
+        GROUP BY ANALYSIS_ID
+        """,
+        params
+    )
+
+    ready = set()
+    for analysis_id, incomplete, max_upi_to in cur:
+        if not incomplete and max_upi_to is not None and max_upi_to >= max_upi:
+            ready.add(analysis_id)
+
+    return ready
+
+
+def _get_partition_sizes(cur: Cursor, table: str) -> dict[str, int]:
+    # Estimated number of rows per partition, from optimizer statistics
+    cur.execute(
+        """
+        SELECT PARTITION_NAME, NVL(NUM_ROWS, 0)
+        FROM ALL_TAB_PARTITIONS
+        WHERE TABLE_OWNER = 'IPRSCAN'
+          AND TABLE_NAME = :1
+        """,
+        [table.upper()]
+    )
+    return {name.upper(): num_rows for name, num_rows in cur}
 
 
 def get_analyses(cur: Cursor, **kwargs) -> list[Analysis]:
@@ -347,6 +375,14 @@ def import_matches_or_sites(uri: str, data_type: str = "matches", **kwargs):
     databases = kwargs.get("databases", [])
     force = kwargs.get("force", True)
     threads = kwargs.get("threads", 1)
+    # Seconds between two checks of pending analyses (adaptive)
+    min_interval = kwargs.get("min_interval", 15)
+    max_interval = kwargs.get("max_interval", 60)
+    # Append new rows instead of re-copying partitions, when possible
+    incremental = kwargs.get("incremental", False)
+    # Degree of parallel DML per remote table (e.g. {"ipm_hmmer3_match": 4})
+    parallel_dml = {k.upper(): v
+                    for k, v in kwargs.get("parallel_dml", {}).items()}
 
     if data_type == "matches":
         partitions = MATCH_PARTITIONS
@@ -367,7 +403,20 @@ def import_matches_or_sites(uri: str, data_type: str = "matches", **kwargs):
 
     logger.info("starting")
 
-    con = oracledb.connect(uri)
+    # Connections, including those of worker threads, share one pool
+    with dbutils.oracle_pool(uri, max_size=max(threads, 1) + 1):
+        _import_tables(uri, data_type, partitions, partitioned_table,
+                       databases, force, threads, min_interval, max_interval,
+                       incremental, parallel_dml)
+
+    logger.info("done")
+
+
+def _import_tables(uri: str, data_type: str, partitions: dict,
+                   partitioned_table: str, databases: set[int], force: bool,
+                   threads: int, min_interval: int, max_interval: int,
+                   incremental: bool, parallel_dml: dict[str, int]):
+    con = dbutils.connect_oracle(uri)
     cur = con.cursor()
 
     pending = {}
@@ -391,82 +440,115 @@ def import_matches_or_sites(uri: str, data_type: str = "matches", **kwargs):
 
     cur.execute("SELECT MAX(UPI) FROM UNIPARC.PROTEIN")
     max_upi, = cur.fetchone()
-    cur.close()
-    con.close()
+
+    if incremental:
+        # Track what was loaded in each partition
+        _create_sync_table(cur, partitioned_table)
+
+    # Estimate the size of each table from its current partitions
+    partition_sizes = _get_partition_sizes(cur, partitioned_table)
+    table_sizes = {}
+    for table, analyses in pending.items():
+        table_sizes[table] = sum(partition_sizes.get(partition.upper(), 0)
+                                 for _, partition, _ in analyses)
 
     if not pending:
+        cur.close()
+        con.close()
         logger.info("No tables to import")
         return
     elif threads < 1:
         threads = len(pending)
 
     with ThreadPoolExecutor(max_workers=threads) as executor:
-        running = []
+        running = {}
         failed = 0
+        interval = min_interval
+        last_ready = set()
 
         while True:
-            con = oracledb.connect(uri)
-            cur = con.cursor()
-
-            tmp = []
-            for f, table, names in running:
-                if not f.done():
-                    tmp.append((f, table, names))
-                    continue
-
-                try:
-                    f.result()
-                except Exception as exc:
-                    for name in names:
-                        logger.error(f"{name:<38} failed: {exc}")
-                    failed += 1
-                else:
-                    for name in names:
-                        logger.info(f"{name:<40} done")
-
-            running = tmp
-
-            tmp = {}
-            for table, analyses in pending.items():
-                ready = []
-                for analysis, _, _ in analyses:
-                    if analysis.is_ready(cur, max_upi):
-                        ready.append(analysis)
-
-                if len(ready) < len(analyses):
-                    # Not ready
-                    tmp[table] = analyses
-                    continue
+            analyses = [analysis
+                        for items in pending.values()
+                        for analysis, _, _ in items]
+
+            try:
+                ready = get_ready_analyses(cur, analyses, max_upi)
+            except oracledb.DatabaseError as exc:
+                # Connection lost (e.g. idle timeout): reconnect next tick
+                logger.warning(f"could not check analyses: {exc}")
+                ready = set()
+                cur.close()
+                con.close()
+                con = dbutils.connect_oracle(uri)
+                cur = con.cursor()
+
+            # Tables whose analyses are all ready, biggest first
+            tables = [
+                table
+                for table, items in pending.items()
+                if all(analysis.id in ready for analysis, _, _ in items)
+            ]
+            tables.sort(key=lambda t: table_sizes[t], reverse=True)
 
+            for table in tables:
+                items = pending.pop(table)
                 args = (
                     uri,
                     table,
                     partitioned_table,
                     [
                         (analysis.id, partition, columns)
-                        for analysis, partition, columns in analyses
+                        for analysis, partition, columns in items
                     ],
-                    force
+                    force,
+                    parallel_dml.get(table, 0),
+                    incremental
                 )
 
                 f = executor.submit(_update_table, *args)
-                running.append((f, table, [f"{analysis.name} {analysis.version}"
-                                           for analysis, _, _ in analyses]))
-
-            pending = tmp
+                running[f] = [f"{analysis.name} {analysis.version}"
+                              for analysis, _, _ in items]
 
-            cur.close()
-            con.close()
+            if not pending and not running:
+                break
+            elif tables or ready != last_ready:
+                # Some analyses changed state: check again soon
+                interval = min_interval
+            elif pending:
+                # Nothing became ready: back off
+                interval = min(interval * 2, max_interval)
 
-            if pending or running:
-                time.sleep(60)
+            """
+            Wait until either a running table completes, or it is time 
+            to check pending analyses again
+            """
+            last_ready = ready
+            if running:
+                done, _ = wait(running, timeout=interval if pending else None,
+                               return_when=FIRST_COMPLETED)
             else:
-                break
+                time.sleep(interval)
+                done = set()
+
+            for f in done:
+                names = running.pop(f)
+                try:
+                    f.result()
+                except Exception as exc:
+                    for name in names:
+                        logger.error(f"{name:<38} failed: {exc}")
+                    failed += 1
+                else:
+                    for name in names:
+                        logger.info(f"{name:<40} done")
+
+    cur.close()
+    con.close()
 
     if failed:
         raise RuntimeError(f"{failed} errors")
 
-    con = oracledb.connect(uri)
+    con = dbutils.connect_oracle(uri)
     cur = con.cursor()
 
     index = f"I_{partitioned_table}$UPI"
@@ -486,12 +568,11 @@ def import_matches_or_sites(uri: str, data_type: str = "matches", **kwargs):
     cur.close()
     con.close()
 
-    logger.info("done")
-
 
 def _update_table(uri: str, remote_table: str, partitioned_table: str,
                   analyses: list[tuple[int, str, list[str]]],
-                  force: bool = True):
+                  force: bool = True, parallel: int = 0,
+                  incremental: bool = False):
     """
     Update partitioned table with matches
     :param uri: Oracle connection string
@@ -500,11 +581,15 @@ def _update_table(uri: str, remote_table: str, partitioned_table: str,
     :param analyses: list of analyses to update (analysis ID, partition name
                      in `partitioned_table`, columns to select from `table`)
     :param force: If True, update partition even if up-to-date
+    :param parallel: Degree of parallelism used when inserting rows
+                     in temporary tables (0/1: no parallel DML)
+    :param incremental: If True, append new rows to partitions already
+                        holding the same analysis, unless jobs were re-run
     """
-    con = oracledb.connect(uri)
+    con = dbutils.connect_oracle(uri)
     cur = con.cursor()
 
-    if not force:
+    if not force and not incremental:
         # Check if the data is already up-to-date
         up_to_date = 0
         for analysis_id, partition, columns in analyses:
@@ -536,64 +621,135 @@ def _update_table(uri: str, remote_table: str, partitioned_table: str,
             con.close()
             return
 
-    tmp_table = f"IPRSCAN.{remote_table}_TMP"
+    high_values = {}
+    for p in oracle.get_partitions(cur, "IPRSCAN", partitioned_table):
+        high_values[p["name"].upper()] = int(p["value"])
 
     for analysis_id, partition, columns in analyses:
-        # Create temporary table for the partition exchange
-        oracle.drop_table(cur, tmp_table, purge=True)
+        if partition.upper() not in high_values:
+            cur.close()
+            con.close()
+            raise RuntimeError(f"Partition {partition} not found "
+                               f"in {partitioned_table}")
 
-        sql = f"CREATE TABLE {tmp_table}"
-        subparts = oracle.get_subpartitions(cur, schema="IPRSCAN",
-                                            table=partitioned_table,
-                                            partition=partition)
+    appendable = {}
+    if incremental:
+        for analysis_id, partition, columns in analyses:
+            if high_values[partition.upper()] != analysis_id:
+                # New analysis ID: full exchange
+                continue
 
-        if subparts:
-            """
-            The target table is sub-partitioned: the temporary table needs
-            to be partitioned
-            """
-            col = subparts[0]["column"]
-            subparts = [
-                f"PARTITION {s['name']} VALUES ({s['value']})"
-                for s in subparts
-            ]
+            last_upi = _get_appendable_upi(cur, partitioned_table,
+                                           analysis_id)
+            if last_upi is not None:
+                appendable[analysis_id] = last_upi
 
-            sql += f" PARTITION BY LIST ({col}) ({', '.join(subparts)})"
+    cur.close()
+    con.close()
 
-        cur.execute(
-            f"""{sql}
-            NOLOGGING
-            AS
-            SELECT *
-            FROM IPRSCAN.{partitioned_table}
-            WHERE 1 = 0
-            """
-        )
+    """
+    Each analysis is pulled into its own temporary table concurrently,
+    but partition exchanges (DDL on the partitioned table)
+    and direct-path appends are serialized
+    """
+    lock = Lock()
+    with ThreadPoolExecutor(max_workers=len(analyses)) as executor:
+        fs = {}
+        for analysis_id, partition, columns in analyses:
+            if analysis_id in appendable:
+                f = executor.submit(_append_partition, uri, remote_table,
+                                    partitioned_table, analysis_id, partition,
+                                    columns, appendable[analysis_id],
+                                    lock, parallel)
+            else:
+                f = executor.submit(_exchange_partition, uri, remote_table,
+                                    partitioned_table, analysis_id, partition,
+                                    columns, high_values[partition.upper()],
+                                    lock, parallel, incremental)
+            fs[f] = analysis_id
+
+        errors = []
+        for f in as_completed(fs):
+            try:
+                f.result()
+            except Exception as exc:
+                errors.append(f"analysis {fs[f]}: {exc}")
+
+    if errors:
+        raise RuntimeError(", ".join(errors))
+
+
+def _exchange_partition(uri: str, remote_table: str, partitioned_table: str,
+                        analysis_id: int, partition: str, columns: list[str],
+                        high_value: int, lock: Lock, parallel: int = 0,
+                        incremental: bool = False):
+    # Not pooled: parallel DML, if enabled, must not leak to other tasks
+    con = oracledb.connect(uri)
+    cur = con.cursor()
 
-        # Insert only one analysis ID
-        cur.execute(
-            f"""
-            INSERT /*+ APPEND */ INTO {tmp_table}
-            SELECT {', '.join(columns)}
-            FROM IPRSCAN.{remote_table}@ISPRO
-            WHERE ANALYSIS_ID = :1
-            """,
-            [analysis_id]
-        )
-        con.commit()
+    tmp_table = f"IPRSCAN.{remote_table}_TMP{analysis_id}"
 
-        high_value = None
-        for p in oracle.get_partitions(cur, "IPRSCAN", partitioned_table):
-            if p["name"].lower() == partition.lower():
-                high_value = int(p["value"])
-                break
+    # Create temporary table for the partition exchange
+    oracle.drop_table(cur, tmp_table, purge=True)
 
-        if high_value is None:
-            cur.close()
-            con.close()
-            raise RuntimeError(f"Partition {partition} not found "
-                               f"in {partitioned_table}")
+    sql = f"CREATE TABLE {tmp_table}"
+    subparts = oracle.get_subpartitions(cur, schema="IPRSCAN",
+                                        table=partitioned_table,
+                                        partition=partition)
 
+    if subparts:
+        """
+        The target table is sub-partitioned: the temporary table needs
+        to be partitioned
+        """
+        col = subparts[0]["column"]
+        subparts = [
+            f"PARTITION {s['name']} VALUES ({s['value']})"
+            for s in subparts
+        ]
+
+        sql += f" PARTITION BY LIST ({col}) ({', '.join(subparts)})"
+
+    cur.execute(
+        f"""{sql}
+        NOLOGGING
+        AS
+        SELECT *
+        FROM IPRSCAN.{partitioned_table}
+        WHERE 1 = 0
+        """
+    )
+
+    if parallel > 1:
+        cur.execute("ALTER SESSION ENABLE PARALLEL DML")
+        hint = f"/*+ APPEND PARALLEL({parallel}) */"
+    else:
+        hint = "/*+ APPEND */"
+
+    if incremental:
+        # Bound the copy, so the next update appends from this UPI
+        max_upi = _get_remote_max_upi(cur, remote_table, analysis_id)
+        cond = "AND UPI <= :2"
+        params = [analysis_id, max_upi]
+    else:
+        max_upi = None
+        cond = ""
+        params = [analysis_id]
+
+    # Insert only one analysis ID
+    cur.execute(
+        f"""
+        INSERT {hint} INTO {tmp_table}
+        SELECT {', '.join(columns)}
+        FROM IPRSCAN.{remote_table}@ISPRO
+        WHERE ANALYSIS_ID = :1
+          {cond}
+        """,
+        params
+    )
+    con.commit()
+
+    with lock:
         if high_value != analysis_id:
             """
             Different ANALYSIS_ID -> database update:
@@ -628,13 +784,186 @@ def _update_table(uri: str, remote_table: str, partitioned_table: str,
             """
         )
 
-        # Drop temporary table
-        oracle.drop_table(cur, tmp_table, purge=True)
+    # Drop temporary table
+    oracle.drop_table(cur, tmp_table, purge=True)
+
+    if incremental:
+        _save_sync_state(cur, partitioned_table, analysis_id, max_upi)
+    else:
+        # The state of a previous incremental update is now stale
+        _clear_sync_state(cur, partitioned_table, analysis_id)
 
     cur.close()
     con.close()
 
 
+def _append_partition(uri: str, remote_table: str, partitioned_table: str,
+                      analysis_id: int, partition: str, columns: list[str],
+                      last_upi: str, lock: Lock, parallel: int = 0):
+    # Not pooled: parallel DML, if enabled, must not leak to other tasks
+    con = oracledb.connect(uri)
+    cur = con.cursor()
+
+    max_upi = _get_remote_max_upi(cur, remote_table, analysis_id)
+    if max_upi is None or max_upi <= last_upi:
+        # Nothing new
+        cur.close()
+        con.close()
+        return
+
+    if parallel > 1:
+        cur.execute("ALTER SESSION ENABLE PARALLEL DML")
+        hint = f"/*+ APPEND PARALLEL({parallel}) */"
+    else:
+        hint = "/*+ APPEND */"
+
+    # Direct-path insert: must not run during partition DDL
+    with lock:
+        cur.execute(
+            f"""
+            INSERT {hint} INTO IPRSCAN.{partitioned_table} 
+            PARTITION ({partition})
+            SELECT {', '.join(columns)}
+            FROM IPRSCAN.{remote_table}@ISPRO
+            WHERE ANALYSIS_ID = :1
+              AND UPI > :2
+              AND UPI <= :3
+            """,
+            [analysis_id, last_upi, max_upi]
+        )
+        logger.debug(f"{partitioned_table} ({partition}): "
+                     f"{cur.rowcount:,} rows appended")
+        con.commit()
+
+    _save_sync_state(cur, partitioned_table, analysis_id, max_upi)
+    cur.close()
+    con.close()
+
+
+def _get_remote_max_upi(cur: Cursor, remote_table: str,
+                        analysis_id: int) -> str | None:
+    cur.execute(
+        f"""
+        SELECT MAX(UPI)
+        FROM IPRSCAN.{remote_table}@ISPRO
+        WHERE ANALYSIS_ID = :1
+        """,
+        [analysis_id]
+    )
+    max_upi, = cur.fetchone()
+    return max_upi
+
+
+def _get_jobs_checksum(cur: Cursor, analysis_id: int, max_upi: str) -> str:
+    """
+    Fingerprint of the jobs covering sequences up to `max_upi`.
+    Re-running a range adds a job, which changes the fingerprint.
+    """
+    cur.execute(
+        """
+        SELECT COUNT(*), 
+               NVL(SUM(ORA_HASH(UPI_FROM || '-' || UPI_TO || '-' || 
+                                TO_CHAR(CREATED_TIME, 'YYYYMMDDHH24MISS'))), 0)
+        FROM IPRSCAN.ANALYSIS_JOBS@ISPRO
+        WHERE ANALYSIS_ID = :1
+          AND UPI_FROM <= :2
+        """,
+        [analysis_id, max_upi]
+    )
+    num_jobs, checksum = cur.fetchone()
+    return f"{num_jobs}:{checksum}"
+
+
+def _create_sync_table(cur: Cursor, partitioned_table: str):
+    try:
+        cur.execute(
+            f"""
+            CREATE TABLE IPRSCAN.{partitioned_table}_SYNC (
+                ANALYSIS_ID NUMBER NOT NULL 
+                    CONSTRAINT PK_{partitioned_table}_SYNC PRIMARY KEY,
+                MAX_UPI VARCHAR2(13) NOT NULL,
+                CHECKSUM VARCHAR2(100) NOT NULL,
+                TIMESTAMP DATE DEFAULT SYSDATE NOT NULL
+            )
+            """
+        )
+    except oracledb.DatabaseError as exc:
+        error, = exc.args
+
+        # ORA-00955: name is already used by an existing object
+        if error.code != 955:
+            raise exc
+
+
+def _get_appendable_upi(cur: Cursor, partitioned_table: str,
+                        analysis_id: int) -> str | None:
+    """
+    Return the highest UPI loaded for the analysis if no job covering
+    already loaded sequences was (re-)run since, otherwise None
+    """
+    cur.execute(
+        f"""
+        SELECT MAX_UPI, CHECKSUM
+        FROM IPRSCAN.{partitioned_table}_SYNC
+        WHERE ANALYSIS_ID = :1
+        """,
+        [analysis_id]
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+
+    max_upi, checksum = row
+    if _get_jobs_checksum(cur, analysis_id, max_upi) != checksum:
+        return None
+
+    return max_upi
+
+
+def _clear_sync_state(cur: Cursor, partitioned_table: str,
+                      analysis_id: int):
+    try:
+        cur.execute(
+            f"""
+            DELETE FROM IPRSCAN.{partitioned_table}_SYNC
+            WHERE ANALYSIS_ID = :1
+            """,
+            [analysis_id]
+        )
+    except oracledb.DatabaseError as exc:
+        error, = exc.args
+
+        # ORA-00942: table or view does not exist
+        if error.code != 942:
+            raise exc
+    else:
+        cur.connection.commit()
+
+
+def _save_sync_state(cur: Cursor, partitioned_table: str, analysis_id: int,
+                     max_upi: str | None):
+    cur.execute(
+        f"""
+        DELETE FROM IPRSCAN.{partitioned_table}_SYNC
+        WHERE ANALYSIS_ID = :1
+        """,
+        [analysis_id]
+    )
+
+    if max_upi is not None:
+        cur.execute(
+            f"""
+            INSERT INTO IPRSCAN.{partitioned_table}_SYNC 
+                (ANALYSIS_ID, MAX_UPI, CHECKSUM)
+            VALUES (:1, :2, :3)
+            """,
+            [analysis_id, max_upi,
+             _get_jobs_checksum(cur, analysis_id, max_upi)]
+        )
+
+    cur.connection.commit()
+
+
 def check_ispro(url: str, match_type: str = "matches",
                 status: str = "production"):
     con = oracledb.connect(url)
@@ -650,9 +979,13 @@ def check_ispro(url: str, match_type: str = "matches",
     cur.execute("SELECT MAX(UPI) FROM UNIPARC.PROTEIN")
     max_upi, = cur.fetchone()
 
+    ready = get_ready_analyses(cur,
+                               [a for items in analyses.values() for a in items],
+                               max_upi)
+
     for table in sorted(analyses):
         for a in analyses[table]:
-            status = "ready" if a.is_ready(cur, max_upi) else "pending"
+            status = "ready" if a.id in ready else "pending"
             print(f"{a.id:<3} {a.name:<40} {a.version:<30} {table:<30} "
                   f"{status}")
 
@@ -548,21 +548,73 @@ def update_feature_matches(uri: str):
     logger.info("complete")
 
 
-def update_variant_matches(uri: str):
+def update_variant_matches(uri: str, databases: list[Database] | None = None,
+                           max_change_ratio: float = 0.2):
     """
-    Recreate splice-variants table with the most recent data
+    Update splice-variants tables with the most recent data
     from SWISSPROT_VARSPLIC. TREMBL_VARSPLIC (DBID=25) is obsolete and
     only contains deleted cross-references.
 
+    Only matches of new, deleted, or modified variants, and matches
+    of updated member databases (or of databases whose signatures' SKIP_FLAG
+    or IPRSCAN2DBCODE rows changed since the last run)
+    are refreshed, unless the proportion of
+    changes exceeds `max_change_ratio`, or the previous run did not complete,
+    in which case the table is rebuilt.
+
     :param uri: Oracle connection string
+    :param databases: list of Database objects of updated member databases
+    :param max_change_ratio: proportion of changed variants (or databases)
+                             above which the table is rebuilt
     """
     con = oracledb.connect(uri)
     cur = con.cursor()
-    logger.info("updating VARSPLIC_MASTER")
-    oracle.truncate_table(cur, "INTERPRO.VARSPLIC_MASTER", reuse_storage=True)
+
+    dbcodes = []
+    for p in oracle.get_partitions(cur, "INTERPRO", "MATCH"):
+        dbcode = p["value"][1:-1]  # 'X' -> X
+        dbcodes.append(dbcode)
+
+    updated_dbcodes = [db.identifier for db in databases or []
+                       if db.identifier in dbcodes]
+
+    """
+    Databases may change without being passed (e.g. signatures flagged
+    as skipped, or IPRSCAN2DBCODE updated)
+    """
+    _create_variant_state_table(cur)
+    cur.execute("SELECT DBCODE, CHECKSUM FROM INTERPRO.VARSPLIC_DB_STATE")
+    old_states = dict(cur.fetchall())
+    new_states = _get_variant_db_states(cur)
+    for dbcode in dbcodes:
+        if (dbcode not in updated_dbcodes
+                and old_states.get(dbcode) != new_states.get(dbcode)):
+            logger.info(f"{dbcode}: signatures or analysis changed")
+            updated_dbcodes.append(dbcode)
+
+    # VARSPLIC_MASTER_NEW is only dropped once both tables are updated
     cur.execute(
         """
-        INSERT INTO INTERPRO.VARSPLIC_MASTER
+        SELECT COUNT(*)
+        FROM ALL_TABLES
+        WHERE OWNER = 'INTERPRO' AND TABLE_NAME = 'VARSPLIC_MASTER_NEW'
+        """
+    )
+    incomplete, = cur.fetchone()
+    if incomplete:
+        logger.warning("previous run did not complete")
+
+    logger.info("finding changed variants")
+    oracle.drop_table(cur, "INTERPRO.VARSPLIC_MASTER_NEW", purge=True)
+    cur.execute(
+        """
+        CREATE TABLE INTERPRO.VARSPLIC_MASTER_NEW NOLOGGING
+        AS SELECT * FROM INTERPRO.VARSPLIC_MASTER WHERE 1 = 0
+        """
+    )
+    cur.execute(
+        """
+        INSERT /*+ APPEND */ INTO INTERPRO.VARSPLIC_MASTER_NEW
         SELECT
           SUBSTR(X.AC, 1, INSTR(X.AC, '-') - 1),
           SUBSTR(X.AC, INSTR(X.AC, '-') + 1),
@@ -574,16 +626,172 @@ def update_variant_matches(uri: str):
         AND X.DELETED = 'N'
         """
     )
-    logger.info(f"{cur.rowcount} rows inserted")
+    num_variants = cur.rowcount
+    con.commit()
+
+    # Variants added, deleted, or whose sequence changed
+    oracle.drop_table(cur, "INTERPRO.VARSPLIC_CHANGES", purge=True)
+    cur.execute(
+        """
+        CREATE TABLE INTERPRO.VARSPLIC_CHANGES NOLOGGING
+        AS
+        WITH NEW_MASTER (PROTEIN_AC, VARIANT, CRC64, LEN) AS (
+          SELECT * FROM INTERPRO.VARSPLIC_MASTER_NEW
+        ),
+        OLD_MASTER (PROTEIN_AC, VARIANT, CRC64, LEN) AS (
+          SELECT * FROM INTERPRO.VARSPLIC_MASTER
+        )
+        SELECT DISTINCT PROTEIN_AC || '-' || VARIANT AS AC
+        FROM (
+          SELECT *
+          FROM (
+            SELECT * FROM NEW_MASTER
+            MINUS
+            SELECT * FROM OLD_MASTER
+          )
+          UNION ALL
+          SELECT *
+          FROM (
+            SELECT * FROM OLD_MASTER
+            MINUS
+            SELECT * FROM NEW_MASTER
+          )
+        )
+        """
+    )
+    cur.execute("SELECT COUNT(*) FROM INTERPRO.VARSPLIC_CHANGES")
+    num_changes, = cur.fetchone()
+    logger.info(f"{num_changes:,} changed variants out of {num_variants:,}")
 
     logger.info("updating VARSPLIC_MATCH")
-    oracle.truncate_table(cur, "INTERPRO.VARSPLIC_MATCH", reuse_storage=True)
+    if (incomplete
+            or not num_variants
+            or num_changes / num_variants > max_change_ratio
+            or len(updated_dbcodes) / len(dbcodes) > max_change_ratio):
+        logger.info("rebuilding table")
+        oracle.truncate_table(cur, "INTERPRO.VARSPLIC_MATCH",
+                              reuse_storage=True)
+        cnt = _insert_variant_matches(cur, dbcodes)
+        logger.info(f"{cnt} rows inserted")
+    else:
+        cur.execute(
+            """
+            DELETE FROM INTERPRO.VARSPLIC_MATCH
+            WHERE PROTEIN_AC IN (
+              SELECT AC FROM INTERPRO.VARSPLIC_CHANGES
+            )
+            """
+        )
+        logger.info(f"{cur.rowcount} rows deleted (changed variants)")
 
-    dbcodes = []
-    for p in oracle.get_partitions(cur, "INTERPRO", "MATCH"):
-        dbcode = p["value"][1:-1]  # 'X' -> X
-        dbcodes.append(dbcode)
+        cnt = _insert_variant_matches(
+            cur, dbcodes,
+            "AND X.AC IN (SELECT AC FROM INTERPRO.VARSPLIC_CHANGES)"
+        )
+        logger.info(f"{cnt} rows inserted (changed variants)")
+
+        if updated_dbcodes:
+            params = ",".join([f":{i+1}" for i in range(len(updated_dbcodes))])
+            cur.execute(
+                f"""
+                DELETE FROM INTERPRO.VARSPLIC_MATCH
+                WHERE DBCODE IN ({params})
+                AND PROTEIN_AC NOT IN (
+                  SELECT AC FROM INTERPRO.VARSPLIC_CHANGES
+                )
+                """,
+                updated_dbcodes
+            )
+            logger.info(f"{cur.rowcount} rows deleted (updated databases)")
 
+            cnt = _insert_variant_matches(
+                cur, updated_dbcodes,
+                "AND X.AC NOT IN (SELECT AC FROM INTERPRO.VARSPLIC_CHANGES)"
+            )
+            logger.info(f"{cnt} rows inserted (updated databases)")
+
+    con.commit()
+    oracle.drop_table(cur, "INTERPRO.VARSPLIC_CHANGES", purge=True)
+
+    # Only updated once matches are, so a failed run is detected again
+    logger.info("updating VARSPLIC_MASTER")
+    oracle.truncate_table(cur, "INTERPRO.VARSPLIC_MASTER", reuse_storage=True)
+    cur.execute(
+        """
+        INSERT INTO INTERPRO.VARSPLIC_MASTER
+        SELECT * FROM INTERPRO.VARSPLIC_MASTER_NEW
+        """
+    )
+    logger.info(f"{cur.rowcount} rows inserted")
+
+    cur.execute("DELETE FROM INTERPRO.VARSPLIC_DB_STATE")
+    cur.executemany(
+        """
+        INSERT INTO INTERPRO.VARSPLIC_DB_STATE (DBCODE, CHECKSUM)
+        VALUES (:1, :2)
+        """,
+        [(dbcode, new_states[dbcode])
+         for dbcode in dbcodes if dbcode in new_states]
+    )
+    con.commit()
+    oracle.drop_table(cur, "INTERPRO.VARSPLIC_MASTER_NEW", purge=True)
+
+    cur.close()
+    con.close()
+
+
+def _create_variant_state_table(cur: oracledb.Cursor):
+    try:
+        cur.execute(
+            """
+            CREATE TABLE INTERPRO.VARSPLIC_DB_STATE (
+                DBCODE VARCHAR2(10) NOT NULL
+                    CONSTRAINT PK_VARSPLIC_DB_STATE PRIMARY KEY,
+                CHECKSUM VARCHAR2(100) NOT NULL
+            )
+            """
+        )
+    except oracledb.DatabaseError as exc:
+        error, = exc.args
+
+        # ORA-00955: name is already used by an existing object
+        if error.code != 955:
+            raise exc
+
+
+def _get_variant_db_states(cur: oracledb.Cursor) -> dict[str, str]:
+    """
+    Fingerprint, per database, of what selects its variant matches:
+    analyses in IPRSCAN2DBCODE, and the SKIP_FLAG of signatures
+    """
+    cur.execute(
+        """
+        SELECT DBCODE, COUNT(*),
+               SUM(ORA_HASH(IPRSCAN_SIG_LIB_REL_ID || '-' || EVIDENCE))
+        FROM INTERPRO.IPRSCAN2DBCODE
+        GROUP BY DBCODE
+        """
+    )
+    analyses = {dbcode: f"{cnt}:{checksum}" for dbcode, cnt, checksum in cur}
+
+    cur.execute(
+        """
+        SELECT DBCODE, COUNT(*),
+               SUM(ORA_HASH(METHOD_AC || '-' || SKIP_FLAG))
+        FROM INTERPRO.METHOD
+        GROUP BY DBCODE
+        """
+    )
+    states = {}
+    for dbcode, cnt, checksum in cur:
+        if dbcode in analyses:
+            states[dbcode] = f"{analyses[dbcode]}/{cnt}:{checksum}"
+
+    return states
+
+
+def _insert_variant_matches(cur: oracledb.Cursor, dbcodes: list[str],
+                            condition: str = "") -> int:
     params = ",".join([f":{i+1}" for i in range(len(dbcodes))])
     cur.execute(
         f"""
@@ -603,14 +811,11 @@ def update_variant_matches(uri: str):
           AND X.DELETED = 'N'
           AND I2D.DBCODE IN ({params})
           AND M.SKIP_FLAG = 'N'
+          {condition}
         """,
         dbcodes
     )
-    logger.info(f"{cur.rowcount} rows inserted")
-    con.commit()
-
-    cur.close()
-    con.close()
+    return cur.rowcount
 
 
 def update_site_matches(uri: str):
@@ -1139,19 +1344,25 @@ def get_sig_protein_counts(cur: oracledb.Cursor,
 def insert_toad_matches(uri: str,
                         databases: list[Database],
                         files: dict[str, str],
-                        tmpdir: str | None = None):
+                        tmpdir: str | None = None,
+                        processes: int = 1):
     """
     Update the TOAD matches table with matches extracted from TAR archives
     :param uri: Oracle connection string
     :param databases: list of Database objects of member databases to update
     :param files: Dictionary of database name -> tar file path
     :param tmpdir: Path to directory for temporary files
+    :param processes: Number of CPUs available, shared by the databases
+                      to filter their matches
     """
     _databases = {}
     for db in databases:
         _databases[db.identifier] = files[db.identifier]
 
-    toad.load_matches(uri, _databases, tmpdir=tmpdir)
+    # Databases are loaded concurrently, one process each
+    filter_processes = max(1, processes // max(1, len(_databases)))
+    toad.load_matches(uri, _databases, tmpdir=tmpdir,
+                      filter_processes=filter_processes)
     rebuild_indexes(uri, "TOAD_MATCH")
     logger.info("done")
 
@@ -9,6 +9,7 @@ import oracledb
 
 from pyinterprod import logger
 from pyinterprod.utils import Table, oracle as ora
+from pyinterprod.utils import db as dbutils
 from pyinterprod.uniprot import sprot
 from .match import export_entries_protein_counts
 
@@ -307,7 +308,13 @@ def track_changes(url: str, pg_url: str, swissp: str, trembl: str, version: str,
 
 def delete_obsoletes(url: str, truncate: bool = False, threads: int = 8,
                      step: int = 10000):
-    con = oracledb.connect(url)
+    # Connections, including those of worker threads, share one pool
+    with dbutils.oracle_pool(url, max_size=threads + 1):
+        _delete_obsoletes(url, truncate, threads, step)
+
+
+def _delete_obsoletes(url: str, truncate: bool, threads: int, step: int):
+    con = dbutils.connect_oracle(url)
     cur = con.cursor()
 
     # Count the protein to delete
@@ -399,7 +406,7 @@ def delete_obsoletes(url: str, truncate: bool = False, threads: int = 8,
             raise RuntimeError(f"{num_errors} tables failed")
 
     logger.info("enabling referential constraints")
-    con = oracledb.connect(url)
+    con = dbutils.connect_oracle(url)
     cur = con.cursor()
     num_errors = 0
     constraints = set()
@@ -438,7 +445,7 @@ def delete_obsoletes(url: str, truncate: bool = False, threads: int = 8,
 def iterative_delete(url: str, table: str, partition: str | None,
                      column: str, step: int, stop: int,
                      gather_stats: bool = True) -> int:
-    con = oracledb.connect(url)
+    con = dbutils.connect_oracle(url)
     cur = con.cursor()
 
     if partition:
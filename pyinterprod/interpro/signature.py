@@ -9,6 +9,7 @@ import oracledb
 from pyinterprod import logger
 from pyinterprod.pronto.signature import get_swissprot_descriptions
 from pyinterprod.utils import Table
+from pyinterprod.utils import db as dbutils
 from pyinterprod.utils import oracle as ora
 
 from . import contrib
@@ -275,7 +276,7 @@ def track_signature_changes(
 
 def delete_from_table(uri: str, table: str, partition: str | None,
                       column: str, step: int = 1000) -> int:
-    con = oracledb.connect(uri)
+    con = dbutils.connect_oracle(uri)
     cur = con.cursor()
 
     if partition:
@@ -324,7 +325,13 @@ def delete_from_table(uri: str, table: str, partition: str | None,
 
 
 def delete_obsoletes(uri: str, databases: list[Database], threads: int = 8):
-    con = oracledb.connect(uri)
+    # Connections, including those of worker threads, share one pool
+    with dbutils.oracle_pool(uri, max_size=threads + 1):
+        _delete_obsoletes(uri, databases, threads)
+
+
+def _delete_obsoletes(uri: str, databases: list[Database], threads: int):
+    con = dbutils.connect_oracle(uri)
     cur = con.cursor()
 
     # track signatures that need to be deleted
@@ -468,7 +475,7 @@ def delete_obsoletes(uri: str, databases: list[Database], threads: int = 8):
     logger.info(f"METHOD: {num_rows:,} rows deleted")
 
     logger.info("enabling referential constraints")
-    con = oracledb.connect(uri)
+    con = dbutils.connect_oracle(uri)
     cur = con.cursor()
     constraints = set()
     for table, constraint, column in tables:
@@ -1,4 +1,4 @@
-from decimal import Decimal
+from dataclasses import dataclass
 from typing import Callable
 
 import oracledb
@@ -9,6 +9,9 @@ from pyinterprod import logger
 
 _INSERT_SIZE = 10000
 
+# ORA-00001: unique constraint violated
+_DUPLICATE_ERROR = 1
+
 
 def get_analyses(obj: str | oracledb.Cursor) -> dict:
     if isinstance(obj, str):
@@ -57,715 +60,301 @@ def persist_results(cur: oracledb.Cursor,
                     matches_table: str,
                     sites_fn: Callable | None,
                     sites_file: str | None,
-                    sites_table: str | None) -> bool:
+                    sites_table: str | None) -> int | None:
+    """
+    Insert matches (and sites) in a single transaction
+
+    :return: number of inserted rows (duplicated rows are skipped),
+             or None if the transaction was rolled back due to
+             another integrity error
+    """
     try:
-        matches_fn(cur, matches_file, analysis_id, matches_table)
+        num_rows = matches_fn(cur, matches_file, analysis_id, matches_table)
 
         if sites_fn is not None:
-            sites_fn(cur, sites_file, analysis_id, sites_table)
+            num_rows += sites_fn(cur, sites_file, analysis_id, sites_table)
     except IntegrityError:
         cur.connection.rollback()
-        return False
+        return None
     else:
         cur.connection.commit()
-        return True
-
-
-def cdd_matches(cur: oracledb.Cursor, file: str, analysis_id: int, table: str):
-    sql = f"""
-        INSERT INTO {table} (
-            ANALYSIS_ID, ANALYSIS_NAME, RELNO_MAJOR, RELNO_MINOR,
-            UPI, METHOD_AC, MODEL_AC, SEQ_START, SEQ_END, FRAGMENTS,
-            SEQSCORE, SEQEVALUE
-        )
-        VALUES (:analysis_id, :analysis_name, :relno_major, :relno_minor,
-                :upi, :method_ac, :model_ac, :seq_start, :seq_end, :fragments,
-                :seq_score, :seq_evalue)
+        return num_rows
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str                   # column in the database table
+    index: int | None           # field in the output file (None: analysis ID)
+    cast: Callable = str
+    dbtype: oracledb.DbType | None = None
+    optional: bool = False      # missing or "-" fields are NULL
+
+
+def _optional(value: str) -> str | None:
+    value = value.strip()
+    return None if value == "-" else value
+
+
+def _common_columns(relno_maj_as_int: bool) -> list[Column]:
+    return [
+        Column("ANALYSIS_ID", None),
+        Column("ANALYSIS_NAME", 0),
+        Column("RELNO_MAJOR", 1, int if relno_maj_as_int else str),
+        Column("RELNO_MINOR", 2),
+        Column("UPI", 3),
+        Column("METHOD_AC", 4),
+        Column("MODEL_AC", 5),
+        Column("SEQ_START", 6, int, oracledb.DB_TYPE_NUMBER),
+        Column("SEQ_END", 7, int, oracledb.DB_TYPE_NUMBER),
+        Column("FRAGMENTS", 8),
+    ]
+
+
+def _int(name: str, index: int) -> Column:
+    return Column(name, index, int, oracledb.DB_TYPE_NUMBER)
+
+
+def _number(name: str, index: int) -> Column:
+    return Column(name, index, float, oracledb.DB_TYPE_NUMBER)
+
+
+def _double(name: str, index: int) -> Column:
+    # E-values/p-values can be lower than what NUMBER can store
+    return Column(name, index, float, oracledb.DB_TYPE_BINARY_DOUBLE)
+
+
+def _hmmer3_columns(relno_maj_as_int: bool) -> list[Column]:
+    return _common_columns(relno_maj_as_int) + [
+        _number("SEQSCORE", 9),
+        _double("SEQEVALUE", 10),
+        Column("HMM_BOUNDS", 11),
+        _int("HMM_START", 12),
+        _int("HMM_END", 13),
+        _int("HMM_LENGTH", 14),
+        _int("ENV_START", 15),
+        _int("ENV_END", 16),
+        _number("SCORE", 17),
+        _double("EVALUE", 18),
+    ]
+
+
+CDD_COLUMNS = _common_columns(False) + [
+    _number("SEQSCORE", 9),
+    _double("SEQEVALUE", 10),
+]
+
+COILS_PHOBIUS_COLUMNS = _common_columns(False)
+
+HAMAP_COLUMNS = _common_columns(False) + [
+    _number("SEQSCORE", 9),
+    Column("ALIGNMENT", 10),
+]
+
+FUNFAM_COLUMNS = _hmmer3_columns(True) + [
+    _int("HMMER_SEQ_START", 19),
+    _int("HMMER_SEQ_END", 20),
+    Column("ALIGNMENT", 21),
+]
+
+MOBIDB_LITE_COLUMNS = _common_columns(True) + [
+    Column("SEQ_FEATURE", 9, _optional, optional=True),
+]
+
+PANTHER_COLUMNS = _common_columns(False) + [
+    _number("SEQSCORE", 9),
+    _double("SEQEVALUE", 10),
+    Column("HMM_BOUNDS", 11),
+    _int("HMM_START", 12),
+    _int("HMM_END", 13),
+    _int("HMM_LENGTH", 14),
+    _int("ENV_START", 15),
+    _int("ENV_END", 16),
+    Column("AN_NODE_ID", 17, _optional, optional=True),
+]
+
+PRINTS_COLUMNS = _common_columns(False) + [
+    _number("SEQSCORE", 9),
+    _double("SEQEVALUE", 10),
+    _int("MOTIF_NUMBER", 11),
+    _double("PVALUE", 12),
+    Column("GRAPHSCAN", 13),
+]
+
+PROSITE_PATTERNS_COLUMNS = _common_columns(False) + [
+    _int("LOCATION_LEVEL", 9),
+    Column("ALIGNMENT", 10),
+]
+
+SMART_COLUMNS = _common_columns(True) + [
+    _number("SEQSCORE", 9),
+    _double("SEQEVALUE", 10),
+    Column("HMM_BOUNDS", 11),
+    _int("HMM_START", 12),
+    _int("HMM_END", 13),
+    _int("HMM_LENGTH", 14),
+    _number("SCORE", 15),
+    _double("EVALUE", 16),
+]
+
+SUPERFAMILY_COLUMNS = _common_columns(True) + [
+    _double("SEQEVALUE", 9),
+    _int("HMM_LENGTH", 10),
+]
+
+SITES_COLUMNS = [
+    Column("ANALYSIS_ID", None),
+    Column("UPI", 0),
+    Column("MD5", 1),
+    _int("SEQ_LENGTH", 2),
+    Column("ANALYSIS_NAME", 3),
+    Column("METHOD_AC", 4),
+    _int("LOC_START", 5),
+    _int("LOC_END", 6),
+    _int("NUM_SITES", 7),
+    Column("RESIDUE", 8),
+    _int("RES_START", 9),
+    _int("RES_END", 10),
+    Column("DESCRIPTION", 11),
+]
+
+
+def load(cur: oracledb.Cursor, file: str, analysis_id: int, table: str,
+         columns: list[Column]) -> int:
     """
+    Insert the rows of an InterProScan output file, using positional binds
 
-    cur.setinputsizes(seq_evalue=oracledb.DB_TYPE_BINARY_DOUBLE)
-
-    values = []
-    num_parsed = num_inserted = 0
-    with open(file, "rt") as fh:
-        for line in fh:
-            num_parsed += 1
-            cols = line.rstrip().split('\t')
-            values.append({
-                "analysis_id": analysis_id,
-                "analysis_name": cols[0],
-                "relno_major": cols[1],
-                "relno_minor": cols[2],
-                "upi": cols[3],
-                "method_ac": cols[4],
-                "model_ac": cols[5],
-                "seq_start": int(cols[6]),
-                "seq_end": int(cols[7]),
-                "fragments": cols[8],
-                "seq_score": Decimal(cols[9]),
-                "seq_evalue": Decimal(cols[10])
-            })
+    Duplicated rows are reported and skipped, other errors are raised
+    (the caller is responsible for rolling back the transaction).
 
-            if len(values) == _INSERT_SIZE:
-                cur.executemany(sql, values)
-                num_inserted += cur.rowcount
-                values.clear()
-
-    if values:
-        cur.executemany(sql, values)
-        num_inserted += cur.rowcount
-
-    logger.debug(f"parsed: {num_parsed}; inserted: {num_inserted}")
-
-
-def sites(cur: oracledb.Cursor, file: str, analysis_id: int, table: str):
-    sql = f"""
-        INSERT INTO {table} (
-            ANALYSIS_ID, UPI, MD5, SEQ_LENGTH, ANALYSIS_NAME, 
-            METHOD_AC, LOC_START, LOC_END, NUM_SITES, RESIDUE, 
-            RES_START, RES_END, DESCRIPTION
-        )
-        VALUES (:analysis_id, :upi, :md5, :seq_length, :analysis_name, 
-                :method_ac, :loc_start, :loc_end, :num_sites, :residue,
-                :res_start, :res_end, :description)
+    :return: number of inserted rows
     """
-
-    values = []
-    num_parsed = num_inserted = 0
-    with open(file, "rt") as fh:
-        for line in fh:
-            num_parsed += 1
-            cols = line.rstrip().split('\t')
-            values.append({
-                "analysis_id": analysis_id,
-                "upi": cols[0],
-                "md5": cols[1],
-                "seq_length": int(cols[2]),
-                "analysis_name": cols[3],
-                "method_ac": cols[4],
-                "loc_start": int(cols[5]),
-                "loc_end": int(cols[6]),
-                "num_sites": int(cols[7]),
-                "residue": cols[8],
-                "res_start": int(cols[9]),
-                "res_end": int(cols[10]),
-                "description": cols[11]
-            })
-
-            if len(values) == _INSERT_SIZE:
-                cur.executemany(sql, values)
-                num_inserted += cur.rowcount
-                values.clear()
-
-    if values:
-        cur.executemany(sql, values)
-        num_inserted += cur.rowcount
-
-    logger.debug(f"parsed: {num_parsed}; inserted: {num_inserted}")
-
-
-def coils_phobius_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
-                          table: str):
     sql = f"""
-        INSERT INTO {table} (
-            ANALYSIS_ID, ANALYSIS_NAME, RELNO_MAJOR, RELNO_MINOR,
-            UPI, METHOD_AC, MODEL_AC, SEQ_START, SEQ_END, FRAGMENTS
-        )
-        VALUES (:analysis_id, :analysis_name, :relno_major, :relno_minor,
-                :upi, :method_ac, :model_ac, :seq_start, :seq_end, :fragments)
+        INSERT INTO {table} ({', '.join(c.name for c in columns)})
+        VALUES ({', '.join(f':{i + 1}' for i in range(len(columns)))})
     """
 
-    values = []
-    num_parsed = num_inserted = 0
-    with open(file, "rt") as fh:
-        for line in fh:
-            num_parsed += 1
-            cols = line.rstrip().split('\t')
-            values.append({
-                "analysis_id": analysis_id,
-                "analysis_name": cols[0],
-                "relno_major": cols[1],
-                "relno_minor": cols[2],
-                "upi": cols[3],
-                "method_ac": cols[4],
-                "model_ac": cols[5],
-                "seq_start": int(cols[6]),
-                "seq_end": int(cols[7]),
-                "fragments": cols[8]
-            })
-
-            if len(values) == _INSERT_SIZE:
-                cur.executemany(sql, values)
-                num_inserted += cur.rowcount
-                values.clear()
-
-    if values:
-        cur.executemany(sql, values)
-        num_inserted += cur.rowcount
-
-    logger.debug(f"parsed: {num_parsed}; inserted: {num_inserted}")
-
-
-def hamap_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
-                  table: str):
-    sql = f"""
-        INSERT INTO {table} (
-            ANALYSIS_ID, ANALYSIS_NAME, RELNO_MAJOR, RELNO_MINOR,
-            UPI, METHOD_AC, MODEL_AC, SEQ_START, SEQ_END, FRAGMENTS,
-            SEQSCORE, ALIGNMENT
-        )
-        VALUES (:analysis_id, :analysis_name, :relno_major, :relno_minor,
-                :upi, :method_ac, :model_ac, :seq_start, :seq_end, :fragments,
-                :seq_score, :alignment)
-    """
+    cur.setinputsizes(*[c.dbtype for c in columns])
 
+    fields = [(c.index, c.cast, c.optional) for c in columns]
     values = []
-    num_parsed = num_inserted = 0
+    num_parsed = num_inserted = num_duplicates = 0
     with open(file, "rt") as fh:
         for line in fh:
             num_parsed += 1
             cols = line.rstrip().split('\t')
-            values.append({
-                "analysis_id": analysis_id,
-                "analysis_name": cols[0],
-                "relno_major": cols[1],
-                "relno_minor": cols[2],
-                "upi": cols[3],
-                "method_ac": cols[4],
-                "model_ac": cols[5],
-                "seq_start": int(cols[6]),
-                "seq_end": int(cols[7]),
-                "fragments": cols[8],
-                "seq_score": Decimal(cols[9]),
-                "alignment": cols[10]
-            })
+            num_cols = len(cols)
+            values.append(tuple(
+                analysis_id if i is None
+                else (None if optional and i >= num_cols else cast(cols[i]))
+                for i, cast, optional in fields
+            ))
 
             if len(values) == _INSERT_SIZE:
-                cur.executemany(sql, values)
-                num_inserted += cur.rowcount
+                num_inserted += _insert(cur, sql, values)
+                num_duplicates += len(values)
                 values.clear()
 
     if values:
-        cur.executemany(sql, values)
-        num_inserted += cur.rowcount
+        num_inserted += _insert(cur, sql, values)
+        num_duplicates += len(values)
+
+    num_duplicates -= num_inserted
+    if num_duplicates:
+        logger.warning(f"{file}: {num_duplicates} duplicated rows ignored")
 
     logger.debug(f"parsed: {num_parsed}; inserted: {num_inserted}")
+    return num_inserted
 
 
-def _hmmer3_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
-                    table: str, relno_maj_as_int: bool):
-    sql = f"""
-        INSERT INTO {table} (
-            ANALYSIS_ID, ANALYSIS_NAME, RELNO_MAJOR, RELNO_MINOR,
-            UPI, METHOD_AC, MODEL_AC, SEQ_START, SEQ_END, FRAGMENTS,
-            SEQSCORE, SEQEVALUE, HMM_BOUNDS, HMM_START, HMM_END,
-            HMM_LENGTH, ENV_START, ENV_END, SCORE, EVALUE
-        )
-        VALUES (:analysis_id, :analysis_name, :relno_major, :relno_minor,
-                :upi, :method_ac, :model_ac, :seq_start, :seq_end, :fragments,
-                :seq_score, :seq_evalue, :hmm_bounds, :hmm_start, :hmm_end,
-                :hmm_length, :env_start, :env_end, :score, :evalue)
-    """
+def _insert(cur: oracledb.Cursor, sql: str, values: list[tuple]) -> int:
+    cur.executemany(sql, values, batcherrors=True)
+    for error in cur.getbatcherrors():
+        if error.code != _DUPLICATE_ERROR:
+            raise oracledb.DatabaseError(error)
 
-    cur.setinputsizes(seq_evalue=oracledb.DB_TYPE_BINARY_DOUBLE,
-                      evalue=oracledb.DB_TYPE_BINARY_DOUBLE)
+    return cur.rowcount
 
-    values = []
-    num_parsed = num_inserted = 0
-    with open(file, "rt") as fh:
-        for line in fh:
-            num_parsed += 1
-            cols = line.rstrip().split('\t')
-            values.append({
-                "analysis_id": analysis_id,
-                "analysis_name": cols[0],
-                "relno_major": int(cols[1]) if relno_maj_as_int else cols[1],
-                "relno_minor": cols[2],
-                "upi": cols[3],
-                "method_ac": cols[4],
-                "model_ac": cols[5],
-                "seq_start": int(cols[6]),
-                "seq_end": int(cols[7]),
-                "fragments": cols[8],
-                "seq_score": Decimal(cols[9]),
-                "seq_evalue": Decimal(cols[10]),
-                "hmm_bounds": cols[11],
-                "hmm_start": int(cols[12]),
-                "hmm_end": int(cols[13]),
-                "hmm_length": int(cols[14]),
-                "env_start": int(cols[15]),
-                "env_end": int(cols[16]),
-                "score": Decimal(cols[17]),
-                "evalue": Decimal(cols[18])
-            })
 
-            if len(values) == _INSERT_SIZE:
-                cur.executemany(sql, values)
-                num_inserted += cur.rowcount
-                values.clear()
+def cdd_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
+                table: str) -> int:
+    return load(cur, file, analysis_id, table, CDD_COLUMNS)
 
-    if values:
-        cur.executemany(sql, values)
-        num_inserted += cur.rowcount
 
-    logger.debug(f"parsed: {num_parsed}; inserted: {num_inserted}")
+def sites(cur: oracledb.Cursor, file: str, analysis_id: int,
+          table: str) -> int:
+    return load(cur, file, analysis_id, table, SITES_COLUMNS)
 
 
-def funfam_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
-                   table: str):
-    sql = f"""
-        INSERT INTO {table} (
-            ANALYSIS_ID, ANALYSIS_NAME, RELNO_MAJOR, RELNO_MINOR,
-            UPI, METHOD_AC, MODEL_AC, SEQ_START, SEQ_END, FRAGMENTS,
-            SEQSCORE, SEQEVALUE, HMM_BOUNDS, HMM_START, HMM_END,
-            HMM_LENGTH, ENV_START, ENV_END, SCORE, EVALUE, HMMER_SEQ_START,
-            HMMER_SEQ_END, ALIGNMENT
-        )
-        VALUES (:analysis_id, :analysis_name, :relno_major, :relno_minor,
-                :upi, :method_ac, :model_ac, :seq_start, :seq_end, :fragments,
-                :seq_score, :seq_evalue, :hmm_bounds, :hmm_start, :hmm_end,
-                :hmm_length, :env_start, :env_end, :score, :evalue, 
-                :hmmer_seq_start, :hmmer_seq_end, :alignment)
-        """
+def coils_phobius_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
+                          table: str) -> int:
+    return load(cur, file, analysis_id, table, COILS_PHOBIUS_COLUMNS)
 
-    cur.setinputsizes(seq_evalue=oracledb.DB_TYPE_BINARY_DOUBLE,
-                      evalue=oracledb.DB_TYPE_BINARY_DOUBLE)
 
-    values = []
-    num_parsed = num_inserted = 0
-    with open(file, "rt") as fh:
-        for line in fh:
-            num_parsed += 1
-            cols = line.rstrip().split('\t')
-            values.append({
-                "analysis_id": analysis_id,
-                "analysis_name": cols[0],
-                "relno_major": int(cols[1]),
-                "relno_minor": cols[2],
-                "upi": cols[3],
-                "method_ac": cols[4],
-                "model_ac": cols[5],
-                "seq_start": int(cols[6]),
-                "seq_end": int(cols[7]),
-                "fragments": cols[8],
-                "seq_score": Decimal(cols[9]),
-                "seq_evalue": Decimal(cols[10]),
-                "hmm_bounds": cols[11],
-                "hmm_start": int(cols[12]),
-                "hmm_end": int(cols[13]),
-                "hmm_length": int(cols[14]),
-                "env_start": int(cols[15]),
-                "env_end": int(cols[16]),
-                "score": Decimal(cols[17]),
-                "evalue": Decimal(cols[18]),
-                "hmmer_seq_start": int(cols[19]),
-                "hmmer_seq_end": int(cols[20]),
-                "alignment": cols[21],
-            })
-
-            if len(values) == _INSERT_SIZE:
-                cur.executemany(sql, values)
-                num_inserted += cur.rowcount
-                values.clear()
+def hamap_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
+                  table: str) -> int:
+    return load(cur, file, analysis_id, table, HAMAP_COLUMNS)
 
-    if values:
-        cur.executemany(sql, values)
-        num_inserted += cur.rowcount
 
-    logger.debug(f"parsed: {num_parsed}; inserted: {num_inserted}")
+def funfam_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
+                   table: str) -> int:
+    return load(cur, file, analysis_id, table, FUNFAM_COLUMNS)
 
 
 def hmmer3_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
-                   table: str):
-    _hmmer3_matches(cur, file, analysis_id, table, relno_maj_as_int=True)
+                   table: str) -> int:
+    return load(cur, file, analysis_id, table, _hmmer3_columns(True))
 
 
 def mobidb_lite_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
-                        table: str):
-    sql = f"""
-        INSERT INTO {table} (
-            ANALYSIS_ID, ANALYSIS_NAME, RELNO_MAJOR, RELNO_MINOR,
-            UPI, METHOD_AC, MODEL_AC, SEQ_START, SEQ_END, FRAGMENTS,
-            SEQ_FEATURE
-        )
-        VALUES (:analysis_id, :analysis_name, :relno_major, :relno_minor,
-                :upi, :method_ac, :model_ac, :seq_start, :seq_end, :fragments,
-                :seq_feature)
-    """
-
-    values = []
-    num_parsed = num_inserted = 0
-    with open(file, "rt") as fh:
-        for line in fh:
-            num_parsed += 1
-            cols = line.rstrip().split('\t')
-
-            try:
-                seq_feature = cols[9].strip()
-            except IndexError:
-                seq_feature = None
-            else:
-                if seq_feature == "-":
-                    seq_feature = None
-
-            values.append({
-                "analysis_id": analysis_id,
-                "analysis_name": cols[0],
-                "relno_major": int(cols[1]),
-                "relno_minor": cols[2],
-                "upi": cols[3],
-                "method_ac": cols[4],
-                "model_ac": cols[5],
-                "seq_start": int(cols[6]),
-                "seq_end": int(cols[7]),
-                "fragments": cols[8],
-                "seq_feature": seq_feature
-            })
-
-            if len(values) == _INSERT_SIZE:
-                cur.executemany(sql, values)
-                num_inserted += cur.rowcount
-                values.clear()
-
-    if values:
-        cur.executemany(sql, values)
-        num_inserted += cur.rowcount
-
-    logger.debug(f"parsed: {num_parsed}; inserted: {num_inserted}")
+                        table: str) -> int:
+    return load(cur, file, analysis_id, table, MOBIDB_LITE_COLUMNS)
 
 
 def panther_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
-                    table: str):
-    sql = f"""
-        INSERT INTO {table} (
-            ANALYSIS_ID, ANALYSIS_NAME, RELNO_MAJOR, RELNO_MINOR,
-            UPI, METHOD_AC, MODEL_AC, SEQ_START, SEQ_END, FRAGMENTS,
-            SEQSCORE, SEQEVALUE, HMM_BOUNDS, HMM_START, HMM_END,
-            HMM_LENGTH, ENV_START, ENV_END, AN_NODE_ID
-        )
-        VALUES (:analysis_id, :analysis_name, :relno_major, :relno_minor,
-                :upi, :method_ac, :model_ac, :seq_start, :seq_end, :fragments,
-                :seq_score, :seq_evalue, :hmm_bounds, :hmm_start, :hmm_end,
-                :hmm_length, :env_start, :env_end, :an_node_id)
-    """
-
-    cur.setinputsizes(seq_evalue=oracledb.DB_TYPE_BINARY_DOUBLE)
-
-    values = []
-    num_parsed = num_inserted = 0
-    with open(file, "rt") as fh:
-        for line in fh:
-            num_parsed += 1
-            cols = line.rstrip().split('\t')
-
-            try:
-                an_node_id = cols[17].strip()
-            except IndexError:
-                an_node_id = None
-            else:
-                if an_node_id == "-":
-                    an_node_id = None
-
-            values.append({
-                "analysis_id": analysis_id,
-                "analysis_name": cols[0],
-                "relno_major": cols[1],
-                "relno_minor": cols[2],
-                "upi": cols[3],
-                "method_ac": cols[4],
-                "model_ac": cols[5],
-                "seq_start": int(cols[6]),
-                "seq_end": int(cols[7]),
-                "fragments": cols[8],
-                "seq_score": Decimal(cols[9]),
-                "seq_evalue": Decimal(cols[10]),
-                "hmm_bounds": cols[11],
-                "hmm_start": int(cols[12]),
-                "hmm_end": int(cols[13]),
-                "hmm_length": int(cols[14]),
-                "env_start": int(cols[15]),
-                "env_end": int(cols[16]),
-                "an_node_id": an_node_id
-            })
-
-            if len(values) == _INSERT_SIZE:
-                cur.executemany(sql, values)
-                num_inserted += cur.rowcount
-                values.clear()
-
-    if values:
-        cur.executemany(sql, values)
-        num_inserted += cur.rowcount
-
-    logger.debug(f"parsed: {num_parsed}; inserted: {num_inserted}")
+                    table: str) -> int:
+    return load(cur, file, analysis_id, table, PANTHER_COLUMNS)
 
 
 def pirsr_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
-                  table: str):
-    _hmmer3_matches(cur, file, analysis_id, table, relno_maj_as_int=False)
+                  table: str) -> int:
+    return load(cur, file, analysis_id, table, _hmmer3_columns(False))
 
 
-def prints_matches(cur: oracledb.Cursor, file: str, analysis_id: int, table: str):
-    sql = f"""
-        INSERT INTO {table} (
-            ANALYSIS_ID, ANALYSIS_NAME, RELNO_MAJOR, RELNO_MINOR,
-            UPI, METHOD_AC, MODEL_AC, SEQ_START, SEQ_END, FRAGMENTS,
-            SEQSCORE, SEQEVALUE, MOTIF_NUMBER, PVALUE, GRAPHSCAN
-        )
-        VALUES (:analysis_id, :analysis_name, :relno_major, :relno_minor,
-                :upi, :method_ac, :model_ac, :seq_start, :seq_end, :fragments,
-                :seq_score, :seq_evalue, :motif_number, :pvalue, :graphscan)
-    """
-
-    cur.setinputsizes(seq_evalue=oracledb.DB_TYPE_BINARY_DOUBLE,
-                      pvalue=oracledb.DB_TYPE_BINARY_DOUBLE)
-
-    values = []
-    num_parsed = num_inserted = 0
-    with open(file, "rt") as fh:
-        for line in fh:
-            num_parsed += 1
-            cols = line.rstrip().split('\t')
-            values.append({
-                "analysis_id": analysis_id,
-                "analysis_name": cols[0],
-                "relno_major": cols[1],
-                "relno_minor": cols[2],
-                "upi": cols[3],
-                "method_ac": cols[4],
-                "model_ac": cols[5],
-                "seq_start": int(cols[6]),
-                "seq_end": int(cols[7]),
-                "fragments": cols[8],
-                "seq_score": Decimal(cols[9]),
-                "seq_evalue": Decimal(cols[10]),
-                "motif_number": int(cols[11]),
-                "pvalue": Decimal(cols[12]),
-                "graphscan": cols[13]
-            })
-
-            if len(values) == _INSERT_SIZE:
-                cur.executemany(sql, values)
-                num_inserted += cur.rowcount
-                values.clear()
-
-    if values:
-        cur.executemany(sql, values)
-        num_inserted += cur.rowcount
-
-    logger.debug(f"parsed: {num_parsed}; inserted: {num_inserted}")
+def prints_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
+                   table: str) -> int:
+    return load(cur, file, analysis_id, table, PRINTS_COLUMNS)
 
 
 prosite_profiles_matches = hamap_matches
 
 
 def prosite_patterns_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
-                             table: str):
-    sql = f"""
-        INSERT INTO {table} (
-            ANALYSIS_ID, ANALYSIS_NAME, RELNO_MAJOR, RELNO_MINOR,
-            UPI, METHOD_AC, MODEL_AC, SEQ_START, SEQ_END, FRAGMENTS,
-            LOCATION_LEVEL, ALIGNMENT
-        )
-        VALUES (:analysis_id, :analysis_name, :relno_major, :relno_minor,
-                :upi, :method_ac, :model_ac, :seq_start, :seq_end, :fragments,
-                :loc_level, :alignment)
-    """
-
-    values = []
-    num_parsed = num_inserted = 0
-    with open(file, "rt") as fh:
-        for line in fh:
-            num_parsed += 1
-            cols = line.rstrip().split('\t')
-            values.append({
-                "analysis_id": analysis_id,
-                "analysis_name": cols[0],
-                "relno_major": cols[1],
-                "relno_minor": cols[2],
-                "upi": cols[3],
-                "method_ac": cols[4],
-                "model_ac": cols[5],
-                "seq_start": int(cols[6]),
-                "seq_end": int(cols[7]),
-                "fragments": cols[8],
-                "loc_level": int(cols[9]),
-                "alignment": cols[10]
-            })
-
-            if len(values) == _INSERT_SIZE:
-                cur.executemany(sql, values)
-                num_inserted += cur.rowcount
-                values.clear()
-
-    if values:
-        cur.executemany(sql, values)
-        num_inserted += cur.rowcount
-
-    logger.debug(f"parsed: {num_parsed}; inserted: {num_inserted}")
-
-
-def signalp_tmhmm_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
-                          table: str, relno_maj_as_int: bool):
-    sql = f"""
-        INSERT INTO {table} (
-            ANALYSIS_ID, ANALYSIS_NAME, RELNO_MAJOR, RELNO_MINOR,
-            UPI, METHOD_AC, MODEL_AC, SEQ_START, SEQ_END, FRAGMENTS,
-            SEQSCORE
-        )
-        VALUES (:analysis_id, :analysis_name, :relno_major, :relno_minor,
-                :upi, :method_ac, :model_ac, :seq_start, :seq_end, :fragments,
-                :seq_score)
-    """
-
-    values = []
-    num_parsed = num_inserted = 0
-    with open(file, "rt") as fh:
-        for line in fh:
-            num_parsed += 1
-            cols = line.rstrip().split('\t')
-            values.append({
-                "analysis_id": analysis_id,
-                "analysis_name": cols[0],
-                "relno_major": int(cols[1]) if relno_maj_as_int else cols[1],
-                "relno_minor": cols[2],
-                "upi": cols[3],
-                "method_ac": cols[4],
-                "model_ac": cols[5],
-                "seq_start": int(cols[6]),
-                "seq_end": int(cols[7]),
-                "fragments": cols[8],
-                "seq_score": Decimal(cols[9])
-            })
-
-            if len(values) == _INSERT_SIZE:
-                cur.executemany(sql, values)
-                num_inserted += cur.rowcount
-                values.clear()
-
-    if values:
-        cur.executemany(sql, values)
-        num_inserted += cur.rowcount
-
-    logger.debug(f"parsed: {num_parsed}; inserted: {num_inserted}")
+                             table: str) -> int:
+    return load(cur, file, analysis_id, table, PROSITE_PATTERNS_COLUMNS)
 
 
 def signalp_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
-                    table: str):
-    signalp_tmhmm_matches(cur, file, analysis_id, table,
-                          relno_maj_as_int=False)
+                    table: str) -> int:
+    return load(cur, file, analysis_id, table,
+                _common_columns(False) + [_number("SEQSCORE", 9)])
 
 
-def sfld_matches(cur: oracledb.Cursor, file: str, analysis_id: int, table: str):
-    _hmmer3_matches(cur, file, analysis_id, table, relno_maj_as_int=True)
+def sfld_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
+                 table: str) -> int:
+    return load(cur, file, analysis_id, table, _hmmer3_columns(True))
 
 
 def smart_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
-                  table: str):
-    sql = f"""
-        INSERT INTO {table} (
-            ANALYSIS_ID, ANALYSIS_NAME, RELNO_MAJOR, RELNO_MINOR,
-            UPI, METHOD_AC, MODEL_AC, SEQ_START, SEQ_END, FRAGMENTS,
-            SEQSCORE, SEQEVALUE, HMM_BOUNDS, HMM_START, HMM_END,
-            HMM_LENGTH, SCORE, EVALUE
-        )
-        VALUES (:analysis_id, :analysis_name, :relno_major, :relno_minor,
-                :upi, :method_ac, :model_ac, :seq_start, :seq_end, :fragments,
-                :seq_score, :seq_evalue, :hmm_bounds, :hmm_start, :hmm_end,
-                :hmm_length, :score, :evalue)
-    """
-
-    cur.setinputsizes(seq_evalue=oracledb.DB_TYPE_BINARY_DOUBLE,
-                      evalue=oracledb.DB_TYPE_BINARY_DOUBLE)
-
-    values = []
-    num_parsed = num_inserted = 0
-    with open(file, "rt") as fh:
-        for line in fh:
-            num_parsed += 1
-            cols = line.rstrip().split('\t')
-            values.append({
-                "analysis_id": analysis_id,
-                "analysis_name": cols[0],
-                "relno_major": int(cols[1]),
-                "relno_minor": cols[2],
-                "upi": cols[3],
-                "method_ac": cols[4],
-                "model_ac": cols[5],
-                "seq_start": int(cols[6]),
-                "seq_end": int(cols[7]),
-                "fragments": cols[8],
-                "seq_score": Decimal(cols[9]),
-                "seq_evalue": Decimal(cols[10]),
-                "hmm_bounds": cols[11],
-                "hmm_start": int(cols[12]),
-                "hmm_end": int(cols[13]),
-                "hmm_length": int(cols[14]),
-                "score": Decimal(cols[15]),
-                "evalue": Decimal(cols[16])
-            })
-
-            if len(values) == _INSERT_SIZE:
-                cur.executemany(sql, values)
-                num_inserted += cur.rowcount
-                values.clear()
-
-    if values:
-        cur.executemany(sql, values)
-        num_inserted += cur.rowcount
-
-    logger.debug(f"parsed: {num_parsed}; inserted: {num_inserted}")
+                  table: str) -> int:
+    return load(cur, file, analysis_id, table, SMART_COLUMNS)
 
 
 def superfamily_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
-                        table: str):
-    sql = f"""
-        INSERT INTO {table} (
-            ANALYSIS_ID, ANALYSIS_NAME, RELNO_MAJOR, RELNO_MINOR,
-            UPI, METHOD_AC, MODEL_AC, SEQ_START, SEQ_END, FRAGMENTS,
-            SEQEVALUE, HMM_LENGTH
-        )
-        VALUES (:analysis_id, :analysis_name, :relno_major, :relno_minor,
-                :upi, :method_ac, :model_ac, :seq_start, :seq_end, :fragments,
-                :seq_evalue, :hmm_length)
-    """
-
-    cur.setinputsizes(seq_evalue=oracledb.DB_TYPE_BINARY_DOUBLE)
-
-    values = []
-    num_parsed = num_inserted = 0
-    with open(file, "rt") as fh:
-        for line in fh:
-            num_parsed += 1
-            cols = line.rstrip().split('\t')
-            values.append({
-                "analysis_id": analysis_id,
-                "analysis_name": cols[0],
-                "relno_major": int(cols[1]),
-                "relno_minor": cols[2],
-                "upi": cols[3],
-                "method_ac": cols[4],
-                "model_ac": cols[5],
-                "seq_start": int(cols[6]),
-                "seq_end": int(cols[7]),
-                "fragments": cols[8],
-                "seq_evalue": Decimal(cols[9]),
-                "hmm_length": int(cols[10]),
-            })
-
-            if len(values) == _INSERT_SIZE:
-                cur.executemany(sql, values)
-                num_inserted += cur.rowcount
-                values.clear()
-
-    if values:
-        cur.executemany(sql, values)
-        num_inserted += cur.rowcount
-
-    logger.debug(f"parsed: {num_parsed}; inserted: {num_inserted}")
+                        table: str) -> int:
+    return load(cur, file, analysis_id, table, SUPERFAMILY_COLUMNS)
 
 
 def tmhmm_matches(cur: oracledb.Cursor, file: str, analysis_id: int,
-                  table: str):
-    signalp_tmhmm_matches(cur, file, analysis_id, table,
-                          relno_maj_as_int=True)
+                  table: str) -> int:
+    return load(cur, file, analysis_id, table,
+                _common_columns(True) + [_number("SEQSCORE", 9)])
@@ -1,8 +1,13 @@
+import fcntl
+import json
 import os
+import signal
 import subprocess
 import sys
 import time
+from contextlib import contextmanager
 from datetime import datetime
+from threading import Condition, Event, Lock, Thread
 
 import oracledb
 
@@ -12,6 +17,13 @@ from pyinterprod import logger
 # String printed by I5 on successful completion
 _I5_SUCCESS = "100% done:  InterProScan analyses completed"
 
+# Scheduler running jobs on the current machine
+LOCAL = "local"
+
+# Strings printed by local jobs killed by the time limit or the OOM killer
+LOCAL_TIMEOUT = "InterProScan reached the time limit"
+LOCAL_OOM = "InterProScan was killed (out of memory?)"
+
 
 def get_incomplete_jobs(cur: oracledb.Cursor) -> dict[int, list[tuple]]:
     cur.execute(
@@ -42,6 +54,27 @@ def get_incomplete_jobs(cur: oracledb.Cursor) -> dict[int, list[tuple]]:
     return incomplete_jobs
 
 
+def add_combined_column(cur: oracledb.Cursor):
+    """
+    Add ANALYSIS_JOBS.COMBINED, set to 'Y' for analyses searched
+    in the same job as others: their accounting (CPU time, memory)
+    is that of the whole job
+    """
+    try:
+        cur.execute(
+            """
+            ALTER TABLE IPRSCAN.ANALYSIS_JOBS
+            ADD (COMBINED CHAR(1))
+            """
+        )
+    except oracledb.DatabaseError as exc:
+        error, = exc.args
+
+        # ORA-01430: column being added already exists in table
+        if error.code != 1430:
+            raise exc
+
+
 def add_job(cur: oracledb.Cursor,
             analysis_id: int,
             upi_from: str,
@@ -75,7 +108,8 @@ def update_job(cur: oracledb.Cursor,
                lim_mem: int | None = None,
                cpu_time: int | None = None,
                success: bool | None = None,
-               sequences: int | None = None):
+               sequences: int | None = None,
+               combined: bool | None = None):
     columns = []
     params = []
     if start_time is not None:
@@ -99,6 +133,9 @@ def update_job(cur: oracledb.Cursor,
     if sequences is not None:
         columns.append("SEQUENCES = :sequences")
         params.append(sequences)
+    if combined is not None:
+        columns.append("COMBINED = :combined")
+        params.append("Y" if combined else "N")
 
     if columns:
         cur.execute(
@@ -131,20 +168,204 @@ def get_unfinished_lsf_jobs() -> dict[str, int]:
 
 
 def get_unfinished_slurm_jobs() -> dict[str, int]:
-    stdout = subprocess.run(["squeue", "-h" "-O", "JobId,Name",
+    # Not "-O JobId,Name": names are truncated to 20 characters
+    stdout = subprocess.run(["squeue", "-h", "-o", "%i %j",
                              "-t", "pending,running"],
                             capture_output=True,
                             encoding="utf-8").stdout
 
     jobs = {}
-    for line in stdout.split("\n")[1:]:
-        if line:
+    for line in stdout.split("\n"):
+        if line.strip():
             job_id, name = line.split(maxsplit=1)
-            jobs[name] = int(job_id)
+            jobs[name.strip()] = int(job_id)
 
     return jobs
 
 
+def get_unfinished_jobs(scheduler: str) -> dict[str, int]:
+    if scheduler.lower() == LOCAL:
+        # Local jobs do not outlive the manager
+        return {}
+    elif scheduler.lower() == "lsf":
+        return get_unfinished_lsf_jobs()
+    elif scheduler.lower() == "slurm":
+        return get_unfinished_slurm_jobs()
+    else:
+        raise ValueError(scheduler)
+
+
+class JobMonitor(Thread):
+    """
+    Query the scheduler for the state of all unfinished jobs at regular
+    intervals, so task threads do not poll the scheduler for each job
+    """
+
+    def __init__(self, scheduler: str, interval: int = 30):
+        super().__init__(daemon=True)
+        # Fail early if the scheduler is not supported
+        get_unfinished_jobs(scheduler)
+        self.scheduler = scheduler
+        self.interval = interval
+        self.unfinished = {}
+        # Time at which the last snapshot was requested
+        self.timestamp = 0.0
+        self._cond = Condition()
+        self._halt = Event()
+
+    def run(self):
+        while not self._halt.is_set():
+            ts = time.time()
+            try:
+                unfinished = get_unfinished_jobs(self.scheduler)
+            except Exception as exc:
+                # Keep monitoring: task threads wait for snapshots
+                logger.warning(f"cannot query {self.scheduler}: {exc}")
+            else:
+                with self._cond:
+                    self.unfinished = unfinished
+                    self.timestamp = ts
+                    self._cond.notify_all()
+
+            self._halt.wait(self.interval)
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+    def wait(self, since: float, timeout: float | None = None) -> float:
+        """
+        Wait for a snapshot more recent than `since`
+
+        :return: time of the most recent snapshot
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.timestamp > since, timeout)
+            return self.timestamp
+
+    def is_finished(self, name: str, submitted: float) -> bool:
+        """
+        Jobs submitted after the most recent snapshot are not finished,
+        as they might not have been listed by the scheduler yet.
+        """
+        with self._cond:
+            return self.timestamp > submitted and name not in self.unfinished
+
+
+class LocalResources:
+    """
+    CPU/memory slots of the current machine, shared by task threads,
+    or by task processes if `path` is set
+    """
+
+    def __init__(self, cpu: int | None = None, mem: int | None = None,
+                 path: str | None = None):
+        if cpu is None:
+            cpu = os.cpu_count()
+
+        if mem is None:
+            # MB
+            mem = (os.sysconf("SC_PAGE_SIZE") *
+                   os.sysconf("SC_PHYS_PAGES")) // 1024 ** 2
+
+        self.cpu = cpu
+        self.mem = mem
+        self.used_cpu = 0
+        self.used_mem = 0
+        # File of slots used by each process
+        self.path = path
+        self._lock = Lock()
+
+    def __getstate__(self):
+        # Locks cannot be sent to task processes
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    def _fits(self, used_cpu: int, used_mem: int, cpu: int, mem: int) -> bool:
+        # Always allow one job, even if it requests too much
+        return used_cpu == 0 or (used_cpu + cpu <= self.cpu and
+                                 used_mem + mem <= self.mem)
+
+    def acquire(self, cpu: int, mem: int) -> bool:
+        if self.path:
+            with self._open_slots() as slots:
+                used_cpu = sum(c for c, m in slots.values())
+                used_mem = sum(m for c, m in slots.values())
+                if not self._fits(used_cpu, used_mem, cpu, mem):
+                    return False
+
+                slots[str(os.getpid())] = [cpu, mem]
+                return True
+
+        with self._lock:
+            if not self._fits(self.used_cpu, self.used_mem, cpu, mem):
+                return False
+
+            self.used_cpu += cpu
+            self.used_mem += mem
+            return True
+
+    def release(self, cpu: int, mem: int):
+        if self.path:
+            with self._open_slots() as slots:
+                slots.pop(str(os.getpid()), None)
+
+            return
+
+        with self._lock:
+            self.used_cpu -= cpu
+            self.used_mem -= mem
+
+    @contextmanager
+    def _open_slots(self):
+        with open(self.path, "a+") as fh:
+            # Released when the file is closed
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            fh.seek(0)
+            content = fh.read()
+            slots = json.loads(content) if content else {}
+
+            # Slots of processes that exited without releasing them
+            for pid in list(slots):
+                try:
+                    os.kill(int(pid), 0)
+                except ProcessLookupError:
+                    del slots[pid]
+                except PermissionError:
+                    pass
+
+            yield slots
+
+            fh.seek(0)
+            fh.truncate()
+            json.dump(slots, fh)
+
+
+def run_with_resources(resources: LocalResources, cpu: int, mem: int,
+                       fn, *args, **kwargs):
+    """
+    Wait for CPU/memory slots to be available, then run a function
+
+    :param resources: slots shared by task processes
+    :param cpu: number of CPUs used by the function
+    :param mem: memory (MB) used by the function
+    :param fn: function to run
+    :return: the value returned by the function
+    """
+    while not resources.acquire(cpu, mem):
+        time.sleep(10)
+
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        resources.release(cpu, mem)
+
+
 def run_job(i5_dir: str,
             applications: str,
             fasta_file: str,
@@ -175,7 +396,12 @@ def run_job(i5_dir: str,
 
     logger.info(f"Command: {' '.join(args)}")
     ts = time.time()
-    process = subprocess.run(args, capture_output=True, timeout=_timeout)
+    try:
+        process = subprocess.run(args, capture_output=True, timeout=_timeout)
+    except subprocess.TimeoutExpired:
+        print(LOCAL_TIMEOUT, file=sys.stderr)
+        raise
+
     stdout = process.stdout.decode("utf-8")
     stderr = process.stderr.decode("utf-8")
     code = process.returncode
@@ -187,6 +413,9 @@ def run_job(i5_dir: str,
 
     logger.info(f"Process exited with code {code} after {runtime:.0f} seconds.")
 
+    if code == -signal.SIGKILL:
+        print(LOCAL_OOM, file=sys.stderr)
+
     if code != 0 or _I5_SUCCESS not in stdout:
         raise RuntimeError("InterProScan error")
     elif not os.path.isfile(matches_output):
@@ -1,18 +1,22 @@
+import errno
 import math
+import multiprocessing as mp
 import os
 import shutil
 import time
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
 from logging import DEBUG
 from queue import Queue, Empty
-from threading import Thread
+from threading import Lock, Thread
 
 import oracledb
 from mundone import Task
 
 from pyinterprod import logger
 from pyinterprod.uniprot.uniparc import int_to_upi, upi_to_int, range_upi
-from . import analyses, jobs
+from pyinterprod.utils.oracle import clob_as_str
+from . import analyses, jobs, planner
 
 
 """
@@ -49,6 +53,17 @@ _DB_TO_I5 = {
     "TMHMM": ("TMHMM", analyses.tmhmm_matches, None),
 }
 
+# Analyses with a short runtime, dominated by InterProScan's startup
+_LIGHTWEIGHT = {
+    "COILS",
+    "Phobius",
+    "PROSITE patterns",
+    "SignalP_Euk",
+    "SignalP_Gram_positive",
+    "SignalP_Gram_negative",
+    "TMHMM",
+}
+
 # Input/output file names
 _INPUT_FASTA = "input.fa"
 _OUTPUT_MATCHES = "output.tsv-pro"
@@ -75,8 +90,28 @@ class InterProScanTask(Task):
     has_sites: bool
     scheduler: str | None = None
     queue: str | None = None
+    # Tasks of the analyses run together (comma-separated `appl`)
+    members: list["InterProScanTask"] = field(default_factory=list)
 
     def __post_init__(self):
+        # Limits are updated on resubmission: do not share them across tasks
+        self.config = self.config.copy()
+
+        if self.is_local():
+            # Time limit enforced by the job itself
+            self.job_kwargs = dict(cpu=self.config["job_cpu"],
+                                   timeout=self.config["job_timeout"])
+            scheduler = None
+        else:
+            self.job_kwargs = dict(cpu=self.config["job_cpu"])
+            scheduler = dict(
+                type=self.scheduler,
+                queue=self.queue,
+                cpu=self.config["job_cpu"],
+                mem=self.config["job_mem"],
+                hours=self.config["job_timeout"],
+            )
+
         # Call the parent class's initializer
         super().__init__(
             fn=jobs.run_job,
@@ -87,27 +122,85 @@ class InterProScanTask(Task):
                 self.get_matches_path(),
                 self.get_sites_path(),
             ),
-            kwargs=dict(cpu=self.config["job_cpu"]),
+            kwargs=self.job_kwargs,
             name="_".join(
                 [
                     "IPM",
-                    self.appl,
+                    self.appl.replace(",", "+"),
                     self.version,
                     str(self.analysis_id),
                     self.upi_from,
                     self.upi_to,
                 ]
             ),
-            scheduler=dict(
-                type=self.scheduler,
-                queue=self.queue,
-                cpu=self.config["job_cpu"],
-                mem=self.config["job_mem"],
-                hours=self.config["job_timeout"],
-            ),
+            scheduler=scheduler,
             random_suffix=False,
         )
 
+    def is_local(self) -> bool:
+        return (self.scheduler or "").lower() == jobs.LOCAL
+
+    def get_analysis_ids(self) -> list[int]:
+        if self.members:
+            return [t.analysis_id for t in self.members]
+
+        return [self.analysis_id]
+
+    def get_memory_limit(self) -> int:
+        if self.is_local():
+            return self.config["job_mem"]
+
+        return self.executor.memory
+
+    def is_oom(self) -> bool:
+        if self.is_local():
+            return jobs.LOCAL_OOM in (self.stderr or "")
+
+        return super().is_oom()
+
+    def is_timeout(self) -> tuple[bool, float | None]:
+        """
+        :return: whether the job reached its time limit, and the limit (hours)
+        """
+        if self.is_local():
+            return (jobs.LOCAL_TIMEOUT in (self.stderr or ""),
+                    self.config["job_timeout"])
+
+        starttime, endtime = self.executor.get_times(self.stdout)
+        if (
+            starttime is not None
+            and endtime is not None
+            and self.executor.limit is not None
+        ):
+            runtime = (endtime - starttime).total_seconds() / 3600
+            limit = self.executor.limit.total_seconds() / 3600
+            return runtime >= limit, limit
+
+        return False, None
+
+    def increase_timeout(self, factor: float):
+        if self.is_local():
+            hours = int(math.ceil(self.config["job_timeout"] * factor))
+            self.config["job_timeout"] = hours
+            self.job_kwargs["timeout"] = hours
+        else:
+            self.executor.limit *= factor
+
+    def increase_memory(self, factor: float):
+        if self.is_local():
+            # Memory is not limited, but reserved on the current machine
+            self.config["job_mem"] = int(self.config["job_mem"] * factor)
+            return
+
+        maxmem = self.maxmem
+        try:
+            while True:
+                self.executor.memory *= factor
+                if self.executor.memory > maxmem:
+                    break
+        except TypeError:
+            pass
+
     def mkdir(self):
         path = self.get_run_dir()
 
@@ -129,7 +222,7 @@ class InterProScanTask(Task):
     def get_run_dir(self) -> str:
         return os.path.join(
             self.work_dir,
-            self.appl,
+            self.appl.replace(",", "+"),
             self.version,
             f"{self.analysis_id}_{self.upi_from}_{self.upi_to}",
         )
@@ -147,6 +240,189 @@ class InterProScanTask(Task):
             return None
 
 
+@dataclass
+class _FastaEntry:
+    lock: Lock
+    num_sequences: int | None = None
+    references: int = 0
+
+
+class FastaCache:
+    """
+    FASTA files shared by all tasks searching the same UPI range.
+    Each range is exported once, then linked into each task's run directory,
+    and removed when the last task using it is finished.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.lock = Lock()
+        self.entries: dict[tuple[str, str], _FastaEntry] = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    def get_path(self, upi_from: str, upi_to: str) -> str:
+        return os.path.join(self.root, f"{upi_from}_{upi_to}.fa")
+
+    def add_reference(self, upi_from: str, upi_to: str):
+        with self.lock:
+            key = (upi_from, upi_to)
+            try:
+                entry = self.entries[key]
+            except KeyError:
+                entry = self.entries[key] = _FastaEntry(lock=Lock())
+
+            entry.references += 1
+
+    def export(self, cur: oracledb.Cursor, upi_from: str, upi_to: str,
+               output: str) -> int:
+        with self.lock:
+            entry = self.entries[(upi_from, upi_to)]
+
+        path = self.get_path(upi_from, upi_to)
+        with entry.lock:
+            if entry.num_sequences is None:
+                tmp_path = f"{path}.tmp"
+                entry.num_sequences = export_sequences(cur, upi_from, upi_to,
+                                                       tmp_path)
+                if entry.num_sequences > 0:
+                    os.replace(tmp_path, path)
+                else:
+                    try:
+                        os.unlink(tmp_path)
+                    except FileNotFoundError:
+                        pass
+
+        if entry.num_sequences > 0:
+            # Left by a previous attempt of the task
+            try:
+                os.unlink(output)
+            except FileNotFoundError:
+                pass
+
+            try:
+                os.link(path, output)
+            except OSError as exc:
+                if exc.errno != errno.EXDEV:
+                    raise exc
+
+                # Cache and run directory on different file systems
+                os.symlink(path, output)
+
+        return entry.num_sequences
+
+    def release(self, upi_from: str, upi_to: str):
+        with self.lock:
+            key = (upi_from, upi_to)
+            entry = self.entries[key]
+            entry.references -= 1
+            if entry.references > 0:
+                return
+
+            del self.entries[key]
+
+        try:
+            os.unlink(self.get_path(upi_from, upi_to))
+        except FileNotFoundError:
+            pass
+
+
+def combine_tasks(tasks: list[tuple[InterProScanTask, bool]],
+                  analyses_info: dict,
+                  max_timeout: int) -> list[tuple[InterProScanTask, bool]]:
+    """
+    Group pending tasks of lightweight analyses searching the same UPI range
+    with the same InterProScan installation, so they run in a single job
+
+    :param tasks: list of (task, is_new)
+    :param analyses_info: dictionary of analysis ID -> analysis
+    :param max_timeout: maximum time limit of a job, in hours
+    :return: list of (task, is_new), where tasks may run several analyses
+    """
+    groups = {}
+    others = []
+    for task, is_new in tasks:
+        name = analyses_info[task.analysis_id]["name"]
+        if name in _LIGHTWEIGHT and not task.is_running() and not task.is_done():
+            key = (task.i5_dir, task.upi_from, task.upi_to, is_new)
+            try:
+                groups[key].append(task)
+            except KeyError:
+                groups[key] = [task]
+        else:
+            others.append((task, is_new))
+
+    for (_, _, _, is_new), members in groups.items():
+        if len(members) == 1:
+            others.append((members[0], is_new))
+            continue
+
+        members.sort(key=lambda t: t.appl)
+        first = members[0]
+        # Analyses are run one after the other
+        timeout = sum(t.config["job_timeout"] for t in members)
+        config = {
+            "job_cpu": max(t.config["job_cpu"] for t in members),
+            "job_mem": max(t.config["job_mem"] for t in members),
+            "job_size": first.config["job_size"],
+            "job_timeout": min(timeout, max_timeout),
+        }
+
+        task = InterProScanTask(
+            analysis_id=first.analysis_id,
+            upi_from=first.upi_from,
+            upi_to=first.upi_to,
+            i5_dir=first.i5_dir,
+            work_dir=first.work_dir,
+            appl=",".join(t.appl for t in members),
+            version="+".join(t.version for t in members),
+            config=config,
+            has_sites=any(t.has_sites for t in members),
+            scheduler=first.scheduler,
+            queue=first.queue,
+            members=members,
+        )
+        others.append((task, is_new))
+
+    return others
+
+
+def demultiplex(task: InterProScanTask):
+    """
+    Split the output files of a task running several analyses
+    into the output files of each analysis' task
+    """
+    members = {sanitize_name(t.appl): t for t in task.members}
+
+    for member in task.members:
+        member.mkdir()
+
+    _split_output(task.get_matches_path(), 0,
+                  {k: t.get_matches_path() for k, t in members.items()})
+
+    if task.has_sites:
+        _split_output(task.get_sites_path(), 3,
+                      {k: t.get_sites_path() for k, t in members.items()
+                       if t.has_sites})
+
+
+def _split_output(path: str, column: int, outputs: dict[str, str]):
+    files = {}
+    try:
+        for key, output in outputs.items():
+            files[key] = open(output, "wt")
+
+        with open(path, "rt") as fh:
+            for line in fh:
+                name = line.split("\t", column + 1)[column]
+                try:
+                    files[sanitize_name(name)].write(line)
+                except KeyError:
+                    raise RuntimeError(f"{path}: unexpected analysis {name}")
+    finally:
+        for fh in files.values():
+            fh.close()
+
+
 def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
     base_config = {
         "job_cpu": kwargs.get("job_cpu", 8),
@@ -166,6 +442,21 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
     queue = kwargs.get("queue")
     to_run = kwargs.get("analyses", [])
     to_exclude = kwargs.get("exclude", [])
+    # Number of processes persisting results
+    num_persisters = kwargs.get("persisters", 4)
+    # If set, size jobs to run for this number of hours, using past jobs
+    target_runtime = kwargs.get("target_runtime")
+    # Run lightweight analyses searching the same sequences in the same job
+    combine = kwargs.get("combine", False)
+    # Seconds between two queries of the scheduler
+    if (scheduler or "").lower() == jobs.LOCAL:
+        poll_interval = kwargs.get("poll_interval", 1)
+        # CPU/memory (MB) available to local jobs (default: whole machine)
+        resources = jobs.LocalResources(kwargs.get("local_cpu"),
+                                        kwargs.get("local_mem"))
+    else:
+        poll_interval = kwargs.get("poll_interval", 30)
+        resources = None
 
     if debug:
         logger.setLevel(DEBUG)
@@ -173,6 +464,7 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
     logger.info("starting")
     con = oracledb.connect(uri)
     cur = con.cursor()
+    jobs.add_combined_column(cur)
 
     # Find analyses to run
     analyses_info = {}
@@ -220,12 +512,7 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
                     configs[analysis_id][key] = value
 
     # Find unfinished (pending + running) jobs
-    if scheduler.lower() == "lsf":
-        name2id = jobs.get_unfinished_lsf_jobs()
-    elif scheduler.lower() == "slurm":
-        name2id = jobs.get_unfinished_slurm_jobs()
-    else:
-        raise ValueError(scheduler)
+    name2id = jobs.get_unfinished_jobs(scheduler)
 
     """
     Find (in the database) jobs that are either:
@@ -236,6 +523,26 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
 
     cur.execute("SELECT MAX(UPI) FROM UNIPARC.PROTEIN")
     (max_upi,) = cur.fetchone()
+
+    cost_models = {}
+    residue_blocks = []
+    if target_runtime:
+        cost_models = planner.get_cost_models(cur, list(analyses_info))
+        planner.log_models(cost_models, {k: v["name"]
+                                         for k, v in analyses_info.items()})
+
+        min_upi = None
+        for analysis_id in cost_models:
+            analysis_max_upi = analyses_info[analysis_id]["max_upi"]
+            if analysis_max_upi is None:
+                min_upi = int_to_upi(1)
+                break
+            elif min_upi is None or analysis_max_upi < min_upi:
+                min_upi = analysis_max_upi
+
+        if min_upi is not None and min_upi < max_upi:
+            residue_blocks = planner.get_residue_blocks(cur, min_upi, max_upi)
+
     cur.close()
     con.close()
 
@@ -269,6 +576,11 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
 
             task.workdir = os.path.join(temp_dir, task.name)
 
+            if task.is_local():
+                # Local jobs died with the previous manager: resubmit
+                tasks.append((task, False))
+                continue
+
             # Assumes task is running
             task.set_running()
 
@@ -294,8 +606,29 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
         else:
             next_upi = int_to_upi(1)
 
-        job_size = config["job_size"]
-        for upi_from, upi_to in range_upi(next_upi, max_upi, job_size):
+        if next_upi > max_upi:
+            continue
+
+        model = cost_models.get(analysis_id)
+        if model is not None:
+            # Ranges sized to run for about `target_runtime` hours
+            ranges = []
+            for upi_from, upi_to, num_seqs, num_res in planner.plan_ranges(
+                residue_blocks, next_upi, max_upi, model,
+                target_runtime * 3600
+            ):
+                job_config = planner.predict_resources(model, num_seqs,
+                                                       num_res, config,
+                                                       max_timeout)
+                ranges.append((upi_from, upi_to, job_config))
+        else:
+            ranges = [
+                (upi_from, upi_to, config)
+                for upi_from, upi_to in range_upi(next_upi, max_upi,
+                                                  config["job_size"])
+            ]
+
+        for upi_from, upi_to, job_config in ranges:
             task = InterProScanTask(
                 analysis_id=analysis_id,
                 upi_from=upi_from,
@@ -304,7 +637,7 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
                 work_dir=work_dir,
                 appl=appl,
                 version=analysis_version,
-                config=config,
+                config=job_config,
                 has_sites=has_sites,
                 scheduler=scheduler,
                 queue=queue,
@@ -320,18 +653,36 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
             num_jobs_per_analysis[analysis_id] += 1
 
     tasks = tmp_tasks
+    # Progress is tracked per analysis, even for tasks run together
     num_tasks = len(tasks)
     logger.info(f"tasks: {num_tasks}")
     if max_running_jobs == 0 or num_tasks == 0:
         return
 
+    if combine:
+        tasks = combine_tasks(tasks, analyses_info, max_timeout)
+        for task, _ in tasks:
+            if task.members and task.name in name2id:
+                # Job started by a previous run
+                task.workdir = os.path.join(temp_dir, task.name)
+                task.set_running()
+                task.executor.id = name2id.pop(task.name)
+
+        logger.info(f"jobs: {len(tasks)}")
+
+    # Sequences are exported once per UPI range, whatever the analysis
+    fasta_cache = FastaCache(os.path.join(work_dir, "fasta"))
+    for task, _ in tasks:
+        fasta_cache.add_reference(task.upi_from, task.upi_to)
+
     # Create pool of FASTA export workers
     fasta_workers = []
     fasta_queue = Queue()
     submit_queue = Queue()
     for _ in range(8):
         t = Thread(
-            target=export_sequences_worker, args=(uri, fasta_queue, submit_queue)
+            target=export_sequences_worker,
+            args=(uri, fasta_queue, submit_queue, fasta_cache)
         )
         t.start()
         fasta_workers.append(t)
@@ -341,7 +692,8 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
     while tasks:
         task, is_new = tasks.pop(0)
         if is_new:
-            jobs.add_job(cur, task.analysis_id, task.upi_from, task.upi_to)
+            for analysis_id in task.get_analysis_ids():
+                jobs.add_job(cur, analysis_id, task.upi_from, task.upi_to)
 
         fasta_queue.put((task, is_new))
 
@@ -352,9 +704,29 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
     for _ in fasta_workers:
         fasta_queue.put(None)
 
-    # Start pool of task monitor workers
+    """
+    Start pool of persistence workers (parsing is CPU-bound).
+    Each worker has its own queue and persists one task at a time,
+    so the task of a worker that dies is always known.
+    """
+    ctx = mp.get_context("spawn")
+    result_queue = ctx.Queue()
+    persisters = {}  # PID -> (process, queue)
+    for _ in range(num_persisters):
+        p, q = start_persister(ctx, uri, result_queue)
+        persisters[p.pid] = (p, q)
+
+    # Query the scheduler once per interval for all jobs
+    monitor = jobs.JobMonitor(scheduler, interval=poll_interval)
+    monitor.start()
+
+    """
+    Start pool of task monitor workers.
+    The collect queue is bounded: when persisters cannot keep up,
+    monitors block instead of starting more jobs.
+    """
     task_workers = []
-    collect_queue = Queue()
+    collect_queue = Queue(maxsize=num_persisters * 4)
     for _ in range(8):
         t = Thread(
             target=task_worker,
@@ -363,6 +735,8 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
                 math.floor(max_running_jobs / 8),
                 temp_dir,
                 collect_queue,
+                monitor,
+                resources,
             ),
         )
         t.start()
@@ -374,42 +748,137 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
     num_completed = num_failed = 0
     milestone = step = 5
     retries = {}
+    persisting = {}  # task name -> (task, number of sequences, job's task)
+    to_persist = deque()  # names of tasks waiting for a persister
+    worker_tasks = {}  # persister PID -> task name
+    stats = {}  # analysis ID -> [rows, seconds]
 
     while (num_completed + num_failed) < num_tasks:
-        task, num_sequences = collect_queue.get()
-        collect_queue.task_done()
+        outcomes = []  # (task, num_sequences, persisted, job's task)
 
-        if num_sequences == 0:
-            num_completed += 1
-            logger.debug(f"{task.name}: skipped")
-            continue
+        # Results from persisters
+        while True:
+            try:
+                pid, name, num_rows, seconds, error = result_queue.get(
+                    block=False
+                )
+            except Empty:
+                break
 
-        logfile = os.path.join(temp_dir, f"{task.name}.log")
-        failed = False
-
-        if task.is_successful():
-            logger.debug(f"{task.name}: completed")
-            analysis = analyses_info[task.analysis_id]
-            analysis_name = analysis["name"]
-            matches_table = analysis["tables"]["matches"]
-            sites_table = analysis["tables"]["sites"]
-            _, fn_matches, fn_sites = _DB_TO_I5[analysis_name]
-
-            # Persist data
-            cur2 = con.cursor()
-            ok = analyses.persist_results(
-                cur2,
-                task.analysis_id,
-                fn_matches,
-                task.get_matches_path(),
-                matches_table,
-                fn_sites,
-                task.get_sites_path(),
-                sites_table,
-            )
-            cur2.close()
+            if worker_tasks.get(pid) != name:
+                # Worker already considered dead: task already handled
+                continue
+
+            del worker_tasks[pid]
+            task, num_sequences, job = persisting.pop(name)
+
+            if error:
+                logger.error(f"{task.name}: {error}")
+            elif num_rows is not None:
+                try:
+                    stats[task.analysis_id][0] += num_rows
+                    stats[task.analysis_id][1] += seconds
+                except KeyError:
+                    stats[task.analysis_id] = [num_rows, seconds]
 
-            if ok:
+            outcomes.append((task, num_sequences,
+                             num_rows is not None and not error, job))
+
+        # Persisters that died (e.g. killed by OOM)
+        for pid, (p, _) in list(persisters.items()):
+            if p.is_alive():
+                continue
+
+            del persisters[pid]
+            name = worker_tasks.pop(pid, None)
+            logger.error(f"persister {pid} exited with code {p.exitcode}")
+            if name is not None:
+                # Uncommitted data was rolled back with the session
+                task, num_sequences, job = persisting.pop(name)
+                outcomes.append((task, num_sequences, False, job))
+
+            p, q = start_persister(ctx, uri, result_queue)
+            persisters[p.pid] = (p, q)
+
+        # Assign waiting tasks to idle persisters
+        for pid, (_, q) in persisters.items():
+            if not to_persist:
+                break
+            elif pid not in worker_tasks:
+                name = to_persist.popleft()
+                worker_tasks[pid] = name
+                task, _, _ = persisting[name]
+                q.put(get_persist_args(task, analyses_info))
+
+        # Completed tasks, if persisters have capacity
+        if len(persisting) < num_persisters * 2:
+            try:
+                task, num_sequences = collect_queue.get(timeout=1)
+            except Empty:
+                pass
+            else:
+                collect_queue.task_done()
+
+                if num_sequences == 0:
+                    num_completed += len(task.get_analysis_ids())
+                    fasta_cache.release(task.upi_from, task.upi_to)
+                    logger.debug(f"{task.name}: skipped")
+                elif task.members:
+                    """
+                    Several analyses run together: from now on,
+                    each analysis is persisted (or re-submitted) separately
+                    """
+                    for _ in task.members:
+                        fasta_cache.add_reference(task.upi_from, task.upi_to)
+
+                    fasta_cache.release(task.upi_from, task.upi_to)
+
+                    successful = task.is_successful()
+                    if successful:
+                        try:
+                            demultiplex(task)
+                        except (OSError, RuntimeError) as exc:
+                            logger.error(f"{task.name}: {exc}")
+                            successful = False
+
+                    if successful:
+                        logger.debug(f"{task.name}: completed")
+                        for member in task.members:
+                            persisting[member.name] = (member, num_sequences,
+                                                       task)
+                            to_persist.append(member.name)
+                    else:
+                        logger.debug(f"{task.name}: failed, "
+                                     f"analyses re-submitted separately")
+                        for member in task.members:
+                            member.mkdir()
+                            fasta_cache.export(cur, member.upi_from,
+                                               member.upi_to,
+                                               member.get_fasta_path())
+                            submit_queue.put((member, num_sequences))
+
+                    logfile = os.path.join(temp_dir, f"{task.name}.log")
+                    if keep_files == "all" or (not successful and
+                                               keep_files == "failed"):
+                        with open(logfile, "wt") as fh:
+                            fh.write(task.stdout)
+                            fh.write(task.stderr)
+                    else:
+                        try_rmtree(task.get_run_dir())
+                elif task.is_successful():
+                    logger.debug(f"{task.name}: completed")
+                    persisting[task.name] = (task, num_sequences, task)
+                    to_persist.append(task.name)
+                else:
+                    logger.debug(f"{task.name}: failed")
+                    outcomes.append((task, num_sequences, False, task))
+        elif not outcomes:
+            time.sleep(1)
+
+        for task, num_sequences, persisted, job in outcomes:
+            logfile = os.path.join(temp_dir, f"{task.name}.log")
+
+            if persisted:
                 # Data persisted successfully
                 logger.debug(f"{task.name}: persisted")
                 jobs.update_job(
@@ -417,18 +886,20 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
                     task.analysis_id,
                     task.upi_from,
                     task.upi_to,
-                    start_time=task.start_time,
-                    end_time=task.end_time,
-                    max_mem=task.maxmem,
-                    lim_mem=task.executor.memory,
-                    cpu_time=task.cputime,
+                    start_time=job.start_time,
+                    end_time=job.end_time,
+                    max_mem=job.maxmem,
+                    lim_mem=job.get_memory_limit(),
+                    cpu_time=job.cputime,
                     success=True,
+                    # Accounting of the whole job, not of this analysis
+                    combined=job is not task
                 )
 
                 if keep_files == "all":
                     with open(logfile, "wt") as fh:
-                        fh.write(task.stdout)
-                        fh.write(task.stderr)
+                        fh.write(job.stdout)
+                        fh.write(job.stderr)
                 else:
                     # Remove the log file
                     try:
@@ -439,56 +910,41 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
                     try_rmtree(task.get_run_dir())
 
                 num_completed += 1
-            else:
-                # Persistence error (duplicated matches in I5 output)
+                fasta_cache.release(task.upi_from, task.upi_to)
+                continue
+            elif job.is_successful():
+                # Persistence error (e.g. duplicated matches in I5 output)
                 logger.debug(f"{task.name}: not persisted")
-                failed = True
-        else:
-            logger.debug(f"{task.name}: failed")
-            failed = True
 
-        if failed:
             if keep_files in ("all", "failed"):
                 with open(logfile, "wt") as fh:
-                    fh.write(task.stdout)
-                    fh.write(task.stderr)
+                    fh.write(job.stdout)
+                    fh.write(job.stderr)
 
             # Number of times the task was re-submitted
             num_retries = retries.get(task.name, 0)
 
             # Did the job reached the memory usage limit?
-            mem_err = task.is_oom()
+            mem_err = job.is_oom()
 
             # Did the job reached the timeout limit?
-            time_err = False
-            task_limit = None
-            starttime, endtime = task.executor.get_times(task.stdout)
-            if (
-                starttime is not None
-                and endtime is not None
-                and task.executor.limit is not None
-            ):
-                runtime = (endtime - starttime).total_seconds() / 3600
-                task_limit = task.executor.limit.total_seconds() / 3600
-                time_err = runtime >= task_limit
+            time_err, task_limit = job.is_timeout()
 
             if (auto_retry and (mem_err or time_err)) or num_retries < max_retries:
                 # Task allowed to be re-submitted
 
                 # Increase hours if time limit reached
                 if time_err and (task_limit * 1.25 < max_timeout):
-                    task.executor.limit *= 1.25
+                    task.increase_timeout(1.25)
 
                 if mem_err:
                     # Increase memory requirement
-                    maxmem = task.maxmem
-                    try:
-                        while True:
-                            task.executor.memory *= 1.5
-                            if task.executor.memory > maxmem:
-                                break
-                    except TypeError:
-                        pass
+                    task.increase_memory(1.5)
+
+                if job is not task:
+                    # Analysis run with others: input not in its directory
+                    fasta_cache.export(cur, task.upi_from, task.upi_to,
+                                       task.get_fasta_path())
 
                 # Resubmit task
                 task.set_pending()
@@ -500,6 +956,7 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
             else:
                 # Max number of retries reached
                 num_failed += 1
+                fasta_cache.release(task.upi_from, task.upi_to)
 
                 if keep_files not in ("all", "failed"):
                     try_rmtree(task.get_run_dir())
@@ -510,16 +967,24 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
                 milestone += step
             logger.debug(f"Total: {num_tasks}. Completed: {num_completed}. Failed: {num_failed}")
             logger.info(f"progress: {progress:>3.0f}%")
+            log_throughput(stats, analyses_info)
 
     cur.close()
     con.close()
 
+    for _, q in persisters.values():
+        q.put(None)
+
+    for p, _ in persisters.values():
+        p.join()
+
     for _ in task_workers:
         submit_queue.put(None)
 
     fasta_queue.join()
     submit_queue.join()
     collect_queue.join()
+    monitor.stop()
 
     if num_failed:
         logger.error(f"{num_failed} task(s) failed")
@@ -527,9 +992,75 @@ def run(uri: str, work_dir: str, temp_dir: str, **kwargs):
         logger.info("complete")
 
 
-def export_sequences_worker(uri: str, inqueue: Queue, outqueue: Queue):
+def get_persist_args(task: InterProScanTask, analyses_info: dict) -> tuple:
+    analysis = analyses_info[task.analysis_id]
+    _, fn_matches, fn_sites = _DB_TO_I5[analysis["name"]]
+    return (
+        task.name,
+        task.analysis_id,
+        fn_matches,
+        task.get_matches_path(),
+        analysis["tables"]["matches"],
+        fn_sites,
+        task.get_sites_path(),
+        analysis["tables"]["sites"],
+    )
+
+
+def log_throughput(stats: dict[int, list], analyses_info: dict):
+    for analysis_id in sorted(stats, key=lambda k: analyses_info[k]["name"]):
+        num_rows, seconds = stats[analysis_id]
+        name = analyses_info[analysis_id]["name"]
+        rate = num_rows / seconds if seconds > 0 else 0
+        logger.debug(f"{name:<30} {num_rows:>15,} rows {rate:>12,.0f} rows/s")
+
+
+def start_persister(ctx, uri: str,
+                    outqueue: mp.Queue) -> tuple[mp.Process, mp.Queue]:
+    inqueue = ctx.Queue()
+    p = ctx.Process(target=persist_worker, args=(uri, inqueue, outqueue))
+    p.start()
+    return p, inqueue
+
+
+def persist_worker(uri: str, inqueue: mp.Queue, outqueue: mp.Queue):
+    con = oracledb.connect(uri)
+    pid = os.getpid()
+
+    while True:
+        item = inqueue.get()
+        if item is None:
+            break
+
+        name = item[0]
+        ts = time.time()
+
+        try:
+            cur = con.cursor()
+            num_rows = analyses.persist_results(cur, *item[1:])
+            cur.close()
+        except Exception as exc:
+            # Unexpected error (e.g. lost connection, missing output)
+            try:
+                con.rollback()
+                con.close()
+            except oracledb.Error:
+                pass
+
+            outqueue.put((pid, name, None, 0, str(exc)))
+            con = oracledb.connect(uri)
+        else:
+            outqueue.put((pid, name, num_rows, time.time() - ts, None))
+
+    con.close()
+
+
+def export_sequences_worker(uri: str, inqueue: Queue, outqueue: Queue,
+                            fasta_cache: FastaCache):
     con = oracledb.connect(uri)
     cur = con.cursor()
+    cur.arraysize = 10000
+    cur.outputtypehandler = clob_as_str
 
     try:
         while True:
@@ -542,31 +1073,34 @@ def export_sequences_worker(uri: str, inqueue: Queue, outqueue: Queue):
                 task, is_new = item
 
                 task.mkdir()
-                num_sequences = export_sequences(
+                num_sequences = fasta_cache.export(
                     cur, task.upi_from, task.upi_to, task.get_fasta_path()
                 )
 
                 if is_new:
                     # Update the number of sequences
-                    if num_sequences > 0:
-                        jobs.update_job(
-                            cur,
-                            task.analysis_id,
-                            task.upi_from,
-                            task.upi_to,
-                            sequences=num_sequences
-                        )
-                    else:
+                    if num_sequences == 0:
                         task.rmdir()
                         task.set_successful()
-                        jobs.update_job(
-                            cur,
-                            task.analysis_id,
-                            task.upi_from,
-                            task.upi_to,
-                            success=True,
-                            sequences=0
-                        )
+
+                    for analysis_id in task.get_analysis_ids():
+                        if num_sequences > 0:
+                            jobs.update_job(
+                                cur,
+                                analysis_id,
+                                task.upi_from,
+                                task.upi_to,
+                                sequences=num_sequences
+                            )
+                        else:
+                            jobs.update_job(
+                                cur,
+                                analysis_id,
+                                task.upi_from,
+                                task.upi_to,
+                                success=True,
+                                sequences=0
+                            )
 
                 outqueue.put((task, num_sequences))
                 inqueue.task_done()
@@ -578,6 +1112,11 @@ def export_sequences_worker(uri: str, inqueue: Queue, outqueue: Queue):
 def export_sequences(
     cur: oracledb.Cursor, upi_from: str, upi_to: str, output: str
 ) -> int:
+    """
+    Export sequences to a FASTA file.
+    For long sequences not to be fetched one LOB at a time,
+    `cur` should fetch CLOBs as strings (see `oracle.clob_as_str`).
+    """
     cur.execute(
         """
         SELECT UPI, SEQ_SHORT, SEQ_LONG
@@ -586,23 +1125,39 @@ def export_sequences(
         """,
         [upi_from, upi_to],
     )
-    rows = cur.fetchall()
-    num_sequences = len(rows)
-    if num_sequences > 0:
-        with open(output, "wt") as fh:
-            for upi, seq_short, seq_long in rows:
-                sequence = seq_short or seq_long.read()
 
-                fh.write(f">{upi}\n")
-                for i in range(0, len(sequence), 60):
-                    fh.write(f"{sequence[i:i + 60]}\n")
+    num_sequences = 0
+    fh = None
+    while rows := cur.fetchmany():
+        if fh is None:
+            fh = open(output, "wt")
+
+        for upi, seq_short, seq_long in rows:
+            sequence = seq_short or seq_long
+            if not isinstance(sequence, str):
+                sequence = sequence.read()
+
+            fh.write(f">{upi}\n")
+            for i in range(0, len(sequence), 60):
+                fh.write(f"{sequence[i:i + 60]}\n")
+
+            num_sequences += 1
+
+    if fh is not None:
+        fh.close()
 
     return num_sequences
 
 
-def task_worker(inqueue: Queue, max_running: int, workdir: str, outqueue: Queue):
+def task_worker(inqueue: Queue, max_running: int, workdir: str,
+                outqueue: Queue, monitor: jobs.JobMonitor,
+                resources: jobs.LocalResources | None = None):
     pending = []
     running = []
+    submitted = {}
+    submitted_resources = {}
+    last_snapshot = 0.0
+    monitor_lost = False
     while True:
         try:
             item = inqueue.get(block=True, timeout=1)
@@ -624,33 +1179,63 @@ def task_worker(inqueue: Queue, max_running: int, workdir: str, outqueue: Queue)
                     pending.append((task, num_sequences))
                 inqueue.task_done()
 
-        # Monitor running tasks
-        tmp_running = []
-        for task, num_sequences in running:
-            task.poll()
+        """
+        Monitor running tasks, only when the scheduler was queried since
+        the last check: jobs that are not unfinished any more are polled
+        to get their status, output, and accounting information
+        """
+        snapshot = monitor.wait(last_snapshot, timeout=0)
+        monitor_alive = monitor.is_alive()
+        if (not monitor_alive and
+                time.time() - last_snapshot >= monitor.interval):
+            # Monitor thread stopped: poll each running task instead
+            if not monitor_lost:
+                logger.error("job monitor stopped: polling tasks directly")
+                monitor_lost = True
+
+            snapshot = time.time()
+
+        if snapshot > last_snapshot:
+            last_snapshot = snapshot
+            tmp_running = []
+            for task, num_sequences in running:
+                if (not monitor_alive or
+                        monitor.is_finished(task.name, submitted[task.name])):
+                    task.poll()
+
+                if task.is_running():
+                    # Still running
+                    tmp_running.append((task, num_sequences))
+                else:
+                    # Done (successfully or not)
+                    del submitted[task.name]
+                    if resources is not None:
+                        resources.release(*submitted_resources.pop(task.name))
 
-            if task.is_running():
-                # Still running
-                tmp_running.append((task, num_sequences))
-            else:
-                # Done (successfully or not)
-                outqueue.put((task, num_sequences))
+                    outqueue.put((task, num_sequences))
 
-                if pending:
-                    # Free slot: replace with pending task
-                    task, num_sequences = pending.pop(0)
-                    if task.start(dir=workdir):
-                        tmp_running.append((task, num_sequences))
-                    else:
-                        pending.append((task, num_sequences))
+            running = tmp_running
 
         # Fill free slots with pending tasks
-        running = tmp_running
         while pending and len(running) < max_running:
-            task, num_sequences = pending.pop(0)
+            task, num_sequences = pending[0]
+            if resources is not None:
+                # Wait for enough CPU/memory on the current machine
+                slots = (task.config["job_cpu"], task.config["job_mem"])
+                if not resources.acquire(*slots):
+                    break
+
+                submitted_resources[task.name] = slots
+
+            pending.pop(0)
+            submitted[task.name] = time.time()
             if task.start(dir=workdir):
-                tmp_running.append((task, num_sequences))
+                running.append((task, num_sequences))
             else:
+                del submitted[task.name]
+                if resources is not None:
+                    resources.release(*submitted_resources.pop(task.name))
+
                 pending.append((task, num_sequences))
                 break
 
@@ -0,0 +1,219 @@
+import math
+from dataclasses import dataclass
+
+import oracledb
+
+from pyinterprod import logger
+from pyinterprod.uniprot.uniparc import int_to_upi, upi_to_int
+
+
+# Number of consecutive UPIs aggregated when computing residue counts
+_BLOCK_SIZE = 1000
+
+
+@dataclass
+class CostModel:
+    cpu_per_residue: float      # CPU seconds per residue
+    cpu_per_sequence: float     # CPU seconds per sequence
+    wall_per_residue: float     # Wall-clock seconds per residue
+    mem_base: float             # MB
+    mem_per_sequence: float     # MB per sequence
+    num_jobs: int
+
+    def predict_runtime(self, residues: int) -> float:
+        # Seconds
+        return self.wall_per_residue * residues
+
+    def predict_memory(self, sequences: int) -> float:
+        # MB
+        return self.mem_base + self.mem_per_sequence * sequences
+
+
+def get_cost_models(cur: oracledb.Cursor, analysis_ids: list[int],
+                    max_jobs: int = 50,
+                    min_jobs: int = 5) -> dict[int, CostModel]:
+    """
+    Fit per-analysis cost models from the most recent successful jobs,
+    ignoring jobs combining several analyses
+
+    :param cur: Oracle cursor
+    :param analysis_ids: IDs of analyses to fit a model for
+    :param max_jobs: number of recent jobs used per analysis
+    :param min_jobs: minimum number of jobs required to fit a model
+    :return: dictionary of analysis ID -> cost model
+    """
+    if not analysis_ids:
+        return {}
+
+    params = {"max_jobs": max_jobs}
+    binds = []
+    for i, analysis_id in enumerate(analysis_ids):
+        params[f"id{i}"] = analysis_id
+        binds.append(f":id{i}")
+
+    cur.execute(
+        f"""
+        SELECT J.ANALYSIS_ID, J.SEQUENCES, J.CPU_TIME, J.MAX_MEMORY,
+               (J.END_TIME - J.START_TIME) * 86400,
+               (
+                 SELECT SUM(P.LEN)
+                 FROM UNIPARC.PROTEIN P
+                 WHERE P.UPI BETWEEN J.UPI_FROM AND J.UPI_TO
+               )
+        FROM (
+            SELECT ANALYSIS_ID, UPI_FROM, UPI_TO, SEQUENCES, CPU_TIME,
+                   MAX_MEMORY, START_TIME, END_TIME,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY ANALYSIS_ID
+                       ORDER BY END_TIME DESC
+                   ) RN
+            FROM IPRSCAN.ANALYSIS_JOBS
+            WHERE ANALYSIS_ID IN ({', '.join(binds)})
+              AND SUCCESS = 'Y'
+              AND SEQUENCES > 0
+              AND NVL(COMBINED, 'N') = 'N'
+              AND CPU_TIME IS NOT NULL
+              AND MAX_MEMORY IS NOT NULL
+              AND START_TIME IS NOT NULL
+              AND END_TIME IS NOT NULL
+        ) J
+        WHERE J.RN <= :max_jobs
+        """,
+        params
+    )
+
+    history = {}
+    for analysis_id, *values in cur:
+        try:
+            history[analysis_id].append(values)
+        except KeyError:
+            history[analysis_id] = [values]
+
+    models = {}
+    for analysis_id, rows in history.items():
+        rows = [r for r in rows if r[4]]  # skip ranges without residues
+        if len(rows) < min_jobs:
+            continue
+
+        sequences = sum(r[0] for r in rows)
+        cpu_time = sum(r[1] for r in rows)
+        runtime = sum(r[3] for r in rows)
+        residues = sum(r[4] for r in rows)
+        if runtime <= 0:
+            continue
+
+        # Least squares: memory = base + slope * sequences
+        n = len(rows)
+        mean_x = sequences / n
+        mean_y = sum(r[2] for r in rows) / n
+        var_x = sum((r[0] - mean_x) ** 2 for r in rows)
+        if var_x > 0:
+            slope = sum((r[0] - mean_x) * (r[2] - mean_y) for r in rows) / var_x
+            slope = max(slope, 0)
+        else:
+            slope = 0
+
+        models[analysis_id] = CostModel(
+            cpu_per_residue=cpu_time / residues,
+            cpu_per_sequence=cpu_time / sequences,
+            wall_per_residue=runtime / residues,
+            mem_base=max(mean_y - slope * mean_x, 0),
+            mem_per_sequence=slope,
+            num_jobs=n
+        )
+
+    return models
+
+
+def get_residue_blocks(cur: oracledb.Cursor, upi_from: str,
+                       upi_to: str) -> list[tuple[int, int, int]]:
+    """
+    Count sequences and residues by blocks of consecutive UPIs
+
+    :return: list of (block index, number of sequences, number of residues),
+             ordered by block index
+    """
+    cur.execute(
+        """
+        SELECT TRUNC(TO_NUMBER(SUBSTR(UPI, 4), 'XXXXXXXXXX') / :block),
+               COUNT(*), SUM(LEN)
+        FROM UNIPARC.PROTEIN
+        WHERE UPI BETWEEN :upi_from AND :upi_to
+        GROUP BY TRUNC(TO_NUMBER(SUBSTR(UPI, 4), 'XXXXXXXXXX') / :block)
+        ORDER BY 1
+        """,
+        block=_BLOCK_SIZE, upi_from=upi_from, upi_to=upi_to
+    )
+    return [(int(b), n, r) for b, n, r in cur]
+
+
+def plan_ranges(blocks: list[tuple[int, int, int]], upi_from: str,
+                upi_to: str, model: CostModel,
+                target_runtime: float) -> list[tuple[str, str, int, int]]:
+    """
+    Split a UPI range in jobs expected to run for `target_runtime` seconds
+
+    :param blocks: residue counts per block of UPIs (see get_residue_blocks)
+    :param upi_from: first UPI to search
+    :param upi_to: last UPI to search
+    :param model: cost model of the analysis
+    :param target_runtime: target runtime per job, in seconds
+    :return: list of (first UPI, last UPI, sequences, residues)
+    """
+    digits = len(upi_from) - 3
+    start = upi_to_int(upi_from)
+    stop = upi_to_int(upi_to)
+    max_residues = max(target_runtime / model.wall_per_residue, 1)
+
+    ranges = []
+    range_start = start
+    sequences = residues = 0
+    for block, num_sequences, num_residues in blocks:
+        block_end = (block + 1) * _BLOCK_SIZE - 1
+        if block_end < start:
+            continue
+
+        """
+        Partial blocks (at the start of the range) are counted as full blocks:
+        the estimate is slightly pessimistic
+        """
+        sequences += num_sequences
+        residues += num_residues
+
+        if residues >= max_residues and block_end < stop:
+            ranges.append((int_to_upi(range_start, digits=digits),
+                           int_to_upi(block_end, digits=digits),
+                           sequences, residues))
+            range_start = block_end + 1
+            sequences = residues = 0
+
+    if range_start <= stop:
+        ranges.append((int_to_upi(range_start, digits=digits), upi_to,
+                       sequences, residues))
+
+    return ranges
+
+
+def predict_resources(model: CostModel, sequences: int, residues: int,
+                      config: dict, max_timeout: int) -> dict:
+    """
+    Predict the memory (MB) and time (hours) limits of a job,
+    with a safety margin.
+    """
+    config = config.copy()
+
+    mem = max(model.predict_memory(sequences) * 1.25, 1024)
+    config["job_mem"] = int(math.ceil(mem / 512) * 512)
+
+    hours = model.predict_runtime(residues) * 2 / 3600
+    config["job_timeout"] = min(max(int(math.ceil(hours)), 1), max_timeout)
+    return config
+
+
+def log_models(models: dict[int, CostModel], names: dict[int, str]):
+    for analysis_id, m in sorted(models.items(), key=lambda x: names[x[0]]):
+        logger.info(f"{names[analysis_id]:<30} "
+                    f"{m.cpu_per_residue * 1e6:>10.1f} CPU s/Mres "
+                    f"{m.cpu_per_sequence:>8.3f} CPU s/seq "
+                    f"{m.mem_base:>8.0f} + {m.mem_per_sequence:.4f} MB/seq "
+                    f"({m.num_jobs} jobs)")
@@ -1,21 +1,48 @@
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import oracledb
 
 from pyinterprod import logger
-from pyinterprod.uniprot.uniparc import iter_proteins
-from pyinterprod.utils import oracle
+from pyinterprod.uniprot.uniparc import (delete_incomplete_slices,
+                                        end_slice, get_pending_slices,
+                                        has_pending_slices, plan_slices,
+                                        start_slice)
+from pyinterprod.utils import Table, oracle
 
 
 def import_sequences(ispro_uri: str, uniparc_uri: str, top_up: bool = False,
-                     max_upi: str | None = None):
+                     max_upi: str | None = None, workers: int = 8):
+    """
+    Import UniParc sequences in ISPRO
+
+    :param ispro_uri: Oracle connection string of ISPRO
+    :param uniparc_uri: Oracle connection string of the UniParc database
+    :param top_up: only import sequences more recent than the latest one
+                   (or the ranges left incomplete by the previous import)
+    :param max_upi: highest UPI to import
+    :param workers: number of UPI ranges imported concurrently
+    """
     logger.info("importing sequences from UniParc")
     con = oracledb.connect(ispro_uri)
     cur = con.cursor()
 
-    if top_up:
+    # Several ranges per worker, to balance the load
+    num_ranges = workers * 4
+
+    if top_up and has_pending_slices(cur, "PROTEIN"):
+        logger.info("\tresuming previous import")
+        delete_incomplete_slices(cur, "PROTEIN")
+    elif top_up:
         cur.execute("SELECT MAX(UPI) FROM UNIPARC.PROTEIN")
         current_max_upi, = cur.fetchone()
+        logger.info(f"\thighest UPI: {current_max_upi or 'N/A'}")
+
+        # Only fetch sequences not already in ISPRO
+        plan_slices(cur, uniparc_uri, "PROTEIN", num_ranges,
+                    gt=current_max_upi, le=max_upi)
     else:
-        current_max_upi = None
         oracle.drop_table(cur, "UNIPARC.PROTEIN", purge=True)
         cur.execute(
             """
@@ -33,30 +60,34 @@ def import_sequences(ispro_uri: str, uniparc_uri: str, top_up: bool = False,
                 ) NOLOGGING
             """
         )
-
-    logger.info(f"\thighest UPI: {current_max_upi or 'N/A'}")
+        plan_slices(cur, uniparc_uri, "PROTEIN", num_ranges, le=max_upi)
 
     cnt = 0
-    records = []
-    req = """
-        INSERT /*+ APPEND */ 
-        INTO UNIPARC.PROTEIN
-        VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9)
-    """
-
-    for rec in iter_proteins(uniparc_uri, gt=current_max_upi, le=max_upi):
-        records.append(rec)
-        cnt += 1
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        fs = {}
+        for start, stop in get_pending_slices(cur, "PROTEIN"):
+            f = executor.submit(_import_range, ispro_uri, uniparc_uri,
+                                start, stop)
+            fs[f] = (start, stop)
 
-        if len(records) == 1000:
-            cur.executemany(req, records)
-            con.commit()
-            records.clear()
+        for f in as_completed(fs):
+            start, stop = fs[f]
+            try:
+                cnt += f.result()
+            except Exception as exc:
+                logger.error(f"{start}-{stop}: {exc}")
+                failed += 1
 
-    if records:
-        cur.executemany(req, records)
-        con.commit()
-        records.clear()
+    if failed:
+        """
+        Completed ranges are checkpointed: the next top-up only imports
+        the failed ranges (and those never started)
+        """
+        cur.close()
+        con.close()
+        raise RuntimeError(f"{failed} error(s): re-run with top-up "
+                           f"to import the remaining ranges")
 
     if not top_up:
         cur.execute("GRANT SELECT ON UNIPARC.PROTEIN TO PUBLIC")
@@ -70,3 +101,68 @@ def import_sequences(ispro_uri: str, uniparc_uri: str, top_up: bool = False,
     con.close()
 
     logger.info(f"\t{cnt:,} sequences imported")
+
+
+def _import_range(ispro_uri: str, uniparc_uri: str, upi_from: str,
+                  upi_to: str) -> int:
+    ts = time.time()
+    con = oracledb.connect(ispro_uri)
+    cur = con.cursor()
+    start_slice(cur, "PROTEIN", upi_from)
+
+    src_con = oracledb.connect(uniparc_uri)
+    src_cur = src_con.cursor()
+    src_cur.arraysize = 10000
+    src_cur.outputtypehandler = oracle.clob_as_str
+    src_cur.execute(
+        """
+        SELECT ID, UPI, TIMESTAMP, USERSTAMP, CRC64, LEN, SEQ_SHORT,
+               SEQ_LONG, MD5
+        FROM UNIPARC.PROTEIN
+        WHERE UPI BETWEEN :1 AND :2
+        """,
+        [upi_from, upi_to]
+    )
+
+    req = """
+        INSERT INTO UNIPARC.PROTEIN
+        VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9)
+    """
+    # Short sequences never pay for a LOB bind
+    short_seqs = Table(con, req, autocommit=True, buffer_size=10000,
+                       input_sizes=[None] * 6 + [4000, None, None])
+    long_seqs = Table(con, req, autocommit=True, buffer_size=1000,
+                      input_sizes=[None] * 7 + [oracledb.DB_TYPE_CLOB, None])
+
+    cnt = 0
+    try:
+        for rec in src_cur:
+            upi = rec[1]
+            seq_short = rec[6]
+            seq_long = rec[7]
+            sequence = seq_short or seq_long or ""
+            md5 = hashlib.md5(sequence.encode("utf-8")).hexdigest()
+            if md5.upper() != rec[8].upper():
+                raise ValueError(f"{upi}: MD5 mismatch")
+
+            if seq_short is not None:
+                short_seqs.insert(rec)
+            else:
+                long_seqs.insert(rec)
+
+            cnt += 1
+    except Exception:
+        # Do not let close() (or the GC) insert the buffered rows
+        short_seqs.rows = []
+        long_seqs.rows = []
+        raise
+    finally:
+        short_seqs.close()
+        long_seqs.close()
+
+    end_slice(cur, "PROTEIN", upi_from, cnt, time.time() - ts)
+    cur.close()
+    con.close()
+    src_cur.close()
+    src_con.close()
+    return cnt
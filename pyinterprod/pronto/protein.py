@@ -11,6 +11,10 @@ from pyinterprod.utils.io import KVdb
 from pyinterprod.utils.pg import url2dict
 
 
+_ARRAYSIZE = 10000
+_PUBMED_REGEX = re.compile(r"PubMed:(\d+)")
+
+
 def import_similarity_comments(swp_url: str, ipr_url: str):
     logger.info("populating")
     pg_con = psycopg.connect(**url2dict(ipr_url))
@@ -28,6 +32,8 @@ def import_similarity_comments(swp_url: str, ipr_url: str):
 
         ora_con = oracledb.connect(swp_url)
         ora_cur = ora_con.cursor()
+        ora_cur.arraysize = _ARRAYSIZE
+        ora_cur.prefetchrows = _ARRAYSIZE + 1
         ora_cur.execute(
             """
             SELECT 
@@ -53,25 +59,17 @@ def import_similarity_comments(swp_url: str, ipr_url: str):
             """
         )
 
-        records = []
         sql = """
-            INSERT INTO protein_similarity 
-                (comment_id, comment_text, protein_acc) 
-            VALUES (%s, %s, %s)
+            COPY protein_similarity (comment_id, comment_text, protein_acc)
+            FROM STDIN
         """
 
-        for rec in ora_cur:
-            records.append(rec)
-            if len(records) == 1000:
-                pg_cur.executemany(sql, records)
-                pg_con.commit()
-                records.clear()
-
-        if records:
-            pg_cur.executemany(sql, records)
-            pg_con.commit()
-            records.clear()
+        with pg_cur.copy(sql) as copy:
+            for rows in _iter_batches(ora_cur):
+                for rec in rows:
+                    copy.write_row(rec)
 
+        pg_con.commit()
         ora_cur.close()
         ora_con.close()
 
@@ -309,7 +307,10 @@ def import_protein_pubmed(swp_url: str, pg_url: str):
 
         ora_con = oracledb.connect(swp_url)
         ora_cur = ora_con.cursor()
+        ora_cur.arraysize = _ARRAYSIZE
+        ora_cur.prefetchrows = _ARRAYSIZE + 1
 
+        # Rows are ordered by accession so PMIDs can be deduplicated per protein
         ora_cur.execute(
             """
                 SELECT E.ACCESSION, NVL(B.TEXT, SS.TEXT) AS TEXT
@@ -326,21 +327,25 @@ def import_protein_pubmed(swp_url: str, pg_url: str):
                 WHERE E.ENTRY_TYPE = 0
                   AND E.MERGE_STATUS != 'R'           
                   AND E.DELETED = 'N'
+                ORDER BY E.ACCESSION
             """
         )
 
-        swp2pmid = set()
-        for protein_acc, text in ora_cur.fetchall():
-            for pmid in re.findall(r"PubMed:(\d+)", text):
-                swp2pmid.add((protein_acc, int(pmid)))
+        sql = """
+            COPY protein2publication (protein_acc, pubmed_id) 
+            FROM STDIN
+        """
 
-        pg_cur.executemany(
-            """
-            INSERT INTO protein2publication
-                (protein_acc, pubmed_id)
-            VALUES (%s, %s)
-            """, swp2pmid
-        )
+        i = 0
+        with pg_cur.copy(sql) as copy:
+            for protein_acc, pmids in _iter_protein_pmids(ora_cur):
+                for pmid in pmids:
+                    copy.write_row((protein_acc, pmid))
+                    i += 1
+
+        ora_cur.close()
+        ora_con.close()
+        logger.info(f"{i:>12,}")
 
         pg_cur.execute(
             """
@@ -352,3 +357,27 @@ def import_protein_pubmed(swp_url: str, pg_url: str):
     pg_con.commit()
     pg_con.close()
     logger.info("done")
+
+
+def _iter_batches(cur: oracledb.Cursor):
+    while rows := cur.fetchmany():
+        yield rows
+
+
+def _iter_protein_pmids(cur: oracledb.Cursor):
+    protein_acc = None
+    pmids = set()
+    for rows in _iter_batches(cur):
+        for acc, text in rows:
+            if acc != protein_acc:
+                if pmids:
+                    yield protein_acc, sorted(pmids)
+
+                protein_acc = acc
+                pmids = set()
+
+            if text:
+                pmids.update(map(int, _PUBMED_REGEX.findall(text)))
+
+    if pmids:
+        yield protein_acc, sorted(pmids)
@@ -1,5 +1,7 @@
 import math
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from multiprocessing import Process, Queue
 from tempfile import mkstemp
 
@@ -345,7 +347,13 @@ def _condense(matches: dict[str, list[tuple[int, int]]]):
         matches[entry_acc] = condensed_matches
 
 
-def create_xref_summary(uri: str):
+def create_xref_summary(uri: str, workers: int = 8):
+    """
+    Create the XREF_SUMMARY table, partitioned by member database
+
+    :param uri: Oracle connection string
+    :param workers: number of partitions populated (and indexed) concurrently
+    """
     logger.info("creating XREF_SUMMARY")
     con = oracledb.connect(uri)
     cur = con.cursor()
@@ -386,104 +394,77 @@ def create_xref_summary(uri: str):
         """
     )
 
-    logger.info("inserting signature matches")
-    cur.execute(
-        """
-        INSERT /*+ APPEND */ INTO INTERPRO.XREF_SUMMARY
-        SELECT
-            MA.DBCODE,
-            MA.PROTEIN_AC,
-            E.ENTRY_AC,
-            E.SHORT_NAME,
-            MA.METHOD_AC,
-            CASE 
-                WHEN ME.NAME IS NOT NULL AND MA.METHOD_AC != ME.NAME 
-                    THEN ME.NAME
-                WHEN ME.DESCRIPTION IS NOT NULL
-                    THEN REGEXP_REPLACE(DESCRIPTION, '"', '''')
-                ELSE NULL 
-            END,
-            MA.POS_FROM,
-            MA.POS_TO,
-            MA.STATUS,
-            MA.SCORE,
-            MA.FRAGMENTS
-        FROM INTERPRO.MATCH MA
-        INNER JOIN INTERPRO.METHOD ME 
-            ON MA.METHOD_AC = ME.METHOD_AC
-        LEFT OUTER JOIN INTERPRO.ENTRY2METHOD EM 
-            ON ME.METHOD_AC = EM.METHOD_AC
-        LEFT OUTER JOIN INTERPRO.ENTRY E 
-            ON EM.ENTRY_AC = E.ENTRY_AC AND E.CHECKED = 'Y'
-        """
-    )
-    con.commit()
-
-    logger.info("inserting PANTHER subfamily matches")
-    cur.execute(
-        r"""
-        INSERT /*+ APPEND */ INTO INTERPRO.XREF_SUMMARY
-        SELECT
-            MA.DBCODE,
-            MA.PROTEIN_AC,
-            NULL,
-            NULL,
-            MA.MODEL_AC,
-            CASE 
-                WHEN ME.NAME IS NOT NULL AND MA.MODEL_AC != ME.NAME 
-                    THEN ME.NAME
-                WHEN ME.DESCRIPTION IS NOT NULL
-                    THEN REGEXP_REPLACE(DESCRIPTION, '"', '''')
-                ELSE NULL 
-            END,
-            MA.POS_FROM,
-            MA.POS_TO,
-            MA.STATUS,
-            MA.SCORE,
-            MA.FRAGMENTS
-        FROM INTERPRO.MATCH PARTITION (MATCH_DBCODE_V) MA
-        INNER JOIN INTERPRO.METHOD ME 
-            ON MA.MODEL_AC = ME.METHOD_AC
-        WHERE MA.MODEL_AC IS NOT NULL 
-          AND REGEXP_LIKE(MA.MODEL_AC, '^PTHR\d+:SF\d+$')
-        """
-    )
-    con.commit()
+    partitions = []
+    for p in oracle.get_partitions(cur, "INTERPRO", "XREF_SUMMARY"):
+        dbcode = p["value"][1:-1]  # 'X' -> X
+        partitions.append((p["name"], dbcode))
 
-    logger.info("inserting AntiFam and CATH-FunFam matches")
-    cur.execute(
-        """
-        INSERT /*+ APPEND */ INTO INTERPRO.XREF_SUMMARY
-        SELECT
-            FM.DBCODE,
-            FM.PROTEIN_AC,
-            NULL,
-            NULL,
-            FM.METHOD_AC,
-            ME.DESCRIPTION,
-            FM.POS_FROM,
-            FM.POS_TO,
-            'T',
-            NULL,
-            NULL
-        FROM INTERPRO.FEATURE_MATCH FM
-        INNER JOIN INTERPRO.FEATURE_METHOD ME
-            ON FM.METHOD_AC = ME.METHOD_AC
-        WHERE FM.DBCODE IN ('a', 'f')           
-        """
-    )
-    con.commit()
+    """
+    Partitions are populated concurrently: direct-path inserts
+    into distinct partitions do not block each other
+    """
+    logger.info("inserting matches")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        fs = {}
+        for partition, dbcode in partitions:
+            f = executor.submit(_insert_xref_summary, uri, partition, dbcode)
+            fs[f] = partition
+
+        errors = 0
+        for f in as_completed(fs):
+            partition = fs[f]
+            try:
+                rows, seconds = f.result()
+            except Exception as exc:
+                logger.error(f"{partition}: {exc}")
+                errors += 1
+            else:
+                logger.info(f"{partition:<15}{rows:>15,} rows "
+                            f"in {seconds:.0f}s")
+
+    if errors:
+        cur.close()
+        con.close()
+        raise RuntimeError(f"{errors} error(s)")
 
     logger.info("indexing")
+    indexes = []
     for col in ("PROTEIN_AC", "ENTRY_AC", "METHOD_AC"):
+        # Index partitions are built afterwards, in parallel
         cur.execute(
             f"""
             CREATE INDEX I_XREF_SUMMARY${col}
             ON INTERPRO.XREF_SUMMARY ({col}) 
             TABLESPACE INTERPRO_IND
             NOLOGGING
+            LOCAL
+            UNUSABLE
             """
         )
+        indexes.append(f"INTERPRO.I_XREF_SUMMARY${col}")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        fs = {}
+        for index in indexes:
+            for partition, _ in partitions:
+                f = executor.submit(_rebuild_index_partition, uri, index,
+                                    partition)
+                fs[f] = (index, partition)
+
+        for f in as_completed(fs):
+            index, partition = fs[f]
+            try:
+                seconds = f.result()
+            except Exception as exc:
+                logger.error(f"{index} ({partition}): {exc}")
+                errors += 1
+            else:
+                logger.debug(f"{index} ({partition}) built in {seconds:.0f}s")
+
+    if errors:
+        cur.close()
+        con.close()
+        raise RuntimeError(f"{errors} error(s)")
 
     cur.execute("GRANT SELECT ON INTERPRO.XREF_SUMMARY TO KRAKEN")
     cur.close()
@@ -492,6 +473,125 @@ def create_xref_summary(uri: str):
     logger.info("XREF_SUMMARY ready")
 
 
+def _insert_xref_summary(uri: str, partition: str,
+                         dbcode: str) -> tuple[int, float]:
+    ts = time.time()
+    con = oracledb.connect(uri)
+    cur = con.cursor()
+
+    if dbcode in ("a", "f"):
+        # AntiFam and CATH-FunFam
+        cur.execute(
+            f"""
+            INSERT /*+ APPEND */ INTO INTERPRO.XREF_SUMMARY
+            PARTITION ({partition})
+            SELECT
+                FM.DBCODE,
+                FM.PROTEIN_AC,
+                NULL,
+                NULL,
+                FM.METHOD_AC,
+                ME.DESCRIPTION,
+                FM.POS_FROM,
+                FM.POS_TO,
+                'T',
+                NULL,
+                NULL
+            FROM INTERPRO.FEATURE_MATCH FM
+            INNER JOIN INTERPRO.FEATURE_METHOD ME
+                ON FM.METHOD_AC = ME.METHOD_AC
+            WHERE FM.DBCODE = :1
+            """,
+            [dbcode]
+        )
+    else:
+        cur.execute(
+            f"""
+            INSERT /*+ APPEND */ INTO INTERPRO.XREF_SUMMARY
+            PARTITION ({partition})
+            SELECT
+                MA.DBCODE,
+                MA.PROTEIN_AC,
+                E.ENTRY_AC,
+                E.SHORT_NAME,
+                MA.METHOD_AC,
+                CASE 
+                    WHEN ME.NAME IS NOT NULL AND MA.METHOD_AC != ME.NAME 
+                        THEN ME.NAME
+                    WHEN ME.DESCRIPTION IS NOT NULL
+                        THEN REGEXP_REPLACE(DESCRIPTION, '"', '''')
+                    ELSE NULL 
+                END,
+                MA.POS_FROM,
+                MA.POS_TO,
+                MA.STATUS,
+                MA.SCORE,
+                MA.FRAGMENTS
+            FROM INTERPRO.MATCH MA
+            INNER JOIN INTERPRO.METHOD ME 
+                ON MA.METHOD_AC = ME.METHOD_AC
+            LEFT OUTER JOIN INTERPRO.ENTRY2METHOD EM 
+                ON ME.METHOD_AC = EM.METHOD_AC
+            LEFT OUTER JOIN INTERPRO.ENTRY E 
+                ON EM.ENTRY_AC = E.ENTRY_AC AND E.CHECKED = 'Y'
+            WHERE MA.DBCODE = :1
+            """,
+            [dbcode]
+        )
+
+    rows = cur.rowcount
+    # Direct-path inserts must be committed before the next one
+    con.commit()
+
+    if dbcode == "V":
+        # PANTHER subfamilies
+        cur.execute(
+            rf"""
+            INSERT /*+ APPEND */ INTO INTERPRO.XREF_SUMMARY
+            PARTITION ({partition})
+            SELECT
+                MA.DBCODE,
+                MA.PROTEIN_AC,
+                NULL,
+                NULL,
+                MA.MODEL_AC,
+                CASE 
+                    WHEN ME.NAME IS NOT NULL AND MA.MODEL_AC != ME.NAME 
+                        THEN ME.NAME
+                    WHEN ME.DESCRIPTION IS NOT NULL
+                        THEN REGEXP_REPLACE(DESCRIPTION, '"', '''')
+                    ELSE NULL 
+                END,
+                MA.POS_FROM,
+                MA.POS_TO,
+                MA.STATUS,
+                MA.SCORE,
+                MA.FRAGMENTS
+            FROM INTERPRO.MATCH PARTITION (MATCH_DBCODE_V) MA
+            INNER JOIN INTERPRO.METHOD ME 
+                ON MA.MODEL_AC = ME.METHOD_AC
+            WHERE MA.MODEL_AC IS NOT NULL 
+              AND REGEXP_LIKE(MA.MODEL_AC, '^PTHR\d+:SF\d+$')
+            """
+        )
+        rows += cur.rowcount
+        con.commit()
+
+    cur.close()
+    con.close()
+    return rows, time.time() - ts
+
+
+def _rebuild_index_partition(uri: str, index: str, partition: str) -> float:
+    ts = time.time()
+    con = oracledb.connect(uri)
+    cur = con.cursor()
+    oracle.rebuild_index(cur, index, partition=partition)
+    cur.close()
+    con.close()
+    return time.time() - ts
+
+
 def _repr_domains_worker(
     matches_file: str,
     inqueue: Queue,
@@ -1,19 +1,44 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import oracledb
 
 from pyinterprod import logger
 from pyinterprod.utils import oracle
 
+# Rows fetched and inserted per round-trip when copying slices
+_COPY_BATCH_SIZE = 50000
+
 
-def update_proteins(ipr_uri: str, unp_uri: str, top_up: bool = False):
+def update_proteins(ipr_uri: str, unp_uri: str, top_up: bool = False,
+                    slices: int = 32, threads: int = 8,
+                    resume: bool | None = None):
+    """
+    Copy UniParc proteins
+
+    :param ipr_uri: Oracle connection string of the target database
+    :param unp_uri: Oracle connection string of the source database
+    :param top_up: only copy proteins more recent than the latest one
+    :param slices: number of UPI slices
+    :param threads: number of slices copied concurrently
+    :param resume: resume an interrupted copy, skipping completed slices
+                   (default: resume if some slices are not completed)
+    """
     logger.info("creating table PROTEIN")
     con = oracledb.connect(ipr_uri)
     cur = con.cursor()
 
-    if top_up:
+    if resume is None:
+        resume = has_pending_slices(cur, "PROTEIN")
+
+    if resume:
+        logger.info("resuming previous copy")
+    elif top_up:
         cur.execute("SELECT MAX(UPI) FROM UNIPARC.PROTEIN")
         max_upi, = cur.fetchone()
+        plan_slices(cur, unp_uri, "PROTEIN", slices, gt=max_upi)
     else:
-        max_upi = None
         oracle.drop_table(cur, "UNIPARC.PROTEIN", purge=True)
         cur.execute(
             """
@@ -30,29 +55,25 @@ def update_proteins(ipr_uri: str, unp_uri: str, top_up: bool = False):
             ) NOLOGGING
             """
         )
+        plan_slices(cur, unp_uri, "PROTEIN", slices)
 
-    cnt = 0
-    records = []
-    req = """
-        INSERT /*+ APPEND */ 
-        INTO UNIPARC.PROTEIN
+    copy_slices(
+        ipr_uri,
+        unp_uri,
+        "PROTEIN",
+        """
+        SELECT UPI, TIMESTAMP, USERSTAMP, CRC64, LEN, SEQ_SHORT, SEQ_LONG, MD5
+        FROM UNIPARC.PROTEIN
+        WHERE UPI BETWEEN :1 AND :2
+        """,
+        """
+        INSERT INTO UNIPARC.PROTEIN
         VALUES (:1, :2, :3, :4, :5, :6, :7, :8)
-    """
-
-    for rec in iter_proteins(unp_uri, gt=max_upi):
-        # First element of record is ID, which we do not need
-        records.append(rec[1:])
-        cnt += 1
-
-        if len(records) == 1000:
-            cur.executemany(req, records)
-            con.commit()
-            records.clear()
-
-    if records:
-        cur.executemany(req, records)
-        con.commit()
-        records.clear()
+        """,
+        threads=threads,
+        resume=resume,
+        clob_as_str=True
+    )
 
     if not top_up:
         cur.execute("GRANT SELECT ON UNIPARC.PROTEIN TO PUBLIC")
@@ -71,7 +92,19 @@ def update_proteins(ipr_uri: str, unp_uri: str, top_up: bool = False):
     logger.info("complete")
 
 
-def update_xrefs(ipr_uri: str, unp_uri: str):
+def update_xrefs(ipr_uri: str, unp_uri: str, slices: int = 64,
+                 threads: int = 8, resume: bool | None = None):
+    """
+    Copy UniParc databases and cross-references
+
+    :param ipr_uri: Oracle connection string of the target database
+    :param unp_uri: Oracle connection string of the source database
+    :param slices: number of UPI slices
+    :param threads: number of slices copied concurrently
+    :param resume: resume an interrupted copy of cross-references,
+                   skipping completed slices
+                   (default: resume if some slices are not completed)
+    """
     ipr_con = oracledb.connect(ipr_uri)
     ipr_cur = ipr_con.cursor()
     unp_con = oracledb.connect(unp_uri)
@@ -151,45 +184,48 @@ def update_xrefs(ipr_uri: str, unp_uri: str):
     )
     oracle.gather_stats(ipr_cur, "UNIPARC", "CV_DATABASE")
 
+    unp_cur.close()
+    unp_con.close()
+
     logger.info("creating table XREF")
-    oracle.drop_table(ipr_cur, "UNIPARC.XREF", purge=True)
-    ipr_cur.execute(
-        """
-        CREATE TABLE UNIPARC.XREF
-        (
-            UPI CHAR(13) NOT NULL,
-            AC VARCHAR2(70) NOT NULL,
-            DBID NUMBER(3) NOT NULL,
-            DELETED CHAR NOT NULL,
-            VERSION NUMBER(6)
-        ) NOLOGGING
-        """
-    )
+    if resume is None:
+        resume = has_pending_slices(ipr_cur, "XREF")
 
-    unp_cur.execute(
+    if resume:
+        logger.info("resuming previous copy")
+    else:
+        oracle.drop_table(ipr_cur, "UNIPARC.XREF", purge=True)
+        ipr_cur.execute(
+            """
+            CREATE TABLE UNIPARC.XREF
+            (
+                UPI CHAR(13) NOT NULL,
+                AC VARCHAR2(70) NOT NULL,
+                DBID NUMBER(3) NOT NULL,
+                DELETED CHAR NOT NULL,
+                VERSION NUMBER(6)
+            ) NOLOGGING
+            """
+        )
+        plan_slices(ipr_cur, unp_uri, "XREF", slices)
+
+    total = copy_slices(
+        ipr_uri,
+        unp_uri,
+        "XREF",
         """
         SELECT UPI, AC, DBID, DELETED, VERSION
-        FROM UNIPARC.XREF          
+        FROM UNIPARC.XREF
+        WHERE UPI BETWEEN :1 AND :2
+        """,
         """
+        INSERT INTO UNIPARC.XREF
+        VALUES (:1, :2, :3, :4, :5)
+        """,
+        threads=threads,
+        resume=resume
     )
-    total = 0
-    while rows := unp_cur.fetchmany(size=10000):
-        ipr_cur.executemany(
-            """
-                INSERT /*+ APPEND */ 
-                INTO UNIPARC.XREF
-                VALUES (:1, :2, :3, :4, :5)
-            """,
-            rows
-        )
-        total += len(rows)
-        if total % 1e8 == 0:
-            logger.info(f"{total:>20,}")
-
     logger.info(f"{total:>20,}")
-    unp_cur.close()
-    unp_con.close()
-    ipr_con.commit()
 
     ipr_cur.execute("GRANT SELECT ON UNIPARC.XREF TO PUBLIC")
 
@@ -211,6 +247,252 @@ def update_xrefs(ipr_uri: str, unp_uri: str):
     logger.info("complete")
 
 
+def has_pending_slices(cur: oracledb.Cursor, table: str) -> bool:
+    """
+    Return True if some slices of a table were planned but not copied
+    """
+    _create_checkpoint_table(cur)
+    cur.execute(
+        """
+        SELECT COUNT(*)
+        FROM UNIPARC.COPY_CHECKPOINT
+        WHERE TABLE_NAME = :1 AND END_TIME IS NULL
+        """,
+        [table]
+    )
+    cnt, = cur.fetchone()
+    return cnt > 0
+
+
+def _create_checkpoint_table(cur: oracledb.Cursor):
+    try:
+        cur.execute(
+            """
+            CREATE TABLE UNIPARC.COPY_CHECKPOINT
+            (
+                TABLE_NAME VARCHAR2(30) NOT NULL,
+                UPI_FROM CHAR(13) NOT NULL,
+                UPI_TO CHAR(13) NOT NULL,
+                ROW_COUNT NUMBER,
+                SECONDS NUMBER,
+                START_TIME DATE,
+                END_TIME DATE
+            )
+            """
+        )
+    except oracledb.DatabaseError as exc:
+        error, = exc.args
+
+        # ORA-00955: name is already used by an existing object
+        if error.code != 955:
+            raise exc
+
+
+def plan_slices(cur: oracledb.Cursor, src_uri: str, table: str,
+                num_slices: int, gt: str | None = None,
+                le: str | None = None):
+    """
+    Split the UPIs of a source table in slices of equal width,
+    and record them in the checkpoint table
+
+    :param cur: Oracle cursor (target database)
+    :param src_uri: Oracle connection string of the source database
+    :param table: name of the table to copy (in the UNIPARC schema)
+    :param num_slices: number of slices
+    :param gt: only copy UPIs greater than this one
+    :param le: only copy UPIs lower than or equal to this one
+    """
+    con = oracledb.connect(src_uri)
+    src_cur = con.cursor()
+    src_cur.execute(
+        f"""
+        SELECT MIN(UPI), MAX(UPI)
+        FROM UNIPARC.{table}
+        WHERE (:gt IS NULL OR UPI > :gt)
+          AND (:le IS NULL OR UPI <= :le)
+        """,
+        gt=gt, le=le
+    )
+
+    min_upi, max_upi = src_cur.fetchone()
+    src_cur.close()
+    con.close()
+
+    _create_checkpoint_table(cur)
+    cur.execute(
+        "DELETE FROM UNIPARC.COPY_CHECKPOINT WHERE TABLE_NAME = :1",
+        [table]
+    )
+
+    if min_upi is not None:
+        width = upi_to_int(max_upi) - upi_to_int(min_upi) + 1
+        step = math.ceil(width / num_slices)
+        cur.executemany(
+            """
+            INSERT INTO UNIPARC.COPY_CHECKPOINT (TABLE_NAME, UPI_FROM, UPI_TO)
+            VALUES (:1, :2, :3)
+            """,
+            [(table, upi_from, upi_to)
+             for upi_from, upi_to in range_upi(min_upi, max_upi, step)]
+        )
+
+    cur.connection.commit()
+
+
+def copy_slices(dst_uri: str, src_uri: str, table: str, select: str,
+                insert: str, threads: int = 8, resume: bool = False,
+                clob_as_str: bool = False) -> int:
+    """
+    Copy the pending slices of a table (see `plan_slices()`),
+    each slice in its own pair of sessions
+
+    :param dst_uri: Oracle connection string of the target database
+    :param src_uri: Oracle connection string of the source database
+    :param table: name of the table to copy
+    :param select: source query, with the slice bounds as :1 and :2
+    :param insert: target statement
+    :param threads: number of slices copied concurrently
+    :param resume: remove rows of slices partially copied in a previous run
+    :param clob_as_str: fetch CLOB columns as strings
+    :return: number of rows copied
+    """
+    con = oracledb.connect(dst_uri)
+    cur = con.cursor()
+
+    if resume:
+        delete_incomplete_slices(cur, table)
+
+    slices = get_pending_slices(cur, table)
+    cur.close()
+    con.close()
+
+    logger.info(f"copying {table}: {len(slices)} slices")
+    total = completed = 0
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        fs = {}
+        for upi_from, upi_to in slices:
+            f = executor.submit(_copy_slice, dst_uri, src_uri, table,
+                                select, insert, upi_from, upi_to,
+                                clob_as_str)
+            fs[f] = (upi_from, upi_to)
+
+        errors = 0
+        for f in as_completed(fs):
+            upi_from, upi_to = fs[f]
+            try:
+                rows, seconds = f.result()
+            except Exception as exc:
+                logger.error(f"{upi_from}-{upi_to}: {exc}")
+                errors += 1
+                continue
+
+            total += rows
+            completed += 1
+            logger.info(f"{upi_from}-{upi_to}: {rows:>15,} rows "
+                        f"({rows / max(seconds, 1):>10,.0f} rows/s) "
+                        f"[{completed}/{len(fs)}]")
+
+    if errors:
+        raise RuntimeError(f"{errors} slices failed: "
+                           f"re-run to retry them")
+
+    return total
+
+
+def delete_incomplete_slices(cur: oracledb.Cursor, table: str):
+    """
+    Delete rows committed by slices started, but not completed,
+    in a previous run
+    """
+    cur.execute(
+        f"""
+        DELETE FROM UNIPARC.{table} T
+        WHERE EXISTS (
+          SELECT 1
+          FROM UNIPARC.COPY_CHECKPOINT C
+          WHERE C.TABLE_NAME = :1
+            AND C.START_TIME IS NOT NULL
+            AND C.END_TIME IS NULL
+            AND T.UPI BETWEEN C.UPI_FROM AND C.UPI_TO
+        )
+        """,
+        [table]
+    )
+    logger.info(f"{cur.rowcount:,} rows of incomplete slices deleted")
+    cur.connection.commit()
+
+
+def get_pending_slices(cur: oracledb.Cursor,
+                       table: str) -> list[tuple[str, str]]:
+    cur.execute(
+        """
+        SELECT UPI_FROM, UPI_TO
+        FROM UNIPARC.COPY_CHECKPOINT
+        WHERE TABLE_NAME = :1 AND END_TIME IS NULL
+        ORDER BY UPI_FROM
+        """,
+        [table]
+    )
+    return cur.fetchall()
+
+
+def start_slice(cur: oracledb.Cursor, table: str, upi_from: str):
+    # From now on, rows of this slice must be deleted before resuming
+    cur.execute(
+        """
+        UPDATE UNIPARC.COPY_CHECKPOINT
+        SET START_TIME = SYSDATE
+        WHERE TABLE_NAME = :1 AND UPI_FROM = :2
+        """,
+        [table, upi_from]
+    )
+    cur.connection.commit()
+
+
+def end_slice(cur: oracledb.Cursor, table: str, upi_from: str, rows: int,
+              seconds: float):
+    cur.execute(
+        """
+        UPDATE UNIPARC.COPY_CHECKPOINT
+        SET ROW_COUNT = :1, SECONDS = :2, END_TIME = SYSDATE
+        WHERE TABLE_NAME = :3 AND UPI_FROM = :4
+        """,
+        [rows, seconds, table, upi_from]
+    )
+    cur.connection.commit()
+
+
+def _copy_slice(dst_uri: str, src_uri: str, table: str, select: str,
+                insert: str, upi_from: str, upi_to: str,
+                clob_as_str: bool) -> tuple[int, float]:
+    ts = time.time()
+    dst_con = oracledb.connect(dst_uri)
+    dst_cur = dst_con.cursor()
+    start_slice(dst_cur, table, upi_from)
+
+    src_con = oracledb.connect(src_uri)
+    src_cur = src_con.cursor()
+    src_cur.arraysize = _COPY_BATCH_SIZE
+    if clob_as_str:
+        src_cur.outputtypehandler = oracle.clob_as_str
+
+    src_cur.execute(select, [upi_from, upi_to])
+    rows = 0
+    while records := src_cur.fetchmany():
+        dst_cur.executemany(insert, records)
+        dst_con.commit()
+        rows += len(records)
+
+    src_cur.close()
+    src_con.close()
+
+    seconds = time.time() - ts
+    end_slice(dst_cur, table, upi_from, rows, seconds)
+    dst_cur.close()
+    dst_con.close()
+    return rows, seconds
+
+
 def iter_proteins(uri: str, gt: str | None = None, le: str | None = None):
     con = oracledb.connect(uri)
     cur = con.cursor()
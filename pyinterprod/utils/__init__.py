@@ -1,12 +1,26 @@
+import bz2
+import functools
+import gzip
+import lzma
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import oracledb
+
+
 class Table:
     def __init__(self, con, query: str, autocommit: bool = False,
-                 buffer_size: int = 100000, depends_on=None):
+                 buffer_size: int = 100000, depends_on=None,
+                 input_sizes: list | None = None):
         self.con = con
         self.cur = con.cursor()
         self.query = query
         self.autocommit = autocommit
         self.buffer_size = buffer_size
         self.depends_on = depends_on
+        self.input_sizes = input_sizes
         self.rows = []
         self.count = 0
 
@@ -41,6 +55,9 @@ class Table:
         elif self.depends_on:
             self.depends_on.flush()
 
+        if self.input_sizes:
+            self.cur.setinputsizes(*self.input_sizes)
+
         self.cur.executemany(self.query, self.rows)
         self.rows = []
 
@@ -52,3 +69,61 @@ class Table:
             self.flush()
             self.cur.close()
             self.con = None
+
+
+class CompressedTable(Table):
+    """
+    Table where some columns are compressed in a pool of threads
+    (compression libraries release the GIL) before being inserted as BLOBs.
+    At most `max_pending` rows are waiting to be compressed at any time.
+    """
+
+    def __init__(self, con, query: str, blob_columns: list[int],
+                 codec: str = "gzip", level: int = 6, threads: int = 4,
+                 max_pending: int | None = None, **kwargs):
+        kwargs.setdefault("buffer_size", 100)
+        super().__init__(con, query, **kwargs)
+        self.blob_columns = blob_columns
+        self.compress = get_compressor(codec, level)
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.max_pending = max_pending or threads * 2
+        self.pending = deque()
+
+    def insert(self, record: list | tuple):
+        if self.input_sizes is None:
+            self.input_sizes = [None] * len(record)
+            for i in self.blob_columns:
+                self.input_sizes[i] = oracledb.DB_TYPE_BLOB
+
+        self.pending.append(self.executor.submit(self._compress, record))
+        while len(self.pending) > self.max_pending:
+            self._execute(self.pending.popleft().result())
+
+    def _compress(self, record: list | tuple) -> tuple:
+        record = list(record)
+        for i in self.blob_columns:
+            record[i] = self.compress(record[i])
+
+        return tuple(record)
+
+    def close(self):
+        if self.con is not None:
+            # Rows still being compressed
+            while self.pending:
+                self._execute(self.pending.popleft().result())
+
+            super().close()
+            self.executor.shutdown()
+
+
+def get_compressor(codec: str, level: int) -> Callable[[bytes], bytes]:
+    if codec == "gzip":
+        return functools.partial(gzip.compress, compresslevel=level)
+    elif codec == "zlib":
+        return functools.partial(zlib.compress, level=level)
+    elif codec == "bz2":
+        return functools.partial(bz2.compress, compresslevel=level)
+    elif codec == "lzma":
+        return functools.partial(lzma.compress, preset=level)
+    else:
+        raise ValueError(f"unsupported codec '{codec}'")
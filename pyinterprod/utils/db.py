@@ -0,0 +1,74 @@
+import threading
+from contextlib import contextmanager
+
+import oracledb
+
+
+ARRAYSIZE = 10000
+PREFETCHROWS = ARRAYSIZE + 1
+
+_lock = threading.Lock()
+_oracle_pools = {}
+
+
+class OracleConnection(oracledb.Connection):
+    def cursor(self, scrollable: bool = False) -> oracledb.Cursor:
+        cur = super().cursor(scrollable)
+        cur.arraysize = ARRAYSIZE
+        cur.prefetchrows = PREFETCHROWS
+        return cur
+
+
+@contextmanager
+def oracle_pool(uri: str, max_size: int = 8):
+    """
+    Open a pool of connections for the connection string: inside the block,
+    connect_oracle() (including from worker threads) acquires connections
+    from this pool. The pool is closed when the block exits,
+    unless it was opened by an enclosing block.
+
+    :param uri: Oracle connection string
+    :param max_size: maximum number of connections in the pool
+    :return: the connection pool
+    """
+    with _lock:
+        pool = _oracle_pools.get(uri)
+        owner = pool is None
+        if owner:
+            pool = _oracle_pools[uri] = oracledb.create_pool(
+                dsn=uri,
+                min=1,
+                max=max_size,
+                increment=1,
+                getmode=oracledb.POOL_GETMODE_WAIT,
+                connectiontype=OracleConnection
+            )
+        elif pool.max < max_size:
+            pool.reconfigure(max=max_size)
+
+    try:
+        yield pool
+    finally:
+        if owner:
+            with _lock:
+                del _oracle_pools[uri]
+
+            pool.close(force=True)
+
+
+def connect_oracle(uri: str) -> OracleConnection:
+    """
+    Acquire a connection from the pool opened by oracle_pool(), if any,
+    otherwise open a standalone connection.
+    Closing the connection releases it back to the pool.
+
+    :param uri: Oracle connection string
+    :return: a connection whose cursors have tuned fetch sizes
+    """
+    with _lock:
+        pool = _oracle_pools.get(uri)
+
+    if pool is None:
+        return oracledb.connect(dsn=uri, conn_class=OracleConnection)
+
+    return pool.acquire()
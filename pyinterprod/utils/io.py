@@ -2,9 +2,14 @@ import gzip
 import os
 import pickle
 import sqlite3
+from dataclasses import dataclass
 from tempfile import mkstemp
 
 
+# Size of blocks read from HMM files
+_HMM_BLOCK_SIZE = 16 * 1024 * 1024
+
+
 def dump(data: dict, tmpdir: str | None = None, compresslevel: int = 0) -> str:
     fd, file = mkstemp(dir=tmpdir)
     os.close(fd)
@@ -25,6 +30,80 @@ def iter_until_eof(file: str):
                 break
 
 
+@dataclass
+class HMMRecord:
+    offset: int               # position of the record in the file
+    data: memoryview          # record, including the terminating "//" line
+    header: dict[str, str]    # header fields (first value of each tag)
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+def iter_hmm_records(file: str):
+    """
+    Iterate the records of an HMM file (or any flat file with records
+    terminated by "//"), reading it by blocks. Only header lines
+    (until the line starting with "HMM ") are decoded.
+
+    :param file: path to the file
+    :return: a generator of HMMRecord objects
+    """
+    with open(file, "rb") as fh:
+        data = b""
+        base = 0   # position of data[0] in the file
+        start = 0  # position of the current record in data
+        while True:
+            block = fh.read(_HMM_BLOCK_SIZE)
+            eof = not block
+            if not eof:
+                # Keep the incomplete record from the previous block
+                data = data[start:] + block
+                base += start
+                start = 0
+
+            view = memoryview(data)
+            while True:
+                i = data.find(b"\n//", start)
+                if i < 0:
+                    break
+
+                end = data.find(b"\n", i + 3)
+                if end >= 0:
+                    end += 1
+                elif eof:
+                    end = len(data)
+                else:
+                    # Terminating line incomplete
+                    break
+
+                yield _make_hmm_record(data, view, start, end, base)
+                start = end
+
+            if eof:
+                break
+
+
+def _make_hmm_record(data: bytes, view: memoryview, start: int, end: int,
+                     base: int) -> HMMRecord:
+    i = data.find(b"\nHMM ", start, end)
+    header_end = i + 1 if i >= 0 else end
+
+    header = {}
+    for line in data[start:header_end].split(b"\n"):
+        fields = line.split(maxsplit=1)
+        if len(fields) == 2:
+            key = fields[0].decode("utf-8", errors="replace")
+            if key not in header:
+                value = fields[1].decode("utf-8", errors="replace")
+                header[key] = value.rstrip()
+
+    return HMMRecord(offset=base + start,
+                     data=view[start:end],
+                     header=header)
+
+
 class KVdb:
     def __init__(self, filepath: str, writeback: bool = False):
         self.filepath = filepath
@@ -0,0 +1,162 @@
+"""
+Compare the throughput of the TOAD archive readers.
+
+Builds a synthetic TAR archive of TOAD matches, then reads it with
+the former reader (each member loaded and decoded in memory)
+and with the streaming reader (pyinterprod.interpro.contrib.toad).
+
+Usage:
+    python scripts/benchmark_toad.py [--rows N] [--members N]
+                                     [--compression {none,gz,zst}]
+                                     [--trace-memory]
+"""
+
+import argparse
+import io
+import os
+import random
+import shutil
+import subprocess as sp
+import tarfile
+import time
+import tracemalloc
+from tempfile import mkdtemp
+
+from pyinterprod.interpro.contrib.toad import iter_tarfile
+
+
+def legacy_iter_tarfile(filepath: str):
+    with tarfile.open(filepath, mode="r") as tar:
+        for member in tar:
+            if member.name.endswith(".tsv"):
+                br = tar.extractfile(member)
+                lines = br.read().decode("utf-8").splitlines(keepends=False)
+
+                for line in lines[1:]:
+                    values = line.split("\t")
+                    if len(values) == 5:
+                        uniprot_acc, signature_acc, start, end, score = values
+                        yield (
+                            uniprot_acc,
+                            signature_acc,
+                            [(int(start), int(end))],
+                            float(score),
+                        )
+                    elif len(values) == 23:
+                        uniprot_acc, signature_acc = values[:2]
+                        fragments = []
+                        for i in range(10):
+                            start = values[2 + i * 2]
+                            end = values[3 + i * 2]
+                            if start == "NULL":
+                                break
+                            else:
+                                fragments.append((int(start), int(end)))
+
+                        score = float(values[-1])
+                        fragments.sort()
+                        yield uniprot_acc, signature_acc, fragments, score
+                    else:
+                        err = f"Unexpected number of columns: {values}"
+                        raise ValueError(err)
+
+
+def make_member(rows: int, rng: random.Random) -> bytes:
+    lines = ["uniprot_acc\tsignature_acc\tstart\tend\tscore"]
+    for i in range(rows):
+        protein_acc = f"A0A{rng.randrange(10 ** 7):07d}"
+        signature_acc = f"PF{rng.randrange(25000):05d}"
+        start = rng.randint(1, 1000)
+        end = start + rng.randint(10, 500)
+        score = f"{rng.random():.4f}"
+
+        if i % 10 == 0:
+            # Discontinuous domain
+            values = [protein_acc, signature_acc]
+            for j in range(10):
+                if j < 3:
+                    values += [str(start + j * 1000), str(end + j * 1000)]
+                else:
+                    values += ["NULL", "NULL"]
+
+            values.append(score)
+        else:
+            values = [protein_acc, signature_acc, str(start), str(end), score]
+
+        lines.append("\t".join(values))
+
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def make_archive(outdir: str, rows: int, members: int,
+                 compression: str) -> str:
+    rng = random.Random(0)
+    filepath = os.path.join(outdir, "toad.tar")
+    with tarfile.open(filepath, mode="w") as tar:
+        for i in range(members):
+            data = make_member(rows // members, rng)
+            info = tarfile.TarInfo(f"matches-{i}.tsv")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+    if compression == "gz":
+        sp.run(["gzip", "-f", filepath], check=True)
+        filepath += ".gz"
+    elif compression == "zst":
+        sp.run(["zstd", "-qf", "--rm", filepath], check=True)
+        filepath += ".zst"
+
+    return filepath
+
+
+def run(name: str, fn, filepath: str, trace_memory: bool = False) -> int:
+    if trace_memory:
+        tracemalloc.start()
+
+    ts = time.perf_counter()
+    n = 0
+    for _ in fn(filepath):
+        n += 1
+
+    secs = time.perf_counter() - ts
+    msg = f"{name:<10}{n:>12,} rows{secs:>10.2f} s{n / secs:>14,.0f} rows/s"
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        msg += f"{peak / 1024 ** 2:>10.1f} MB"
+
+    print(msg)
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TOAD reader benchmark")
+    parser.add_argument("--rows", type=int, default=2000000,
+                        help="number of matches (default: 2000000)")
+    parser.add_argument("--members", type=int, default=4,
+                        help="number of TSV files in archive (default: 4)")
+    parser.add_argument("--compression", choices=["none", "gz", "zst"],
+                        default="gz",
+                        help="archive compression (default: gz)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="report peak memory (slows down reading)")
+    parser.add_argument("--tmpdir", help="directory for temporary files")
+    args = parser.parse_args()
+
+    outdir = mkdtemp(dir=args.tmpdir)
+    try:
+        filepath = make_archive(outdir, args.rows, args.members,
+                                args.compression)
+        print(f"{filepath}: {os.path.getsize(filepath) / 1024 ** 2:.1f} MB")
+
+        if args.compression != "zst":
+            # tarfile only supports zstd from Python 3.14
+            run("legacy", legacy_iter_tarfile, filepath, args.trace_memory)
+
+        run("streaming", iter_tarfile, filepath, args.trace_memory)
+    finally:
+        shutil.rmtree(outdir)
+
+
+if __name__ == "__main__":
+    main()
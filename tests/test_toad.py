@@ -0,0 +1,68 @@
+from hypothesis import given, strategies as st
+
+from pyinterprod.interpro.contrib.toad import (filter_matches,
+                                               filter_matches_batch)
+
+
+def filter_matches_quadratic(matches: list[tuple]) -> dict[str, list[tuple]]:
+    """Reference implementation: compare each location with all kept ones"""
+    profiles = {}
+    for acc, fragments, score in matches:
+        try:
+            hits = profiles[acc]
+        except KeyError:
+            hits = profiles[acc] = []
+
+        hits.append((fragments, score))
+
+    for acc, hits in profiles.items():
+        locations = []
+        for fragments, score in hits:
+            pos_from = fragments[0][0]
+            pos_to = max(end for start, end in fragments)
+            locations.append((pos_from, pos_to, fragments, score))
+
+        filtered_locations = []
+        for loc in sorted(locations, key=lambda x: -x[3]):
+            for other in filtered_locations:
+                overlap = min(loc[1], other[1]) - max(loc[0], other[0])
+                if overlap >= 0:
+                    break
+            else:
+                filtered_locations.append(loc)
+
+        profiles[acc] = filtered_locations
+
+    return profiles
+
+
+# Fragments are sorted, see `iter_tsv()`
+fragments = st.lists(
+    st.tuples(st.integers(1, 200), st.integers(1, 200)),
+    min_size=1,
+    max_size=3
+).map(sorted)
+
+matches = st.lists(
+    st.tuples(
+        st.sampled_from(["PF00001", "PF00002", "SM00001"]),
+        fragments,
+        # Few distinct scores, to have ties
+        st.sampled_from([0.1, 0.5, 0.9, 1.0, 10.0])
+    ),
+    max_size=50
+)
+
+
+@given(matches)
+def test_filter_matches(matches):
+    assert filter_matches(matches) == filter_matches_quadratic(matches)
+
+
+@given(st.lists(matches, max_size=5))
+def test_filter_matches_batch(batch):
+    batch = [(f"P{i:05d}", matches) for i, matches in enumerate(batch)]
+    assert filter_matches_batch(batch) == [
+        (protein_acc, filter_matches_quadratic(matches))
+        for protein_acc, matches in batch
+    ]